@@ -0,0 +1,93 @@
+"""
+Consulta por índice a tabelas de dimensão pequenas (custos por cidade/país)
+Cada pessoa recebe o código inteiro da linha da dimensão e os vetores de
+custo são lidos com np.take, só para as colunas que um cálculo usa: nenhum
+merge copia a população nem espalha colunas de referência por pessoa
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# ÍNDICE DA DIMENSÃO
+# ============================================================================
+
+def build_dimension(table, keys, columns=None):
+    """
+    Indexa uma tabela de dimensão pelas suas chaves
+
+    Retorna {'keys', 'index', 'values'}: values[col] é o vetor float64 da
+    coluna com um NaN extra ao final, lido pelo código -1 (pessoa sem linha
+    correspondente, como no merge com how='left').
+    columns: colunas numéricas indexadas (padrão: todas fora das chaves)
+    """
+    if columns is None:
+        columns = [col for col in table.columns
+                   if col not in keys and pd.api.types.is_numeric_dtype(table[col])]
+    if len(keys) == 1:
+        index = pd.Index(table[keys[0]].astype(object))
+    else:
+        index = pd.MultiIndex.from_frame(table[keys].astype(object))
+    if not index.is_unique:
+        raise ValueError(f"Chaves repetidas na dimensão ({', '.join(keys)})")
+
+    values = {
+        col: np.append(table[col].to_numpy(dtype=np.float64), np.nan)
+        for col in columns
+    }
+    return {'keys': list(keys), 'index': index, 'values': values}
+
+
+# ============================================================================
+# CÓDIGOS POR PESSOA
+# ============================================================================
+
+def category_codes(values):
+    """Códigos inteiros (-1 = nulo) e categorias de uma coluna; categóricos são lidos sem cópia"""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+    return values.cat.codes.to_numpy(), values.cat.categories
+
+
+def row_codes(dimension, frame, key_map=None):
+    """
+    Linha da dimensão de cada pessoa (int32, -1 = sem correspondência)
+
+    frame: colunas de chave da pessoa, na ordem de dimension['keys']
+    key_map(combinações) -> combinações: remapeia as chaves antes da busca
+    (ex.: cidade brasileira → cidade com contexto econômico)
+    A correspondência é resolvida uma vez por combinação de categorias
+    (dezenas), e cada pessoa recebe o seu código numa única indexação.
+    """
+    codes, categories = zip(*(category_codes(frame[col]) for col in frame.columns))
+
+    # Grade de todas as combinações de categorias; a posição 0 de cada eixo
+    # é o valor nulo (código -1 + 1)
+    axes = [pd.Index([None] + list(cats), dtype=object) for cats in categories]
+    grid = pd.MultiIndex.from_product(axes).to_frame(index=False)
+    grid.columns = dimension['keys']
+    if key_map is not None:
+        grid = key_map(grid)
+
+    if len(axes) == 1:
+        lookup = dimension['index'].get_indexer(grid.iloc[:, 0])
+    else:
+        lookup = dimension['index'].get_indexer(pd.MultiIndex.from_frame(grid))
+    lookup = lookup.astype(np.int32).reshape([len(axis) for axis in axes])
+
+    return lookup[tuple(code.astype(np.intp) + 1 for code in codes)]
+
+
+# ============================================================================
+# LEITURA DOS VETORES
+# ============================================================================
+
+def take(dimension, codes, column):
+    """Valor da coluna da dimensão para cada pessoa (NaN sem correspondência)"""
+    return np.take(dimension['values'][column], codes)
+
+
+def gather(dimension, codes, columns):
+    """{coluna: vetor por pessoa} só para as colunas pedidas"""
+    return {col: take(dimension, codes, col) for col in columns}
@@ -6,6 +6,9 @@ Demonstrações práticas de análise com os dados GOLD
 import pandas as pd
 import numpy as np
 
+import paths
+import storage
+
 # ============================================================================
 # CARREGAR DADOS GOLD
 # ============================================================================
@@ -15,12 +18,17 @@ print("📊 EXEMPLOS DE USO — GOLD LAYER")
 print("=" * 80)
 print()
 
-# Carregar datasets
-qles = pd.read_csv('../gold/quality_of_life_score.csv')
-clusters = pd.read_csv('../gold/socioeconomic_clusters.csv')
-rankings = pd.read_csv('../gold/country_rankings_by_profile.csv')
-vulnerability = pd.read_csv('../gold/vulnerability_and_risk.csv')
-scenarios = pd.read_csv('../gold/policy_scenarios.csv')
+GOLD_DIR = paths.GOLD_DIR
+
+# Chave de junção por pessoa (person_id só existe em saídas antigas ou com --with-person-id)
+KEY = 'person_key' if 'person_key' in storage.dataset_columns(GOLD_DIR, 'quality_of_life_score') else 'person_id'
+
+# Carregar datasets (lotes incrementais: vale a versão mais recente de cada pessoa)
+qles = storage.read_table(GOLD_DIR, 'quality_of_life_score', latest_by=KEY)
+clusters = storage.read_table(GOLD_DIR, 'socioeconomic_clusters', latest_by=KEY)
+rankings = storage.read_table(GOLD_DIR, 'country_rankings_by_profile')
+vulnerability = storage.read_table(GOLD_DIR, 'vulnerability_and_risk', latest_by=KEY)
+scenarios = storage.read_table(GOLD_DIR, 'policy_scenarios', latest_by=[KEY, 'scenario_name'])
 
 # ============================================================================
 # EXEMPLO 1: ANÁLISE DO QLES
@@ -43,6 +51,14 @@ top_cities = qles.groupby('city')['QLES'].mean().sort_values(ascending=False).he
 for city, score in top_cities.items():
     print(f"   {city}: {score:.2f}")
 
+# Consulta de uma cidade: o filtro na chave de partição (country/region_br/city)
+# faz a leitura abrir só o diretório da cidade, não a população inteira
+city = top_cities.index[0]
+city_qles = storage.read_table(GOLD_DIR, 'quality_of_life_score', columns=[KEY, 'QLES', 'QLES_bucket'],
+                               filters={'city': city}, latest_by=KEY)
+print(f"\n🔹 Consulta por Cidade ({city}, lida só a partição da cidade):")
+print(f"   Pessoas: {len(city_qles):,} | QLES Médio: {city_qles['QLES'].mean():.2f}")
+
 print(f"\n🔹 Contribuição Média dos Componentes do QLES:")
 components = ['component_rdr', 'component_epr', 'component_iac', 
               'component_ioe', 'component_social']
@@ -68,7 +84,7 @@ for label, count in cluster_dist.items():
 # Análise por cidade
 print(f"\n🔹 Distribuição de Clusters por Cidade (Top 5):")
 city_cluster = pd.crosstab(
-    clusters.merge(qles[['person_id', 'city']], on='person_id')['city'],
+    clusters.merge(qles[[KEY, 'city']], on=KEY)['city'],
     clusters['cluster_label'],
     normalize='index'
 ).mul(100).round(1)
@@ -103,7 +119,7 @@ for flag in flags:
     print(f"   {flag.replace('_', ' ').title()}: {count:,} ({pct:.1f}%)")
 
 # Cruzar vulnerabilidade com clusters
-vuln_cluster = vulnerability.merge(clusters[['person_id', 'cluster_label']], on='person_id')
+vuln_cluster = vulnerability.merge(clusters[[KEY, 'cluster_label']], on=KEY)
 print(f"\n🔹 Risco Alto por Cluster:")
 risk_by_cluster = vuln_cluster[vuln_cluster['risk_group'] == 'Risco Alto'].groupby('cluster_label').size()
 risk_by_cluster = risk_by_cluster.sort_values(ascending=False)
@@ -165,7 +181,7 @@ for scenario in scenario_names:
 
 # Cenários por cluster
 print(f"\n🔹 Impacto dos Cenários por Cluster:")
-scenario_cluster = scenarios.merge(clusters[['person_id', 'cluster_label']], on='person_id')
+scenario_cluster = scenarios.merge(clusters[[KEY, 'cluster_label']], on=KEY)
 
 for cluster in scenario_cluster['cluster_label'].unique():
     cluster_data = scenario_cluster[scenario_cluster['cluster_label'] == cluster]
@@ -184,10 +200,10 @@ print("🔗 EXEMPLO 6: Análise Integrada (QLES + Cluster + Vulnerabilidade)")
 print("-" * 80)
 
 # Merge de todos os datasets
-integrated = qles[['person_id', 'city', 'QLES', 'QLES_bucket']].merge(
-    clusters[['person_id', 'cluster_label']], on='person_id'
+integrated = qles[[KEY, 'city', 'QLES', 'QLES_bucket']].merge(
+    clusters[[KEY, 'cluster_label']], on=KEY
 ).merge(
-    vulnerability[['person_id', 'risk_group']], on='person_id'
+    vulnerability[[KEY, 'risk_group']], on=KEY
 )
 
 print(f"\n🔹 QLES Médio por Cluster e Risco:")
@@ -6,10 +6,13 @@ Demonstra como usar os dados enriched para análises
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
 
+import paths
+import person_table
+import storage
 
-ENRICHED_DIR = Path("enriched")
+
+ENRICHED_DIR = paths.ENRICHED_DIR
 
 
 def exemplo_1_analise_regional():
@@ -23,14 +26,14 @@ def exemplo_1_analise_regional():
     print()
     
     # Carregar dados
-    df = pd.read_csv(ENRICHED_DIR / "people_enriched.csv")
+    df = person_table.read_person_view(ENRICHED_DIR, "people_enriched")
     
     # Agrupar por região
     regional = df.groupby('region_br').agg({
         'renda_disponivel_real': ['mean', 'median', 'std'],
         'economic_pressure_ratio': 'median',
         'cost_per_capita': 'mean',
-        'person_id': 'count'
+        'person_key': 'count'
     }).round(2)
     
     regional.columns = ['RDR_Média', 'RDR_Mediana', 'RDR_StdDev', 'EPR_Mediana', 'Custo_PC', 'N']
@@ -57,16 +60,16 @@ def exemplo_2_impacto_educacao():
     print()
     
     # Carregar dados
-    df = pd.read_csv(ENRICHED_DIR / "opportunity_access_enriched.csv")
-    people = pd.read_csv(ENRICHED_DIR / "people_enriched.csv")
+    df = person_table.read_person_view(ENRICHED_DIR, "opportunity_access_enriched")
+    people = person_table.read_person_view(ENRICHED_DIR, "people_enriched")
     
     # Merge para ter educação
-    df = df.merge(people[['person_id', 'education_level']], on='person_id')
+    df = df.merge(people[['person_key', 'education_level']], on='person_key')
     
     # Agrupar por educação
     by_edu = df.groupby('education_level').agg({
         'ioe_raw': ['mean', 'median'],
-        'person_id': 'count'
+        'person_key': 'count'
     }).round(2)
     
     by_edu.columns = ['IOE_Média', 'IOE_Mediana', 'N']
@@ -96,7 +99,7 @@ def exemplo_3_perfil_vulneravel():
     print()
     
     # Carregar dados
-    df = pd.read_csv(ENRICHED_DIR / "people_enriched.csv")
+    df = person_table.read_person_view(ENRICHED_DIR, "people_enriched")
     
     # Filtrar pessoas vulneráveis (múltiplos critérios)
     vulnerable = df[
@@ -144,7 +147,7 @@ def exemplo_4_melhor_cidade_para_migracao():
     print()
     
     # Carregar comparações
-    df = pd.read_csv(ENRICHED_DIR / "cross_country_family_comparison.csv")
+    df = storage.read_table(ENRICHED_DIR, "cross_country_family_comparison")
     
     # Filtrar apenas saindo do Brasil
     from_brazil = df[df['from_country'] == 'Brazil'].copy()
@@ -181,7 +184,7 @@ def exemplo_5_acesso_cultural_por_cidade():
     print()
     
     # Carregar dados
-    df = pd.read_csv(ENRICHED_DIR / "cultural_access_enriched.csv")
+    df = person_table.read_person_view(ENRICHED_DIR, "cultural_access_enriched")
     
     # Estatísticas gerais
     print("Distribuição de Acesso Cultural (IAC):")
@@ -196,7 +199,7 @@ def exemplo_5_acesso_cultural_por_cidade():
     print()
     
     # Top 10 pessoas com melhor acesso
-    top_10 = df_positive.nlargest(10, 'iac_raw')[['person_id', 'iac_raw', 'renda_disponivel_real', 'cultural_basic_cost']]
+    top_10 = df_positive.nlargest(10, 'iac_raw')[['person_key', 'iac_raw', 'renda_disponivel_real', 'cultural_basic_cost']]
     print("Top 10 Indivíduos com Melhor Acesso Cultural:")
     print(top_10.to_string(index=False))
     print()
@@ -213,7 +216,7 @@ def exemplo_6_correlacao_avancada():
     print()
     
     # Carregar dados
-    df = pd.read_csv(ENRICHED_DIR / "people_enriched.csv")
+    df = person_table.read_person_view(ENRICHED_DIR, "people_enriched")
     
     # Variáveis de interesse
     vars_of_interest = [
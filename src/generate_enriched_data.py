@@ -1,21 +1,77 @@
 
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from pathlib import Path
+
+import dimensions
+import normalization_model
+import paths
+import person_table
+import profile_simulation
+import schema
+import silver_kernel
+import social_benefits
+import storage
 
 
 # ============================================================================
 # CONFIGURAÇÕES
 # ============================================================================
 
-RAW_DIR = Path("../raw")
-ENRICHED_DIR = Path("../enriched")
+RAW_DIR = paths.RAW_DIR
+ENRICHED_DIR = paths.ENRICHED_DIR
 ENRICHED_DIR.mkdir(exist_ok=True)
 
 # Fator de ajuste por dependente (literatura sugere 30-50%)
 DEPENDENCY_FACTOR = 0.40
 
+# Normalizações (normalize_metrics)
+ZSCORE_GROUP_BY = 'country'
+ZSCORE_METRICS = ['renda_disponivel_real', 'iac_raw', 'ioe_raw']
+MINMAX_METRICS = ['renda_disponivel_real', 'iac_raw', 'ioe_raw', 'economic_pressure_ratio']
+
+# País das pessoas em people_raw sem coluna country (árvores antigas)
+BASE_COUNTRY = 'Brazil'
+
+# Moeda das métricas por pessoa: salários de people_raw já estão em BRL e as
+# tabelas de referência de cada país são convertidas uma vez por partição
+REPORTING_CURRENCY = 'BRL'
+
+# Colunas monetárias (moeda local) de cada tabela de referência
+REFERENCE_MONEY_COLUMNS = {
+    'economic_context_raw': ['local_min_wage', 'avg_rent_single', 'avg_rent_family', 'basic_food_cost',
+                             'transport_cost', 'utilities_cost', 'healthcare_cost'],
+    'cultural_costs_raw': ['streaming_cost', 'internet_cost', 'cinema_ticket', 'cultural_events',
+                           'music_subscription'],
+    'opportunity_costs_raw': ['technical_course', 'college_private', 'language_course',
+                              'emergency_savings_target', 'mobility_cost'],
+    'social_benefits_raw': ['monthly_value', 'eligibility_income_threshold', 'per_dependent_bonus'],
+}
+
+# Chaves das tabelas de dimensão consultadas por índice (dimensions.py):
+# contexto econômico por país/cidade, custos culturais e de oportunidade por país
+ECONOMIC_KEYS = ['country', 'city']
+COUNTRY_KEYS = ['country']
+
+# Colunas de economic_context_raw lidas pelas métricas por pessoa
+ECONOMIC_CONTEXT_COLUMNS = ['avg_rent_single', 'avg_rent_family', 'basic_food_cost', 'transport_cost',
+                            'utilities_cost', 'healthcare_cost', 'local_min_wage']
+
+# Situações de moradia com custo de 50% do aluguel (manutenção/IPTU)
+OWNED_HOUSING = ['próprio', 'cedido']
+
+# Colunas da pessoa lidas pelo kernel de métricas (silver_kernel)
+KERNEL_PERSON_COLUMNS = ['dependents', 'net_salary_brl', 'total_social_benefits']
+
+# Etapas SILVER com métricas por pessoa, na ordem de cálculo
+PERSON_METRIC_STAGES = ['household_costs', 'economic_metrics', 'cultural_access', 'opportunity_access']
+
 # Mapeamento de cidades brasileiras para contexto econômico
+# (pessoas de outros países já estão em cidades de economic_context_raw)
 CITY_MAPPING = {
     # Grandes metrópoles -> São Paulo (mais caro)
     'São Paulo': 'São Paulo',
@@ -72,118 +128,279 @@ CITY_MAPPING = {
     'Vila Velha': 'Belo Horizonte',
 }
 
+# Etapas da camada SILVER e sua linhagem (usada pelo pipeline incremental):
+# datasets RAW e parâmetros lidos, etapas das quais dependem e colunas de
+# people_wide (ou datasets) que produzem. As normalizações são derivadas de
+# ZSCORE_METRICS/MINMAX_METRICS, uma etapa por métrica.
+SILVER_STAGES = {
+    'people': {
+        'inputs': ['people_raw'],
+        'params': [],
+        'requires': [],
+        # country vem de people_raw (BASE_COUNTRY em árvores antigas, sem a coluna)
+        'columns': ['person_key', 'person_id', 'age', 'gender', 'region_br', 'city_br', 'education_level',
+                    'job_category', 'employment_type', 'gross_salary_brl', 'net_salary_brl',
+                    'dependents', 'rent_status', 'receives_social_benefit', 'country'],
+    },
+    # Colunas de dimensão (custos por cidade/país) não entram em people_wide:
+    # ficam em person_table.DIMENSION_COLUMNS e são consultadas na exportação
+    'household_costs': {
+        'inputs': ['economic_context_raw', 'social_benefits_raw'],
+        'params': ['CITY_MAPPING', 'BENEFIT_TAKE_UP_COLUMN'],
+        'requires': ['people'],
+        'columns': ['housing_cost', 'dependent_adjustment', 'total_household_cost', 'total_social_benefits',
+                    'renda_disponivel_real'],
+        'datasets': ['social_benefits_enriched'],
+    },
+    'economic_metrics': {
+        'inputs': ['economic_context_raw'],  # local_min_wage
+        'params': ['CITY_MAPPING', 'DEPENDENCY_FACTOR'],
+        'requires': ['household_costs'],
+        'columns': ['economic_pressure_ratio', 'epr_clean', 'cost_per_capita', 'adjusted_min_wage',
+                    'dist_salario_minimo_ajustado', 'subsistence_gap', 'social_support_ratio'],
+    },
+    'cultural_access': {
+        'inputs': ['cultural_costs_raw'],
+        'params': [],
+        'requires': ['household_costs'],
+        'columns': ['cultural_basic_cost', 'iac_raw'],
+    },
+    'opportunity_access': {
+        'inputs': ['opportunity_costs_raw'],
+        'params': [],
+        'requires': ['household_costs'],
+        'columns': ['ioe_technical', 'ioe_college', 'ioe_language', 'ioe_savings', 'ioe_mobility', 'ioe_raw'],
+    },
+    'cross_country': {
+        'inputs': ['economic_context_raw'],
+        'params': ['FAMILY_PROFILES'],
+        'requires': [],
+        'columns': [],
+        'datasets': ['cross_country_family_simulation', 'cross_country_family_comparison'],
+    },
+}
+
 
 # ============================================================================
 # 1. CARREGAMENTO DOS DADOS RAW
 # ============================================================================
 
+def load_reference_tables(raw_dir=RAW_DIR):
+    """Carrega as tabelas de referência RAW (custos, câmbio e benefícios)"""
+    # Tabelas de referência em float64: as métricas por pessoa são calculadas
+    # em precisão dupla e só gravadas com os tipos compactos de schema.py
+    economic = schema.widen_floats(storage.read_table(raw_dir, "economic_context_raw"))
+    cultural = schema.widen_floats(storage.read_table(raw_dir, "cultural_costs_raw"))
+    opportunity = schema.widen_floats(storage.read_table(raw_dir, "opportunity_costs_raw"))
+    social = schema.widen_floats(storage.read_table(raw_dir, "social_benefits_raw"))
+    
+    return economic, cultural, opportunity, social
+
+
+def conversion_rates(economic_df):
+    """Taxa moeda local → REPORTING_CURRENCY por país (BRL por USD / moeda local por USD)"""
+    reporting_per_usd = economic_df.loc[economic_df['currency'] == REPORTING_CURRENCY, 'usd_rate'].mean()
+    local_per_usd = economic_df.groupby('country', observed=True, sort=False)['usd_rate'].mean()
+    return reporting_per_usd / local_per_usd
+
+
+def partition_reference_tables(tables, country, rate):
+    """
+    Linhas de um país nas tabelas de referência, convertidas para REPORTING_CURRENCY
+
+    A conversão é uma multiplicação das poucas linhas de referência do país
+    (nenhuma conversão por pessoa). tables: {nome RAW: DataFrame}.
+    """
+    converted = {}
+    for name, table in tables.items():
+        part = table[(table['country'] == country).to_numpy()].copy()
+        money = REFERENCE_MONEY_COLUMNS[name]
+        part[money] = part[money] * rate
+        converted[name] = part
+    converted['economic_context_raw']['currency'] = REPORTING_CURRENCY
+    return converted
+
+
+def load_person_reference_tables(raw_dir=RAW_DIR, countries=None):
+    """
+    Tabelas de referência para as métricas por pessoa, em REPORTING_CURRENCY
+
+    countries: países incluídos (padrão: todos de economic_context_raw).
+    A simulação cross-country usa load_reference_tables (moeda local).
+    """
+    economic, cultural, opportunity, social = load_reference_tables(raw_dir)
+    tables = {
+        'economic_context_raw': economic,
+        'cultural_costs_raw': cultural,
+        'opportunity_costs_raw': opportunity,
+        'social_benefits_raw': social,
+    }
+    rates = conversion_rates(economic)
+    parts = [partition_reference_tables(tables, country, rates[country])
+             for country in (rates.index if countries is None else countries)]
+    return tuple(pd.concat([part[name] for part in parts], ignore_index=True) for name in tables)
+
+
 def load_raw_data():
-    """Carrega todos os arquivos RAW"""
-    people = pd.read_csv(RAW_DIR / "people_raw.csv")
-    economic = pd.read_csv(RAW_DIR / "economic_context_raw.csv")
-    cultural = pd.read_csv(RAW_DIR / "cultural_costs_raw.csv")
-    opportunity = pd.read_csv(RAW_DIR / "opportunity_costs_raw.csv")
-    social = pd.read_csv(RAW_DIR / "social_benefits_raw.csv")
+    """Carrega todos os arquivos RAW (formato detectado automaticamente)"""
+    people = person_table.ensure_person_key(storage.read_table(RAW_DIR, "people_raw"))
+    economic, cultural, opportunity, social = load_person_reference_tables()
     
     return people, economic, cultural, opportunity, social
 
 
+def compute_person_metrics(people, economic, cultural, opportunity, social):
+    """
+    Custos, métricas econômicas, acesso cultural e oportunidades (tudo local à linha)
+
+    Todas as métricas das quatro etapas numa única chamada do kernel fundido
+    (silver_kernel), bloco a bloco, sem frames intermediários.
+    """
+    df = ensure_country(people.copy(deep=False))
+    df['total_social_benefits'] = social_benefits.total_benefits(df, social)
+    return assign_metrics(df, PERSON_METRIC_STAGES, economic, cultural, opportunity)
+
+
+def enrich_people(people, economic, cultural, opportunity, social, model):
+    """
+    Calcula todas as métricas por pessoa de um lote com um modelo já ajustado
+
+    Caminho incremental: cada métrica é local à linha e a normalização usa
+    as estatísticas persistidas, então o lote não depende do restante da
+    população.
+    """
+    df = compute_person_metrics(people, economic, cultural, opportunity, social)
+    return normalize_metrics(df, model=model)
+
+
 # ============================================================================
 # 2. MÉTRICAS DE CUSTOS E RENDA
 # ============================================================================
 
-def calculate_household_costs(people_df, economic_df):
+def ensure_country(df):
+    """País da pessoa; people_raw de árvores antigas (sem a coluna) é só do Brasil"""
+    if 'country' not in df.columns:
+        df['country'] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), [BASE_COUNTRY])
+    return df
+
+
+def map_context_city(keys):
     """
-    Calcula Total Household Cost e Renda Disponível Real (RDR)
+    Cidade de economic_context_raw de cada combinação (país, cidade da pessoa)
+
+    Cidades brasileiras sem contexto próprio usam CITY_MAPPING (Belo
+    Horizonte quando não mapeadas); nos demais países a cidade da pessoa já
+    é uma cidade de economic_context_raw.
     """
-    # Mapear cidades para contexto econômico
-    people_df['city_mapped'] = people_df['city_br'].map(CITY_MAPPING)
-    
-    # Se cidade não mapeada, usar Belo Horizonte como padrão (custo médio)
-    people_df['city_mapped'] = people_df['city_mapped'].fillna('Belo Horizonte')
-    
-    # Merge com contexto econômico
-    df = people_df.merge(
-        economic_df,
-        left_on=['city_mapped'],
-        right_on=['city'],
-        how='left'
-    )
-    
-    # Custos de habitação baseado em rent_status
-    df['housing_cost'] = np.where(
-        df['dependents'] == 0,
-        df['avg_rent_single'],
-        df['avg_rent_family']
-    )
-    
-    # Ajuste para moradia própria ou cedida (50% do aluguel em manutenção/IPTU)
-    df.loc[df['rent_status'].isin(['próprio', 'cedido']), 'housing_cost'] *= 0.5
-    
-    # Ajuste de custos por dependente (escala de consumo)
-    df['dependent_adjustment'] = df['dependents'] * (
-        df['basic_food_cost'] * 0.6 +  # Criança consome ~60% do adulto em comida
-        df['utilities_cost'] * 0.3 +    # 30% adicional em utilities
-        df['healthcare_cost'] * 0.4     # 40% adicional em saúde
-    )
-    
-    # Total Household Cost
-    df['total_household_cost'] = (
-        df['housing_cost'] +
-        df['basic_food_cost'] +
-        df['transport_cost'] +
-        df['utilities_cost'] +
-        df['healthcare_cost'] +
-        df['dependent_adjustment']
-    )
-    
-    # Benefícios sociais calculados (simplificado - assumindo elegibilidade)
-    df['total_social_benefits'] = 0.0
-    
-    # Renda Disponível Real (RDR)
-    df['renda_disponivel_real'] = (
-        df['net_salary_brl'] +
-        df['total_social_benefits'] -
-        df['total_household_cost']
-    )
-    
+    mapped = keys['city'].map(CITY_MAPPING).fillna('Belo Horizonte')
+    keys['city'] = keys['city'].where(keys['country'] != BASE_COUNTRY, mapped)
+    return keys
+
+
+def economic_codes(df, economic):
+    """Linha de economic_context_raw de cada pessoa (dimensão já indexada)"""
+    return dimensions.row_codes(economic, ensure_country(df)[['country', 'city_br']], key_map=map_context_city)
+
+
+def country_codes(df, dimension):
+    """Linha de uma tabela por país (custos culturais/de oportunidade) de cada pessoa"""
+    return dimensions.row_codes(dimension, ensure_country(df)[['country']])
+
+
+def dimension_lookup(economic_df, cultural_df, opportunity_df):
+    """
+    Função lookup(df, colunas) -> {coluna: vetor} das colunas de dimensão
+
+    Usada pelas visões que exportam custos por cidade/país
+    (person_table.DIMENSION_COLUMNS), que não ficam gravados em people_wide.
+    """
+    sources = {
+        'economic_context_raw': (dimensions.build_dimension(economic_df, ECONOMIC_KEYS), economic_codes),
+        'cultural_costs_raw': (dimensions.build_dimension(cultural_df, COUNTRY_KEYS), country_codes),
+        'opportunity_costs_raw': (dimensions.build_dimension(opportunity_df, COUNTRY_KEYS), country_codes),
+    }
+
+    def lookup(df, columns):
+        values = {}
+        for name, (dimension, codes) in sources.items():
+            wanted = [col for col in person_table.DIMENSION_COLUMNS[name] if col in columns]
+            if wanted:
+                values.update(dimensions.gather(dimension, codes(df, dimension), wanted))
+        return values
+
+    return lookup
+
+
+def metric_inputs(df, economic_df=None, cultural_df=None, opportunity_df=None):
+    """
+    Entradas do kernel de métricas: colunas da pessoa e custos das dimensões
+
+    Os custos entram como (vetor da dimensão, códigos por pessoa) e são
+    lidos por índice dentro de cada bloco; só as tabelas informadas são
+    indexadas. Métricas já presentes no frame (ex.: RDR ao recalcular só o
+    acesso cultural) também são entradas.
+    """
+    names = KERNEL_PERSON_COLUMNS + list(silver_kernel.METRIC_EXPRESSIONS)
+    columns = {col: df[col].to_numpy() for col in names if col in df.columns}
+    if 'rent_status' in df.columns:
+        columns['owned_home'] = df['rent_status'].isin(OWNED_HOUSING).to_numpy()
+
+    lookups = {}
+    sources = [
+        (economic_df, ECONOMIC_KEYS, ECONOMIC_CONTEXT_COLUMNS, economic_codes),
+        (cultural_df, COUNTRY_KEYS, REFERENCE_MONEY_COLUMNS['cultural_costs_raw'], country_codes),
+        (opportunity_df, COUNTRY_KEYS, REFERENCE_MONEY_COLUMNS['opportunity_costs_raw'], country_codes),
+    ]
+    for table, keys, cost_columns, codes in sources:
+        if table is None:
+            continue
+        dimension = dimensions.build_dimension(table, keys, cost_columns)
+        rows = codes(df, dimension)
+        lookups.update({col: (dimension['values'][col], rows) for col in cost_columns})
+    return columns, lookups
+
+
+def assign_metrics(df, stages, economic_df=None, cultural_df=None, opportunity_df=None):
+    """
+    Calcula no kernel fundido as métricas das etapas SILVER e as grava no frame
+
+    As fórmulas ficam em silver_kernel.METRIC_EXPRESSIONS; as colunas de
+    cada etapa são as de SILVER_STAGES. Custos das dimensões não entram no frame.
+    """
+    metrics = [col for stage in stages for col in SILVER_STAGES[stage]['columns']
+               if col in silver_kernel.METRIC_EXPRESSIONS]
+    columns, lookups = metric_inputs(df, economic_df, cultural_df, opportunity_df)
+    values = silver_kernel.evaluate(metrics, columns, lookups, {'dependency_factor': DEPENDENCY_FACTOR})
+    # Series sem cópia: o buffer do kernel vira a própria coluna do frame
+    for col, vector in values.items():
+        df[col] = pd.Series(vector, index=df.index, copy=False)
     return df
 
 
-def calculate_economic_metrics(df):
+def calculate_household_costs(people_df, economic_df, social_df):
+    """
+    Calcula Total Household Cost e Renda Disponível Real (RDR)
+
+    Moradia: aluguel de solteiro ou família pela cidade, 50% para moradia
+    própria ou cedida; dependentes somam 60% da alimentação, 30% das
+    utilities e 40% da saúde (fórmulas em silver_kernel).
+    Benefícios sociais: soma das regras de social_benefits_raw para as quais
+    a pessoa é elegível no seu país (motor em social_benefits.py)
+    """
+    df = ensure_country(people_df.copy(deep=False))
+    df['total_social_benefits'] = social_benefits.total_benefits(df, social_df)
+    return assign_metrics(df, ['household_costs'], economic_df=economic_df)
+
+
+def calculate_economic_metrics(df, economic_df):
     """
     Calcula métricas de pressão econômica e estrutura familiar
+
+    EPR (e epr_clean, só 0 < EPR < 2), custo per capita, salário mínimo
+    ajustado por dependente (DEPENDENCY_FACTOR), distância até ele, gap de
+    subsistência e Social Support Ratio: benefícios / (salário + benefícios)
     """
-    # Economic Pressure Ratio (EPR)
-    df['economic_pressure_ratio'] = df['total_household_cost'] / df['net_salary_brl']
-    
-    # EPR Clean - versão limpa para análises (remove inf e valores inválidos)
-    # Mantém apenas valores economicamente interpretáveis (0 < EPR < 2)
-    df['epr_clean'] = df['economic_pressure_ratio'].where(
-        (df['economic_pressure_ratio'] > 0) &
-        (df['economic_pressure_ratio'] < 2.0) &
-        (np.isfinite(df['economic_pressure_ratio'])),
-        np.nan
-    )
-    
-    # Custo por Dependente (CPD)
-    df['cost_per_capita'] = df['total_household_cost'] / (df['dependents'] + 1)
-    
-    # Salário Mínimo Ajustado
-    df['adjusted_min_wage'] = df['local_min_wage'] * (1 + df['dependents'] * DEPENDENCY_FACTOR)
-    
-    # Distância do Salário Mínimo Ajustado (DSMA)
-    df['dist_salario_minimo_ajustado'] = (
-        (df['net_salary_brl'] - df['adjusted_min_wage']) / df['adjusted_min_wage']
-    )
-    
-    # Gap de Subsistência
-    df['subsistence_gap'] = df['net_salary_brl'] - df['total_household_cost']
-    
-    # Social Support Ratio (SSR)
-    df['social_support_ratio'] = df['total_social_benefits'] / df['net_salary_brl']
-    
-    return df
+    return assign_metrics(df.copy(deep=False), ['economic_metrics'], economic_df=economic_df)
 
 
 # ============================================================================
@@ -192,28 +409,9 @@ def calculate_economic_metrics(df):
 
 def calculate_cultural_access(df, cultural_df):
     """
-    Calcula Índice de Acesso Cultural (bruto e normalizado)
+    Calcula Índice de Acesso Cultural (bruto): RDR / custo cultural básico do país
     """
-    # Adicionar país baseado na cidade
-    df['country'] = 'Brazil'  # Todos os dados são BR por enquanto
-    
-    # Merge com custos culturais
-    df = df.merge(cultural_df, on='country', how='left')
-    
-    # Cultural Basic Cost
-    df['cultural_basic_cost'] = (
-        df['streaming_cost'] +
-        df['internet_cost'] +
-        df['cinema_ticket'] +
-        df['cultural_events'] +
-        df['music_subscription']
-    )
-    
-    # Índice de Acesso Cultural (bruto)
-    # Evita divisão por zero
-    df['iac_raw'] = df['renda_disponivel_real'] / df['cultural_basic_cost'].replace(0, np.nan)
-    
-    return df
+    return assign_metrics(ensure_country(df.copy(deep=False)), ['cultural_access'], cultural_df=cultural_df)
 
 
 # ============================================================================
@@ -223,91 +421,54 @@ def calculate_cultural_access(df, cultural_df):
 def calculate_opportunity_access(df, opportunity_df):
     """
     Calcula Índice de Oportunidades Econômicas (bruto)
+
+    Soma de RDR / custo de cada oportunidade do país (curso técnico,
+    faculdade, idioma, reserva de emergência, mobilidade)
     """
-    # Merge com custos de oportunidades
-    df = df.merge(opportunity_df, on='country', how='left')
-    
-    # IOE - soma dos acessos individuais
-    # Quanto maior o RDR relativo ao custo, maior o acesso
-    df['ioe_technical'] = df['renda_disponivel_real'] / df['technical_course'].replace(0, np.nan)
-    df['ioe_college'] = df['renda_disponivel_real'] / df['college_private'].replace(0, np.nan)
-    df['ioe_language'] = df['renda_disponivel_real'] / df['language_course'].replace(0, np.nan)
-    df['ioe_savings'] = df['renda_disponivel_real'] / df['emergency_savings_target'].replace(0, np.nan)
-    df['ioe_mobility'] = df['renda_disponivel_real'] / df['mobility_cost'].replace(0, np.nan)
-    
-    # Índice agregado (soma)
-    df['ioe_raw'] = (
-        df['ioe_technical'].fillna(0) +
-        df['ioe_college'].fillna(0) +
-        df['ioe_language'].fillna(0) +
-        df['ioe_savings'].fillna(0) +
-        df['ioe_mobility'].fillna(0)
-    )
-    
-    return df
+    return assign_metrics(ensure_country(df.copy(deep=False)), ['opportunity_access'],
+                          opportunity_df=opportunity_df)
 
 
 # ============================================================================
 # 5. NORMALIZAÇÃO
 # ============================================================================
 
-def normalize_metrics(df):
+def normalize_metrics(df, group_by=ZSCORE_GROUP_BY, zscore_metrics=ZSCORE_METRICS,
+                      minmax_metrics=MINMAX_METRICS, model=None):
     """
-    Aplica normalização Z-score por país e Min-Max global
+    Aplica normalização Z-score por grupo (padrão: país) e Min-Max global
+
+    Uma única agregação agrupada calcula média e desvio de todas as métricas
+    de z-score, e uma única agregação global calcula min/max; o resultado é
+    devolvido às linhas por indexação (sem lambda por grupo).
+    group_by: qualquer coluna de agrupamento (country, city_br, region_br, ...)
+    model: estatísticas já ajustadas (normalization_model); quando informado,
+           nada é reajustado e o lote é pontuado contra a população de referência
+    Grupos degenerados (desvio 0 ou indefinido) recebem z-score 0.0.
     """
-    # Z-score por país para RDR, IAC, IOE
-    for metric in ['renda_disponivel_real', 'iac_raw', 'ioe_raw']:
-        if metric in df.columns:
-            df[f'{metric}_zscore'] = df.groupby('country')[metric].transform(
-                lambda x: (x - x.mean()) / x.std() if x.std() > 0 else 0
-            )
-    
-    # Min-Max (0-1) para métricas de dashboard
-    for metric in ['renda_disponivel_real', 'iac_raw', 'ioe_raw', 'economic_pressure_ratio']:
-        if metric in df.columns:
-            min_val = df[metric].min()
-            max_val = df[metric].max()
-            if max_val > min_val:
-                df[f'{metric}_minmax'] = (df[metric] - min_val) / (max_val - min_val)
-            else:
-                df[f'{metric}_minmax'] = 0.0
-    
-    return df
+    if model is None:
+        model = normalization_model.fit(df, group_by, zscore_metrics, minmax_metrics)
+    return normalization_model.apply(df, model)
 
 
 # ============================================================================
 # 6. DATASETS ENRICHED
 # ============================================================================
 
+def generate_people_wide(df):
+    """
+    Gera people_wide
+    Tabela canônica por pessoa: uma única cópia de cada coluna das visões
+    """
+    return person_table.build_wide_table(df)
+
+
 def generate_people_enriched(df):
     """
     Gera people_enriched.csv
     Contém todas as métricas individuais
     """
-    cols_to_keep = [
-        'person_id', 'age', 'gender', 'region_br', 'city_br', 'education_level',
-        'job_category', 'employment_type', 'gross_salary_brl', 'net_salary_brl',
-        'dependents', 'rent_status', 'receives_social_benefit',
-        # Custos
-        'total_household_cost', 'housing_cost', 'dependent_adjustment',
-        # Benefícios
-        'total_social_benefits',
-        # Métricas principais
-        'renda_disponivel_real',
-        'economic_pressure_ratio',
-        'epr_clean',  # EPR limpo para análises
-        'cost_per_capita',
-        'adjusted_min_wage',
-        'dist_salario_minimo_ajustado',
-        'subsistence_gap',
-        'social_support_ratio',
-        # Normalizações
-        'renda_disponivel_real_zscore',
-        'renda_disponivel_real_minmax',
-        'economic_pressure_ratio_minmax'
-    ]
-    
-    return df[[col for col in cols_to_keep if col in df.columns]]
+    return person_table.build_view(df, 'people_enriched')
 
 
 def generate_household_costs_enriched(df):
@@ -315,58 +476,29 @@ def generate_household_costs_enriched(df):
     Gera household_costs_enriched.csv
     Detalha composição de custos por pessoa
     """
-    cols = [
-        'person_id', 'city_br', 'dependents', 'rent_status',
-        'housing_cost',
-        'basic_food_cost',
-        'transport_cost',
-        'utilities_cost',
-        'healthcare_cost',
-        'dependent_adjustment',
-        'total_household_cost',
-        'cost_per_capita',
-        'economic_pressure_ratio',
-        'epr_clean'  # EPR limpo para análises
-    ]
-    
-    return df[[col for col in cols if col in df.columns]]
+    return person_table.build_view(df, 'household_costs_enriched')
 
 
 def generate_cultural_access_enriched(df):
     """
     Gera cultural_access_enriched.csv
     """
-    cols = [
-        'person_id', 'country', 'city_br',
-        'renda_disponivel_real',
-        'streaming_cost', 'internet_cost', 'cinema_ticket',
-        'cultural_events', 'music_subscription',
-        'cultural_basic_cost',
-        'iac_raw',
-        'iac_raw_zscore',
-        'iac_raw_minmax'
-    ]
-    
-    return df[[col for col in cols if col in df.columns]]
+    return person_table.build_view(df, 'cultural_access_enriched')
 
 
 def generate_opportunity_access_enriched(df):
     """
     Gera opportunity_access_enriched.csv
     """
-    cols = [
-        'person_id', 'country', 'city_br',
-        'renda_disponivel_real',
-        'technical_course', 'college_private', 'language_course',
-        'emergency_savings_target', 'mobility_cost',
-        'ioe_technical', 'ioe_college', 'ioe_language',
-        'ioe_savings', 'ioe_mobility',
-        'ioe_raw',
-        'ioe_raw_zscore',
-        'ioe_raw_minmax'
-    ]
-    
-    return df[[col for col in cols if col in df.columns]]
+    return person_table.build_view(df, 'opportunity_access_enriched')
+
+
+def generate_social_benefits_enriched(df, social_df):
+    """
+    Gera social_benefits_enriched
+    Uma linha por par (pessoa, programa elegível), com valor e adesão
+    """
+    return social_benefits.benefit_breakdown(df, social_df)
 
 
 # ============================================================================
@@ -383,140 +515,225 @@ def generate_cross_country_comparison(people_df, economic_df):
     - Per Capita Family Delta
     """
     
-    # Perfis familiares típicos
-    family_profiles = [
-        {
-            'profile_id': 'F1',
-            'description': 'Casal sem filhos, classe média',
-            'net_salary': 6000,
-            'dependents': 0,
-            'rent_status': 'aluguel'
-        },
-        {
-            'profile_id': 'F2',
-            'description': 'Família com 2 filhos, classe média',
-            'net_salary': 8000,
-            'dependents': 2,
-            'rent_status': 'aluguel'
-        },
-        {
-            'profile_id': 'F3',
-            'description': 'Família com 3 filhos, classe média-baixa',
-            'net_salary': 5000,
-            'dependents': 3,
-            'rent_status': 'aluguel'
-        },
-        {
-            'profile_id': 'F4',
-            'description': 'Profissional solteiro, classe média-alta',
-            'net_salary': 10000,
-            'dependents': 0,
-            'rent_status': 'aluguel'
-        },
-    ]
-    
-    results = []
+    # Perfis familiares típicos × todas as cidades, avaliados de uma vez
+    df_cross = profile_simulation.simulate_profiles(profile_simulation.FAMILY_PROFILES, economic_df)
     
-    for profile in family_profiles:
-        for _, city_data in economic_df.iterrows():
-            # Calcula custos para este perfil nesta cidade
-            if profile['dependents'] == 0:
-                housing_cost = city_data['avg_rent_single']
-            else:
-                housing_cost = city_data['avg_rent_family']
-            
-            if profile['rent_status'] in ['próprio', 'cedido']:
-                housing_cost *= 0.5
-            
-            dependent_adjustment = profile['dependents'] * (
-                city_data['basic_food_cost'] * 0.6 +
-                city_data['utilities_cost'] * 0.3 +
-                city_data['healthcare_cost'] * 0.4
-            )
-            
-            total_cost = (
-                housing_cost +
-                city_data['basic_food_cost'] +
-                city_data['transport_cost'] +
-                city_data['utilities_cost'] +
-                city_data['healthcare_cost'] +
-                dependent_adjustment
-            )
-            
-            # Ajusta salário pela taxa de câmbio (para comparação internacional)
-            # Converte BRL para USD para comparação
-            salary_adjusted = profile['net_salary'] / city_data['usd_rate']
-            
-            # RDR
-            rdr = salary_adjusted - total_cost / city_data['usd_rate']
-            
-            results.append({
-                'profile_id': profile['profile_id'],
-                'description': profile['description'],
-                'country': city_data['country'],
-                'city': city_data['city'],
-                'dependents': profile['dependents'],
-                'net_salary_local': profile['net_salary'],
-                'net_salary_usd': salary_adjusted,
-                'total_household_cost_local': total_cost,
-                'total_household_cost_usd': total_cost / city_data['usd_rate'],
-                'renda_disponivel_real_usd': rdr,
-                'per_capita_rdr': rdr / (profile['dependents'] + 1)
-            })
-    
-    df_cross = pd.DataFrame(results)
-    
-    # Calcula deltas entre países para cada perfil
-    comparisons = []
-    
-    for profile_id in df_cross['profile_id'].unique():
-        profile_data = df_cross[df_cross['profile_id'] == profile_id].copy()
-        
-        # Compara cada cidade com todas as outras
-        for i, row_a in profile_data.iterrows():
-            for j, row_b in profile_data.iterrows():
-                if i != j:
-                    # Family Purchasing Power Delta
-                    fpp_delta = row_b['renda_disponivel_real_usd'] - row_a['renda_disponivel_real_usd']
-                    
-                    # Relative Family Power Gap
-                    if row_a['renda_disponivel_real_usd'] != 0:
-                        rfpg = fpp_delta / abs(row_a['renda_disponivel_real_usd'])
-                    else:
-                        rfpg = np.nan
-                    
-                    # Per Capita Delta
-                    pc_delta = fpp_delta / (row_a['dependents'] + 1)
-                    
-                    comparisons.append({
-                        'profile_id': profile_id,
-                        'from_country': row_a['country'],
-                        'from_city': row_a['city'],
-                        'to_country': row_b['country'],
-                        'to_city': row_b['city'],
-                        'fpp_delta_usd': fpp_delta,
-                        'rfpg_percent': rfpg * 100 if not np.isnan(rfpg) else np.nan,
-                        'pc_fpp_delta_usd': pc_delta
-                    })
-    
-    df_comparisons = pd.DataFrame(comparisons)
+    # Calcula deltas entre países para cada perfil (todas as cidades de uma vez)
+    df_comparisons = pairwise_comparison_table(df_cross)
     
     return df_cross, df_comparisons
 
 
+def pairwise_comparison_matrices(df_cross):
+    """
+    Matrizes densas de comparação cidade × cidade por perfil (broadcasting)
+
+    Espera um bloco contíguo de linhas por perfil, com as mesmas cidades na
+    mesma ordem (formato gerado pela simulação). Retorna um dict com:
+    - profile_ids (P,) e city_rows (C,): rótulos dos eixos
+    - fpp_delta_usd (P, C, C): RDR[destino] - RDR[origem]
+    - rfpg_percent (P, C, C): FPPΔ / |RDR[origem]| * 100 (NaN se RDR origem = 0)
+    - pc_fpp_delta_usd (P, C, C): FPPΔ / (dependentes + 1)
+    O eixo 1 é a cidade de origem (from) e o eixo 2 a de destino (to).
+    """
+    profile_ids = df_cross['profile_id'].unique()
+    n_profiles = len(profile_ids)
+    n_cities = len(df_cross) // n_profiles if n_profiles else 0
+    if n_profiles * n_cities != len(df_cross):
+        raise ValueError("Todos os perfis precisam ter o mesmo número de cidades")
+
+    rdr = df_cross['renda_disponivel_real_usd'].to_numpy(dtype=float).reshape(n_profiles, n_cities)
+    dependents = df_cross['dependents'].to_numpy(dtype=float).reshape(n_profiles, n_cities)
+
+    # Diferença externa: [p, origem, destino] = rdr[p, destino] - rdr[p, origem]
+    fpp_delta = rdr[:, None, :] - rdr[:, :, None]
+
+    origin = rdr[:, :, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rfpg = np.where(origin != 0, fpp_delta / np.abs(origin), np.nan) * 100
+
+    pc_delta = fpp_delta / (dependents[:, :, None] + 1)
+
+    return {
+        'profile_ids': profile_ids,
+        'city_rows': df_cross.iloc[:n_cities][['country', 'city']].reset_index(drop=True),
+        'fpp_delta_usd': fpp_delta,
+        'rfpg_percent': rfpg,
+        'pc_fpp_delta_usd': pc_delta,
+    }
+
+
+def pairwise_comparison_table(df_cross):
+    """
+    Tabela longa de comparações (uma linha por par ordenado origem ≠ destino)
+
+    Mesma ordem e colunas do loop original: por perfil, origem no laço
+    externo e destino no interno.
+    """
+    matrices = pairwise_comparison_matrices(df_cross)
+    n_profiles = len(matrices['profile_ids'])
+    cities = matrices['city_rows']
+    n_cities = len(cities)
+
+    # Pares fora da diagonal em ordem linha-maior (origem, destino)
+    origin_idx, dest_idx = np.nonzero(~np.eye(n_cities, dtype=bool))
+    n_pairs = len(origin_idx)
+    origin_all = np.tile(origin_idx, n_profiles)
+    dest_all = np.tile(dest_idx, n_profiles)
+
+    return pd.DataFrame({
+        'profile_id': np.repeat(matrices['profile_ids'], n_pairs),
+        'from_country': cities['country'].to_numpy()[origin_all],
+        'from_city': cities['city'].to_numpy()[origin_all],
+        'to_country': cities['country'].to_numpy()[dest_all],
+        'to_city': cities['city'].to_numpy()[dest_all],
+        'fpp_delta_usd': matrices['fpp_delta_usd'][:, origin_idx, dest_idx].ravel(),
+        'rfpg_percent': matrices['rfpg_percent'][:, origin_idx, dest_idx].ravel(),
+        'pc_fpp_delta_usd': matrices['pc_fpp_delta_usd'][:, origin_idx, dest_idx].ravel(),
+    })
+
+
 # ============================================================================
 # 8. PIPELINE PRINCIPAL
 # ============================================================================
 
-def main():
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera a camada SILVER (enriched)")
+    parser.add_argument(
+        '--format',
+        choices=sorted(storage.FORMATS),
+        default=storage.DEFAULT_FORMAT,
+        help=f"Formato de armazenamento (padrão: {storage.DEFAULT_FORMAT})"
+    )
+    parser.add_argument(
+        '--export-csv',
+        action='store_true',
+        help="Grava também cópias CSV dos datasets (consumo no Power BI)"
+    )
+    parser.add_argument(
+        '--zscore-by',
+        default=ZSCORE_GROUP_BY,
+        choices=['country', 'region_br', 'city_br'],
+        help=f"Chave de agrupamento dos z-scores (padrão: {ZSCORE_GROUP_BY})"
+    )
+    parser.add_argument(
+        '--profile-grid',
+        action='store_true',
+        help="Simula também a grade completa de perfis (faixas salariais × dependentes × "
+             "moradia × composição) em todas as cidades: cross_country_profile_grid"
+    )
+    parser.add_argument(
+        '--export-views',
+        action='store_true',
+        help="Materializa as visões por pessoa (people_enriched, household_costs_enriched, ...) "
+             "além da tabela larga people_wide"
+    )
+    parser.add_argument(
+        '--by-country',
+        action='store_true',
+        help="Processa cada país de people_raw como partição independente, em paralelo"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help="Processos para as partições de --by-country (0 = todos os núcleos)"
+    )
+    return parser.parse_args()
+
+
+def people_countries(raw_dir=RAW_DIR):
+    """Países presentes em people_raw (lê só a coluna country); None em árvores sem a coluna"""
+    if 'country' not in storage.dataset_columns(raw_dir, 'people_raw'):
+        return None
+    countries = storage.read_table(raw_dir, 'people_raw', columns=['country'])['country']
+    return [str(country) for country in countries.unique()]
+
+
+def compute_country_partition(country, zscore_by=ZSCORE_GROUP_BY, raw_dir=RAW_DIR):
     """
-    Executa todo o pipeline de enriquecimento
+    Métricas por pessoa de um país (executado num worker)
+
+    Lê só as linhas do país em people_raw (filtro empurrado para a leitura),
+    converte as tabelas de referência do país para REPORTING_CURRENCY uma
+    única vez e ajusta as estatísticas de normalização da partição.
+    Retorna (país, colunas de people_wide sem normalização, detalhamento de
+    benefícios, modelo parcial).
     """
-    print("=" * 70)
-    print("SILVER LAYER - FEATURE ENGINEERING")
-    print("=" * 70)
+    people = storage.read_table(raw_dir, 'people_raw', filters={'country': country})
+    economic, cultural, opportunity, social = load_person_reference_tables(raw_dir, [country])
+    df = compute_person_metrics(people, economic, cultural, opportunity, social)
+    model = normalization_model.fit(df, zscore_by, ZSCORE_METRICS, MINMAX_METRICS)
+    return country, generate_people_wide(df), generate_social_benefits_enriched(df, social), model
+
+
+def build_people_wide_by_country(fmt=None, zscore_by=ZSCORE_GROUP_BY, export_views=False,
+                                 export_csv=False, workers=0, countries=None):
+    """
+    Modo particionado por país: cada partição é calculada de forma independente
+
+    As partições rodam em paralelo num pool de processos; só as estatísticas
+    de normalização (z-score por grupo dentro do país e min/max) são
+    combinadas, e cada partição vira uma parte de people_wide e de
+    social_benefits_enriched. O resultado é o mesmo do modo único, com as
+    linhas agrupadas por país. zscore_by precisa estar contido no país
+    (country, region_br ou city_br).
+    """
+    countries = countries or people_countries()
+    print(f"🌍 Partições por país: {', '.join(countries)}")
+    workers = min(workers or os.cpu_count(), len(countries))
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partitions = list(pool.map(compute_country_partition, countries,
+                                       [zscore_by] * len(countries), [RAW_DIR] * len(countries)))
+    else:
+        partitions = [compute_country_partition(country, zscore_by) for country in countries]
+    for country, wide, benefits, _ in partitions:
+        print(f"   ✓ {country}: {len(wide):,} pessoas, RDR médio R$ {wide['renda_disponivel_real'].mean():,.2f}")
+    print(f"   ✓ {len(partitions)} partições em {time.perf_counter() - start:.2f}s ({workers} worker(s))")
     print()
-    
+
+    print("📐 Aplicando normalizações...")
+    model = normalization_model.merge([partition[3] for partition in partitions])
+    version = normalization_model.save(model, ENRICHED_DIR, normalization_model.SILVER_MODEL,
+                                       metadata={'people': sum(len(p[1]) for p in partitions),
+                                                 'partitions': countries})
+    print(f"   ✓ Z-scores por {zscore_by}, Min-Max global (modelo versão {version})")
+    print()
+
+    print("💾 Gerando datasets enriched...")
+    rows = storage.write_blocks(
+        (generate_people_wide(normalize_metrics(wide, model=model)) for _, wide, _, _ in partitions),
+        ENRICHED_DIR, person_table.WIDE_TABLE, fmt
+    )
+    print(f"   ✓ {person_table.WIDE_TABLE} ({rows:,} linhas, {len(partitions)} partes)")
+    rows = storage.write_blocks((benefits for _, _, benefits, _ in partitions), ENRICHED_DIR,
+                                "social_benefits_enriched", fmt, csv_export=export_csv)
+    print(f"   ✓ social_benefits_enriched ({rows:,} pares pessoa × programa elegível)")
+
+    if export_views:
+        lookup = dimension_lookup(*load_person_reference_tables(RAW_DIR, countries)[:3])
+        person_table.export_views(person_table.read_wide(ENRICHED_DIR), ENRICHED_DIR,
+                                  fmt=fmt, csv_export=export_csv, lookup=lookup)
+
+
+def build_people_wide(fmt=None, zscore_by=ZSCORE_GROUP_BY, export_views=False, export_csv=False,
+                      by_country=False, workers=0):
+    """
+    Calcula todas as métricas por pessoa e grava people_wide (e o modelo de normalização)
+
+    Não depende da comparação cross-country: o orquestrador executa as duas
+    partes da camada em paralelo.
+    by_country: processa cada país como uma partição independente, em
+    paralelo (build_people_wide_by_country); workers: 0 = todos os núcleos
+    """
+    if by_country:
+        countries = people_countries()
+        if countries is not None:
+            return build_people_wide_by_country(fmt, zscore_by, export_views, export_csv, workers, countries)
+        print("   ⚠️  people_raw sem coluna country: processando como partição única")
+
     # 1. Carregamento
     print("📥 Carregando dados RAW...")
     people, economic, cultural, opportunity, social = load_raw_data()
@@ -524,66 +741,83 @@ def main():
     print(f"   ✓ {len(economic)} contextos econômicos")
     print()
     
-    # 2. Custos e Renda
-    print("💰 Calculando custos e renda disponível...")
-    df = calculate_household_costs(people, economic)
+    # 2-5. Custos e renda, métricas econômicas, acesso cultural e oportunidades
+    # numa única passada do kernel fundido (silver_kernel)
+    print("💰 Calculando métricas por pessoa (custos, renda, EPR, IAC e IOE)...")
+    df = compute_person_metrics(people, economic, cultural, opportunity, social)
     print(f"   ✓ Total Household Cost calculado")
+    print(f"   ✓ Benefícios sociais: {(df['total_social_benefits'] > 0).sum():,} beneficiários, "
+          f"média R$ {df['total_social_benefits'].mean():,.2f} por pessoa")
     print(f"   ✓ RDR médio: R$ {df['renda_disponivel_real'].mean():,.2f}")
-    print()
-    
-    # 3. Métricas Econômicas
-    print("📊 Calculando métricas econômicas...")
-    df = calculate_economic_metrics(df)
     print(f"   ✓ EPR médio: {df['economic_pressure_ratio'].mean():.2f}")
     print(f"   ✓ Custo per capita médio: R$ {df['cost_per_capita'].mean():,.2f}")
-    print()
-    
-    # 4. Acesso Cultural
-    print("🎭 Calculando acesso cultural...")
-    df = calculate_cultural_access(df, cultural)
     print(f"   ✓ IAC médio: {df['iac_raw'].mean():.2f}")
-    print()
-    
-    # 5. Oportunidades Econômicas
-    print("🎯 Calculando oportunidades econômicas...")
-    df = calculate_opportunity_access(df, opportunity)
     print(f"   ✓ IOE médio: {df['ioe_raw'].mean():.2f}")
     print()
     
     # 6. Normalização
     print("📐 Aplicando normalizações...")
-    df = normalize_metrics(df)
-    print(f"   ✓ Z-scores calculados por país")
+    model = normalization_model.fit(df, zscore_by, ZSCORE_METRICS, MINMAX_METRICS)
+    df = normalize_metrics(df, model=model)
+    version = normalization_model.save(model, ENRICHED_DIR, normalization_model.SILVER_MODEL,
+                                       metadata={'people': len(df)})
+    print(f"   ✓ Z-scores calculados por {zscore_by}")
     print(f"   ✓ Min-Max aplicado para dashboard")
+    print(f"   ✓ Modelo de normalização salvo (versão {version})")
     print()
     
     # 7. Gerar outputs
     print("💾 Gerando datasets enriched...")
     
-    people_enriched = generate_people_enriched(df)
-    people_enriched.to_csv(ENRICHED_DIR / "people_enriched.csv", index=False)
-    print(f"   ✓ people_enriched.csv ({len(people_enriched):,} linhas)")
+    people_wide = generate_people_wide(df)
+    storage.write_table(people_wide, ENRICHED_DIR, person_table.WIDE_TABLE, fmt)
+    print(f"   ✓ {person_table.WIDE_TABLE} ({len(people_wide):,} linhas, {people_wide.shape[1]} colunas)")
     
-    household_enriched = generate_household_costs_enriched(df)
-    household_enriched.to_csv(ENRICHED_DIR / "household_costs_enriched.csv", index=False)
-    print(f"   ✓ household_costs_enriched.csv ({len(household_enriched):,} linhas)")
+    benefits = generate_social_benefits_enriched(df, social)
+    storage.write_table(benefits, ENRICHED_DIR, "social_benefits_enriched", fmt, csv_export=export_csv)
+    print(f"   ✓ social_benefits_enriched ({len(benefits):,} pares pessoa × programa elegível)")
     
-    cultural_enriched = generate_cultural_access_enriched(df)
-    cultural_enriched.to_csv(ENRICHED_DIR / "cultural_access_enriched.csv", index=False)
-    print(f"   ✓ cultural_access_enriched.csv ({len(cultural_enriched):,} linhas)")
+    # Visões por pessoa (people/household/cultural/opportunity) sob demanda;
+    # custos por cidade/país consultados nas dimensões só na exportação
+    if export_views:
+        person_table.export_views(people_wide, ENRICHED_DIR, fmt=fmt, csv_export=export_csv,
+                                  lookup=dimension_lookup(economic, cultural, opportunity))
+
+
+def build_cross_country(fmt=None, export_csv=False, profile_grid=False):
+    """Gera as simulações e comparações cross-country (só dependem do contexto econômico)"""
+    print("🌍 Gerando comparações cross-country...")
+    economic = load_reference_tables()[0]
+    df_cross, df_comparisons = generate_cross_country_comparison(None, economic)
+    storage.write_table(df_cross, ENRICHED_DIR, "cross_country_family_simulation", fmt, csv_export=export_csv)
+    storage.write_table(df_comparisons, ENRICHED_DIR, "cross_country_family_comparison", fmt, csv_export=export_csv)
+    print(f"   ✓ cross_country_family_simulation ({len(df_cross):,} linhas)")
+    print(f"   ✓ cross_country_family_comparison ({len(df_comparisons):,} linhas)")
     
-    opportunity_enriched = generate_opportunity_access_enriched(df)
-    opportunity_enriched.to_csv(ENRICHED_DIR / "opportunity_access_enriched.csv", index=False)
-    print(f"   ✓ opportunity_access_enriched.csv ({len(opportunity_enriched):,} linhas)")
+    if profile_grid:
+        grid = profile_simulation.build_profile_grid()
+        df_grid = profile_simulation.simulate_profiles(grid, economic)
+        storage.write_table(df_grid, ENRICHED_DIR, "cross_country_profile_grid", fmt, csv_export=export_csv)
+        print(f"   ✓ cross_country_profile_grid ({len(grid):,} perfis × {len(economic)} cidades = {len(df_grid):,} linhas)")
+
+
+def main():
+    """
+    Executa todo o pipeline de enriquecimento
+    """
+    args = parse_args()
+
+    print("=" * 70)
+    print("SILVER LAYER - FEATURE ENGINEERING")
+    print("=" * 70)
+    print()
+    
+    build_people_wide(args.format, args.zscore_by, args.export_views, args.export_csv,
+                      args.by_country, args.workers)
     
     # 8. Comparação cross-country
     print()
-    print("🌍 Gerando comparações cross-country...")
-    df_cross, df_comparisons = generate_cross_country_comparison(people, economic)
-    df_cross.to_csv(ENRICHED_DIR / "cross_country_family_simulation.csv", index=False)
-    df_comparisons.to_csv(ENRICHED_DIR / "cross_country_family_comparison.csv", index=False)
-    print(f"   ✓ cross_country_family_simulation.csv ({len(df_cross):,} linhas)")
-    print(f"   ✓ cross_country_family_comparison.csv ({len(df_comparisons):,} linhas)")
+    build_cross_country(args.format, args.export_csv, args.profile_grid)
     
     print()
     print("=" * 70)
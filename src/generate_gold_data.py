@@ -4,20 +4,48 @@ Camada final: scores consolidados, clusters, rankings e cenários
 Design otimizado para Power BI
 """
 
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import operator
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
+from scipy.optimize import linear_sum_assignment
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score
+from sklearn.metrics import (adjusted_rand_score, calinski_harabasz_score, pairwise_distances_argmin_min,
+                             silhouette_score)
 import warnings
 warnings.filterwarnings('ignore')
 
+import normalization_model
+import paths
+import person_table
+import profile_simulation
+import social_benefits
+import storage
+
 # ============================================================================
 # CONFIGURAÇÕES
 # ============================================================================
 
-INPUT_DIR = '../enriched/'
-OUTPUT_DIR = '../gold/'
+INPUT_DIR = paths.ENRICHED_DIR
+OUTPUT_DIR = paths.GOLD_DIR
+
+# Execuções filtradas (--country/--region/--city) gravam num subdiretório por
+# filtro, sem substituir os datasets da população inteira
+SUBSET_DIR = OUTPUT_DIR / 'subsets'
+
+# Escala do QLES (0 a QLES_SCALE)
+QLES_SCALE = 100
 
 # Pesos para o QLES (Quality of Life Economic Score)
 QLES_WEIGHTS = {
@@ -28,55 +56,264 @@ QLES_WEIGHTS = {
     'social_support_inverse': 0.10
 }
 
+# Clusterização (create_clusters): modo do ajuste final do K-Means
+# 'exact'     KMeans(n_init=10) em todas as linhas (comportamento original)
+# 'minibatch' MiniBatchKMeans em todas as linhas
+# 'sample'    KMeans(n_init=10) numa amostra estratificada pela renda
+# 'auto'      exact até CLUSTER_EXACT_MAX_ROWS linhas, sample acima disso
+# Nos modos escaláveis a população é atribuída ao centróide mais próximo
+# em blocos de CLUSTER_PREDICT_CHUNK linhas (memória limitada)
+CLUSTER_MODES = ['auto', 'exact', 'minibatch', 'sample']
+CLUSTER_MODE = 'auto'
+CLUSTER_EXACT_MAX_ROWS = 500_000
+CLUSTER_FIT_SAMPLE = 200_000
+CLUSTER_STRATA = 20
+CLUSTER_BATCH_SIZE = 4096
+CLUSTER_INIT_SIZE = 100_000
+CLUSTER_PREDICT_CHUNK = 1_000_000
+
+# Seleção de k: candidatos avaliados em paralelo numa amostra de
+# CLUSTER_SELECTION_SAMPLE linhas; a silhouette (O(n²)) usa uma subamostra
+# e o Calinski–Harabasz (O(n)) a amostra inteira
+CLUSTER_K_RANGE = (4, 6)
+CLUSTER_K_CRITERIA = ['silhouette', 'calinski_harabasz']
+CLUSTER_K_CRITERION = 'silhouette'
+CLUSTER_SELECTION_SAMPLE = 20_000
+CLUSTER_SILHOUETTE_SAMPLE = 5_000
+CLUSTER_K_WORKERS = 0  # 0 = todos os núcleos
+
+# Cache de k e centróides por hash da matriz de features
+CLUSTER_CACHE_FILE = 'cluster_cache.json'
+CLUSTER_CACHE_ENTRIES = 8
+
+# Features da clusterização - USAR EPR_CLEAN em vez de EPR
+CLUSTER_FEATURES = ['renda_disponivel_real_zscore', 'epr_clean',
+                    'iac_raw_zscore', 'ioe_raw_zscore', 'cost_per_capita']
+
+# Modelo de clusters persistido (scaler + centróides + rótulos, artefato
+# normalization_model.CLUSTER_MODEL na GOLD):
+# 'auto'   reaproveita o modelo salvo enquanto o drift ficar até
+#          CLUSTER_DRIFT_THRESHOLD (e a faixa de k/critério não mudar)
+# 'assign' só atribui aos centróides salvos, qualquer que seja o drift
+# 'refit'  reajusta sempre (os IDs seguem pareados com o modelo anterior)
+CLUSTER_MODEL_MODES = ['auto', 'assign', 'refit']
+CLUSTER_MODEL_MODE = 'auto'
+CLUSTER_DRIFT_THRESHOLD = 0.10
+
+# Alta dependência: benefícios acima desta fração do salário líquido. Como o
+# social_support_ratio é benefícios / (salário + benefícios), o limiar da flag
+# é r / (1 + r) (≈ 0,23); quem só tem benefícios (ratio 1) sempre entra
+HIGH_DEPENDENCY_BENEFIT_TO_SALARY = 0.3
+
+# Flags de vulnerabilidade (create_vulnerability_flags): cada flag exige todas
+# as condições (coluna, operador, limiar); 'epr' é o epr_clean com fallback
+# para o EPR original
+VULNERABILITY_FLAGS = {
+    # Alta pressão E renda disponível negativa/baixa
+    'high_vulnerability': [('epr', '>', 0.8), ('renda_disponivel_real', '<', 500)],
+    # Alta dependência de suporte social (benefícios > 30% do salário líquido)
+    'high_dependency': [('social_support_ratio', '>',
+                         HIGH_DEPENDENCY_BENEFIT_TO_SALARY / (1 + HIGH_DEPENDENCY_BENEFIT_TO_SALARY))],
+    # Pressão extrema
+    'extreme_pressure': [('epr', '>', 0.9)],
+    # Renda negativa (não consegue cobrir custos básicos)
+    'negative_income': [('renda_disponivel_real', '<', 0)],
+}
+COMPARISONS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+# Grupos de risco: regras em ordem de prioridade (vale a primeira que casar);
+# 'all' exige todas as flags e 'any' ao menos uma; sem regra → RISK_DEFAULT_GROUP
+RISK_TIERS = [
+    ('Risco Crítico', {'all': ['high_vulnerability', 'high_dependency']}),
+    ('Risco Alto', {'any': ['high_vulnerability', 'extreme_pressure']}),
+    ('Risco Moderado', {'all': ['negative_income']}),
+]
+RISK_DEFAULT_GROUP = 'Risco Baixo'
+
+# Cenários de política (simulate_policy_scenarios): choques sobre a renda
+# disponível em fração (0.20 = +20%; ver SCENARIO_SHOCKS): rent (aluguel),
+# benefit (benefícios sociais), wage (salário líquido), tax (alíquota
+# efetiva, em pontos) e fx (câmbio). 'response' + base/weight definem o QLES
+# após o choque (ver SCENARIO_RESPONSES)
+POLICY_SCENARIOS = [
+    {'name': 'Aluguel +20%', 'shocks': {'rent': 0.20},
+     'response': 'proportional', 'base': 0.65, 'weight': 0.35},
+    {'name': 'Benefícios -15%', 'shocks': {'benefit': -0.15},
+     'response': 'penalty', 'base': 0.90, 'weight': 0.10},
+]
+HOUSING_COST_SHARE = 0.35  # Assumindo habitação = 35% do custo
+FX_COST_SHARE = 0.20       # Parcela do custo sensível ao câmbio
+
+# Células (cenários × pessoas) avaliadas por bloco; cada bloco é gravado
+# como uma parte do dataset, então centenas de cenários não ficam em memória
+SCENARIO_BLOCK_CELLS = 20_000_000
+SCENARIO_REPORT_LIMIT = 10
+
+# Outputs calculados linha a linha na partição de cada país (--by-country);
+# os cenários usam o QLES já gravado. QLES, clusters e rankings dependem da
+# população inteira (escala e centróides globais) e rodam uma única vez.
+PARTITIONED_OUTPUTS = ['vulnerability_and_risk', 'policy_scenarios']
+
+# Colunas geográficas do QLES (também as chaves de partição do dataset em disco)
+QLES_GEO_COLUMNS = ['country', 'region_br', 'city']
+
+# Colunas por pessoa e datasets auxiliares exigidos por cada output GOLD
+# ('requires' lista outputs que precisam ser calculados antes; 'params' as
+# configurações deste módulo que alteram o resultado)
+GOLD_OUTPUTS = {
+    'quality_of_life_score': {
+        'columns': ['region_br', 'city', 'renda_disponivel_real_zscore', 'epr_clean', 'economic_pressure_ratio',
+                    'iac_raw_zscore', 'ioe_raw_zscore', 'social_support_ratio'],
+        'datasets': [],
+        'params': ['QLES_WEIGHTS'],
+    },
+    'socioeconomic_clusters': {
+        'columns': ['renda_disponivel_real_zscore', 'epr_clean', 'iac_raw_zscore', 'ioe_raw_zscore',
+                    'cost_per_capita', 'renda_disponivel_real', 'gross_salary_brl'],
+        'datasets': [],
+        'params': ['CLUSTER_K_RANGE', 'CLUSTER_K_CRITERION'],
+    },
+    'country_rankings_by_profile': {
+        'columns': [],
+        'datasets': ['cross_country_family_simulation'],
+    },
+    'profile_grid_rankings': {
+        'columns': [],
+        'datasets': ['cross_country_profile_grid'],
+        'optional': True,  # Só com --outputs; exige enriched --profile-grid
+    },
+    'vulnerability_and_risk': {
+        'columns': ['epr_clean', 'economic_pressure_ratio', 'renda_disponivel_real', 'social_support_ratio'],
+        'datasets': [],
+        'params': ['VULNERABILITY_FLAGS', 'RISK_TIERS'],
+    },
+    'policy_scenarios': {
+        'columns': ['renda_disponivel_real', 'cost_per_capita', 'receives_social_benefit', 'total_social_benefits',
+                    'net_salary_brl', 'gross_salary_brl'],
+        'datasets': [],
+        'requires': ['quality_of_life_score'],
+        'params': ['POLICY_SCENARIOS', 'HOUSING_COST_SHARE', 'FX_COST_SHARE', 'SCENARIO_MAX_GAIN'],
+    },
+}
+
+# Visão SILVER de origem das colunas que não estão em people_enriched
+# (usado apenas em árvores sem a tabela larga people_wide)
+SILVER_COLUMN_SOURCES = {
+    'iac_raw_zscore': 'cultural_access_enriched',
+    'ioe_raw_zscore': 'opportunity_access_enriched',
+}
+
+# Nomes usados na GOLD -> nomes em disco na SILVER
+SILVER_COLUMN_ALIASES = {
+    'city': 'city_br',
+}
+
 # ============================================================================
 # 1️⃣ CARREGAR DADOS SILVER
 # ============================================================================
 
-def load_silver_data():
-    """Carrega todos os datasets SILVER necessários"""
+def resolve_outputs(outputs=None):
+    """
+    Expande a lista de outputs pedidos com suas dependências, na ordem do pipeline
+
+    Sem lista explícita, gera todos os outputs exceto os marcados como optional.
+    """
+    requested = set(outputs or [o for o, spec in GOLD_OUTPUTS.items() if not spec.get('optional')])
+    for output in list(requested):
+        requested.update(GOLD_OUTPUTS[output].get('requires', []))
+    return [output for output in GOLD_OUTPUTS if output in requested]
+
+
+def load_silver_data(outputs=None, filters=None, with_person_id=False):
+    """
+    Carrega apenas os dados SILVER necessários para os outputs pedidos
+
+    outputs: nomes em GOLD_OUTPUTS (padrão: todos); datasets e colunas que
+             nenhum output usa não são lidos
+    filters: {coluna: valor ou lista}, ex. {'region_br': 'NE'} ou
+             {'city': ['Recife', 'Natal']}; aplicados já na leitura
+    with_person_id: inclui também o UUID externo (person_id) quando existe;
+                    por padrão só a chave inteira person_key é lida
+    Retorna (base por pessoa, simulação cross-country); cada um é None
+    quando nenhum output pedido precisa dele.
+    """
     print("📥 Carregando dados SILVER...")
-    
-    people = pd.read_csv(f'{INPUT_DIR}people_enriched.csv')
-    household = pd.read_csv(f'{INPUT_DIR}household_costs_enriched.csv')
-    cultural = pd.read_csv(f'{INPUT_DIR}cultural_access_enriched.csv')
-    opportunity = pd.read_csv(f'{INPUT_DIR}opportunity_access_enriched.csv')
-    simulation = pd.read_csv(f'{INPUT_DIR}cross_country_family_simulation.csv')
-    comparison = pd.read_csv(f'{INPUT_DIR}cross_country_family_comparison.csv')
-    
-    # Consolidar features relevantes
-    base = people[['person_id', 'age', 'gender', 'city_br', 'education_level', 
-                   'job_category', 'gross_salary_brl', 'dependents', 'receives_social_benefit',
-                   'renda_disponivel_real', 'economic_pressure_ratio', 'epr_clean',
-                   'cost_per_capita', 'social_support_ratio', 
-                   'renda_disponivel_real_zscore']].copy()
-    
-    # Adicionar features culturais
-    base = base.merge(
-        cultural[['person_id', 'iac_raw_zscore']],
-        on='person_id',
-        how='left'
-    )
-    
-    # Adicionar features de oportunidade
-    base = base.merge(
-        opportunity[['person_id', 'ioe_raw_zscore']],
-        on='person_id',
-        how='left'
-    )
-    
-    base['country'] = 'Brazil'
-    base.rename(columns={'city_br': 'city'}, inplace=True)
-    
-    print(f"✅ Dados consolidados: {len(base)} registros")
-    print(f"   Colunas: {', '.join(base.columns)}\n")
-    
-    return base, simulation, comparison
+
+    outputs = resolve_outputs(outputs)
+    filters = {SILVER_COLUMN_ALIASES.get(col, col): value for col, value in (filters or {}).items()}
+
+    # Colunas por pessoa exigidas, agrupadas pelo dataset de origem
+    needed = {}
+    for output in outputs:
+        for col in GOLD_OUTPUTS[output]['columns']:
+            col = SILVER_COLUMN_ALIASES.get(col, col)
+            source = SILVER_COLUMN_SOURCES.get(col, 'people_enriched')
+            needed.setdefault(source, [person_table.PERSON_KEY])
+            if col not in needed[source]:
+                needed[source].append(col)
+
+    base = None
+    if needed and person_table.has_wide_table(INPUT_DIR):
+        # Tabela larga: uma única leitura projetada, sem joins
+        columns = list(dict.fromkeys(col for cols in needed.values() for col in cols))
+        available = storage.dataset_columns(INPUT_DIR, person_table.WIDE_TABLE)
+        if with_person_id and 'person_id' in available:
+            columns.insert(1, 'person_id')
+        if 'country' in available and 'country' not in columns:
+            columns.append('country')
+        wide_filters = {col: value for col, value in filters.items() if col in available}
+        base = person_table.read_wide(INPUT_DIR, columns=columns, filters=wide_filters)
+
+    elif needed:
+        # Árvores antigas (sem people_wide): people_enriched é a base e as
+        # demais visões são unidas por person_key; filtros são empurrados para
+        # cada leitura quando a coluna existe naquele dataset
+        for dataset in ['people_enriched'] + [d for d in needed if d != 'people_enriched']:
+            columns = list(needed.get(dataset, [person_table.PERSON_KEY]))
+            available = storage.dataset_columns(INPUT_DIR, dataset)
+            if base is None and with_person_id and 'person_id' in available:
+                columns.insert(1, 'person_id')
+            dataset_filters = {col: value for col, value in filters.items() if col in available}
+            frame = person_table.read_person_view(INPUT_DIR, dataset, columns=columns, filters=dataset_filters)
+
+            if base is None:
+                base = frame
+            else:
+                base = base.merge(frame, on=person_table.PERSON_KEY, how='left')
+
+    if base is not None:
+        if 'country' not in base.columns:
+            # Árvores antigas (people_wide sem country): população só do Brasil
+            base['country'] = 'Brazil'
+
+        # Filtros sobre colunas que não existem em disco (ex.: country)
+        for col, value in filters.items():
+            if col in base.columns:
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                base = base[base[col].isin(list(values))]
+        base = base.reset_index(drop=True)
+        base.rename(columns={'city_br': 'city'}, inplace=True)
+
+        print(f"✅ Dados consolidados: {len(base)} registros")
+        print(f"   Colunas: {', '.join(base.columns)}")
+
+    simulation = None
+    if any('cross_country_family_simulation' in GOLD_OUTPUTS[o]['datasets'] for o in outputs):
+        simulation = storage.read_table(INPUT_DIR, 'cross_country_family_simulation')
+        print(f"✅ Simulação cross-country: {len(simulation)} registros")
+
+    print()
+    return base, simulation
+
+def id_columns(df):
+    """Colunas de identificação por pessoa presentes no frame (person_key e, se lido, person_id)"""
+    return [col for col in (person_table.PERSON_KEY, 'person_id') if col in df.columns]
 
 # ============================================================================
 # 2️⃣ QUALITY OF LIFE ECONOMIC SCORE (QLES)
 # ============================================================================
 
-def calculate_qles(df):
+def calculate_qles(df, model=None, return_model=False):
     """
     Calcula o QLES (Quality of Life Economic Score)
     
@@ -84,10 +321,13 @@ def calculate_qles(df):
            0.15*IOE_zscore + 0.10*(1-social_support_ratio)
     
     Normalizado para escala 0-100
+    model: escala min/max do QLES_raw já ajustada (normalization_model);
+           sem ela, a escala é ajustada na população recebida
+    return_model=True devolve (output, escala usada)
     """
     print("🧮 Calculando QLES (Quality of Life Economic Score)...")
     
-    qles_df = df[['person_id', 'country', 'city']].copy()
+    qles_df = df[id_columns(df) + QLES_GEO_COLUMNS].copy()
     
     # Componentes intermediários (para explicabilidade)
     qles_df['component_rdr'] = df['renda_disponivel_real_zscore'] * QLES_WEIGHTS['rdr_zscore']
@@ -114,9 +354,9 @@ def calculate_qles(df):
     )
     
     # Normalizar para escala 0-100
-    qles_min = qles_df['QLES_raw'].min()
-    qles_max = qles_df['QLES_raw'].max()
-    qles_df['QLES'] = ((qles_df['QLES_raw'] - qles_min) / (qles_max - qles_min)) * 100
+    if model is None:
+        model = normalization_model.fit_range(qles_df['QLES_raw'])
+    qles_df['QLES'] = normalization_model.apply_range(qles_df['QLES_raw'], model, scale=QLES_SCALE)
     
     # Criar buckets interpretativos
     qles_df['QLES_bucket'] = pd.cut(
@@ -127,7 +367,7 @@ def calculate_qles(df):
     )
     
     # Selecionar colunas finais
-    output = qles_df[['person_id', 'country', 'city', 'QLES', 'QLES_bucket',
+    output = qles_df[id_columns(df) + QLES_GEO_COLUMNS + ['QLES', 'QLES_bucket',
                       'component_rdr', 'component_epr', 'component_iac', 
                       'component_ioe', 'component_social']]
     
@@ -138,61 +378,70 @@ def calculate_qles(df):
     print(output['QLES_bucket'].value_counts().sort_index())
     print()
     
+    if return_model:
+        return output, model
     return output
 
 # ============================================================================
 # 3️⃣ CLUSTERIZAÇÃO SOCIOECONÔMICA
 # ============================================================================
 
-def create_clusters(df):
+def create_clusters(df, mode=CLUSTER_MODE, check=False, k_range=CLUSTER_K_RANGE,
+                    criterion=CLUSTER_K_CRITERION, workers=CLUSTER_K_WORKERS, use_cache=True,
+                    model=None, model_mode=CLUSTER_MODEL_MODE, drift_threshold=CLUSTER_DRIFT_THRESHOLD,
+                    return_model=False):
     """
     Clusterização interpretável usando K-Means
     Features: RDR_zscore, EPR, IAC_zscore, IOE_zscore, cost_per_capita
+
+    mode: modo do ajuste final (ver CLUSTER_MODES)
+    check: ajusta também o K-Means exato e informa a concordância dos
+           rótulos (Adjusted Rand Index) e o tempo de cada ajuste
+    k_range: (mínimo, máximo) de clusters avaliados na seleção de k
+    criterion: critério da seleção (ver CLUSTER_K_CRITERIA)
+    workers: processos para avaliar os candidatos (0 = todos os núcleos)
+    use_cache: reaproveita k e centróides quando a matriz de features não mudou
+    model: modelo de clusters salvo; um reajuste mantém os IDs dos clusters
+           equivalentes (ver match_cluster_ids)
+    model_mode: uso do modelo salvo (ver CLUSTER_MODEL_MODES); no modo auto a
+                população só é atribuída aos centróides salvos enquanto o
+                drift ficar até drift_threshold
+    return_model: devolve também o modelo (o próprio `model` se não houve reajuste)
     """
     print("🔬 Executando clusterização socioeconômica...")
     
-    # Features para clustering - USAR EPR_CLEAN em vez de EPR
-    features = ['renda_disponivel_real_zscore', 'epr_clean', 
-                'iac_raw_zscore', 'ioe_raw_zscore', 'cost_per_capita']
-    
-    X = df[features].copy()
-    
-    # Tratar valores infinitos e NaN
-    X = X.replace([np.inf, -np.inf], np.nan)
-    
-    # Para EPR_CLEAN que é NaN, usar mediana do EPR válido
-    for col in X.columns:
-        if X[col].isna().any():
-            X[col] = X[col].fillna(X[col].median())
-    
-    # Padronizar features
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    
-    # Testar k entre 4 e 6 (elbow + silhouette)
-    # Para performance, testar com amostra menor
-    sample_size = min(2000, len(X_scaled))
-    sample_indices = np.random.choice(len(X_scaled), sample_size, replace=False)
-    X_sample = X_scaled[sample_indices]
-    
-    best_k = 4
-    best_score = -1
+    # Tratar valores infinitos (NaN é preenchido com a mediana mais abaixo)
+    X = df[CLUSTER_FEATURES].replace([np.inf, -np.inf], np.nan)
+    
+    refit = True
+    if model is not None and model_mode != 'refit':
+        cluster_ids, drift = assign_to_model(X, model)
+        settings_changed = model['k_range'] != list(k_range) or model['criterion'] != criterion
+        if model_mode == 'assign' or (drift <= drift_threshold and not settings_changed):
+            print(f"✅ Modelo de clusters v{model['version']} (k={model['k']}): só atribuição, sem reajuste "
+                  f"(drift={drift:.3f}, limite {drift_threshold})")
+            df['cluster_id'] = cluster_ids
+            cluster_labels = {int(cid): names for cid, names in model['labels'].items()}
+            refit = False
+        elif settings_changed:
+            print(f"🔄 Faixa de k ou critério diferentes do modelo v{model['version']}: reajustando")
+        else:
+            print(f"🔄 Drift {drift:.3f} acima do limite {drift_threshold} (modelo v{model['version']}): reajustando")
     
-    for k in range(4, 7):
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10, max_iter=100)
-        labels = kmeans.fit_predict(X_sample)
-        score = silhouette_score(X_sample, labels)
-        print(f"   k={k}: silhouette={score:.3f}")
+    if refit:
+        # Para EPR_CLEAN que é NaN, usar mediana do EPR válido
+        fill = X.median()
+        X = X.fillna(fill)
         
-        if score > best_score:
-            best_score = score
-            best_k = k
-    
-    print(f"✅ Melhor k={best_k} (silhouette={best_score:.3f})")
-    
-    # Clustering final com todos os dados
-    kmeans = KMeans(n_clusters=best_k, random_state=42, n_init=10, max_iter=100)
-    df['cluster_id'] = kmeans.fit_predict(X_scaled)
+        # Padronizar features
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        best_k, centroids = fit_clusters(X_scaled, mode, check, k_range, criterion, workers, use_cache)
+        positions, inertia = predict_in_chunks(centroids, X_scaled, return_inertia=True)
+        
+        # IDs estáveis: clusters equivalentes aos do modelo anterior mantêm o ID
+        ids = np.arange(best_k) if model is None else match_cluster_ids(centroids, scaler, model)
+        df['cluster_id'] = ids[positions]
     
     # Calcular métricas médias por cluster - AGREGAÇÃO EXPLÍCITA CORRETA
     cluster_stats = df.groupby('cluster_id').agg(
@@ -202,7 +451,7 @@ def create_clusters(df):
         avg_ioe=('ioe_raw_zscore', 'mean'),
         avg_cost_per_capita=('cost_per_capita', 'mean'),
         avg_gross_salary=('gross_salary_brl', 'mean'),
-        count=('person_id', 'count')
+        count=(person_table.PERSON_KEY, 'count')
     ).round(2)
     
     # Renomear para compatibilidade
@@ -215,11 +464,86 @@ def create_clusters(df):
         'avg_gross_salary': 'gross_salary_brl'
     }, inplace=True)
     
-    # Atribuir labels interpretativos
-    cluster_labels = assign_cluster_labels(cluster_stats, best_k)
+    if refit:
+        # Atribuir labels interpretativos (com o mesmo k, cada cluster pareado
+        # herda o rótulo do modelo anterior junto com o ID)
+        if model is not None and model['k'] == best_k:
+            cluster_labels = {int(cid): names for cid, names in model['labels'].items()}
+        else:
+            cluster_labels = assign_cluster_labels(cluster_stats, best_k)
+        model = {
+            'features': CLUSTER_FEATURES,
+            'fill': fill.to_dict(),
+            'mean': scaler.mean_.tolist(),
+            'scale': scaler.scale_.tolist(),
+            'k': int(best_k),
+            'k_range': list(k_range),
+            'criterion': criterion,
+            'cluster_ids': ids.tolist(),
+            'centroids': centroids.tolist(),
+            'labels': {str(cid): names for cid, names in cluster_labels.items()},
+            'inertia': inertia,
+        }
     
     # Preparar output
-    cluster_df = df[['person_id', 'cluster_id']].copy()
+    cluster_df = cluster_output(df, cluster_stats, cluster_labels)
+    
+    print(f"\n📊 Distribuição dos clusters:")
+    print(cluster_df['cluster_label'].value_counts())
+    print()
+    
+    if return_model:
+        return cluster_df, cluster_stats, model
+    return cluster_df, cluster_stats
+
+
+def fit_clusters(X_scaled, mode, check, k_range, criterion, workers, use_cache):
+    """Seleciona k e ajusta o K-Means final; devolve (k, centróides)"""
+    if mode == 'auto':
+        mode = 'exact' if len(X_scaled) <= CLUSTER_EXACT_MAX_ROWS else 'sample'
+    k_values = list(range(k_range[0], k_range[1] + 1))
+    
+    # Matriz de features inalterada: reaproveita k e centróides da última execução
+    cache_key = cluster_cache_key(X_scaled, k_values, criterion, mode)
+    cached = load_cluster_cache().get(cache_key) if use_cache else None
+    if cached:
+        print(f"✅ k={cached['k']} e centróides reaproveitados do cache (features inalteradas)")
+        return cached['k'], np.array(cached['centroids'])
+    
+    # Seleção de k numa amostra, com os candidatos avaliados em paralelo
+    start = time.perf_counter()
+    scores = select_k(X_scaled, k_values, criterion, workers)
+    best_k = max(scores, key=scores.get)
+    for k, score in scores.items():
+        print(f"   k={k}: {criterion}={score:.3f}")
+    print(f"✅ Melhor k={best_k} ({criterion}={scores[best_k]:.3f}, {time.perf_counter() - start:.2f}s)")
+    
+    # Clustering final com todos os dados
+    start = time.perf_counter()
+    labels, centroids = fit_predict_clusters(X_scaled, best_k, mode)
+    elapsed = time.perf_counter() - start
+    print(f"   Ajuste final ({mode}, {len(X_scaled):,} linhas): {elapsed:.2f}s")
+    
+    if check and mode != 'exact':
+        start = time.perf_counter()
+        exact_labels, _ = fit_predict_clusters(X_scaled, best_k, 'exact')
+        exact_elapsed = time.perf_counter() - start
+        ari = adjusted_rand_score(exact_labels, labels)
+        print(f"   Ajuste exato: {exact_elapsed:.2f}s → {mode} {exact_elapsed / elapsed:.1f}x mais rápido, "
+              f"ARI vs exato = {ari:.4f}")
+    
+    if use_cache:
+        save_cluster_cache(cache_key, {
+            'k': int(best_k),
+            'scores': {str(k): float(v) for k, v in scores.items()},
+            'centroids': centroids.tolist(),
+        })
+    return best_k, centroids
+
+
+def cluster_output(df, cluster_stats, cluster_labels):
+    """Dataset socioeconomic_clusters: cluster, rótulo e médias do cluster de cada pessoa"""
+    cluster_df = df[id_columns(df) + ['cluster_id']].copy()
     cluster_df['cluster_label'] = cluster_df['cluster_id'].map(lambda x: cluster_labels[x]['label'])
     cluster_df['cluster_description'] = cluster_df['cluster_id'].map(lambda x: cluster_labels[x]['description'])
     
@@ -229,12 +553,179 @@ def create_clusters(df):
     cluster_df['avg_iac'] = cluster_df['cluster_id'].map(cluster_stats['iac_raw_zscore'])
     cluster_df['avg_ioe'] = cluster_df['cluster_id'].map(cluster_stats['ioe_raw_zscore'])
     cluster_df['avg_cost_per_capita'] = cluster_df['cluster_id'].map(cluster_stats['cost_per_capita'])
+    return cluster_df
+
+
+def assign_clusters(df, model, cluster_stats):
+    """
+    Atribui pessoas novas/alteradas ao modelo de clusters salvo, sem reajuste
+
+    cluster_stats: estatísticas por cluster da última execução completa
+    (índice cluster_id), usadas nas colunas avg_*.
+    """
+    X = df[CLUSTER_FEATURES].replace([np.inf, -np.inf], np.nan)
+    df = df.copy()
+    df['cluster_id'], _ = assign_to_model(X, model)
+    cluster_labels = {int(cid): names for cid, names in model['labels'].items()}
+    return cluster_output(df, cluster_stats, cluster_labels)
+
+
+def assign_to_model(X, model):
+    """
+    Atribui as linhas aos centróides salvos; devolve (cluster_id, drift)
+
+    drift = o maior entre o deslocamento das médias das features (em desvios
+    padrão do ajuste) e o aumento relativo da distância quadrática média ao
+    centróide mais próximo (inércia por linha) em relação ao ajuste.
+    """
+    X_scaled = (X.fillna(model['fill']).to_numpy(dtype=float) - np.array(model['mean'])) / np.array(model['scale'])
+    positions, inertia = predict_in_chunks(np.array(model['centroids']), X_scaled, return_inertia=True)
+    mean_shift = float(np.abs(X_scaled.mean(axis=0)).max())
+    drift = max(mean_shift, inertia / model['inertia'] - 1.0)
+    return np.array(model['cluster_ids'])[positions], drift
+
+
+def match_cluster_ids(centroids, scaler, model):
+    """
+    IDs dos novos centróides, pareados com os do modelo anterior
+
+    Centróides comparados na escala do modelo anterior; o pareamento de custo
+    mínimo (algoritmo húngaro) herda os IDs antigos, e clusters sem par
+    (k maior que o anterior) recebem os menores IDs livres.
+    """
+    old_mean, old_scale = np.array(model['mean']), np.array(model['scale'])
+    new = (centroids * scaler.scale_ + scaler.mean_ - old_mean) / old_scale
+    old = np.array(model['centroids'])
+    cost = np.linalg.norm(new[:, None, :] - old[None, :, :], axis=2)
+    rows, cols = linear_sum_assignment(cost)
+    
+    ids = np.full(len(centroids), -1)
+    ids[rows] = np.array(model['cluster_ids'])[cols]
+    free = (cid for cid in range(len(centroids) + len(old)) if cid not in set(ids))
+    for i in np.flatnonzero(ids < 0):
+        ids[i] = next(free)
+    return ids
+
+
+def fit_predict_clusters(X_scaled, k, mode):
+    """Ajusta o K-Means final no modo pedido; devolve (cluster de cada linha, centróides)"""
+    if mode == 'exact':
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10, max_iter=100)
+        labels = kmeans.fit_predict(X_scaled)
+        return labels, kmeans.cluster_centers_
+    
+    if mode == 'minibatch':
+        # Sem realocação aleatória de clusters pequenos: com a cauda longa de
+        # cost_per_capita ela desloca centróides e afasta o resultado do exato
+        kmeans = MiniBatchKMeans(n_clusters=k, random_state=42, n_init=3, max_iter=100,
+                                 batch_size=CLUSTER_BATCH_SIZE, init_size=CLUSTER_INIT_SIZE,
+                                 reassignment_ratio=0.0)
+        kmeans.fit(X_scaled)
+    elif mode == 'sample':
+        # Amostra estratificada pela renda (1ª feature): preserva as caudas
+        sample = stratified_sample(X_scaled[:, 0], CLUSTER_FIT_SAMPLE)
+        kmeans = KMeans(n_clusters=k, random_state=42, n_init=10, max_iter=100)
+        kmeans.fit(X_scaled[sample])
+    else:
+        raise ValueError(f"Modo de clusterização desconhecido: {mode!r} (opções: {', '.join(CLUSTER_MODES)})")
     
-    print(f"\n📊 Distribuição dos clusters:")
-    print(cluster_df['cluster_label'].value_counts())
-    print()
-    
-    return cluster_df, cluster_stats
+    return predict_in_chunks(kmeans.cluster_centers_, X_scaled), kmeans.cluster_centers_
+
+
+def score_k(X_sample, k, criterion):
+    """Ajusta o K-Means com k clusters na amostra e calcula o critério de seleção"""
+    labels = KMeans(n_clusters=k, random_state=42, n_init=10, max_iter=100).fit_predict(X_sample)
+    if criterion == 'silhouette':
+        # Silhouette é O(n²): calculada numa subamostra fixa
+        return silhouette_score(X_sample, labels, sample_size=min(CLUSTER_SILHOUETTE_SAMPLE, len(X_sample)),
+                                random_state=42)
+    if criterion == 'calinski_harabasz':
+        return calinski_harabasz_score(X_sample, labels)
+    raise ValueError(f"Critério desconhecido: {criterion!r} (opções: {', '.join(CLUSTER_K_CRITERIA)})")
+
+
+def select_k(X_scaled, k_values, criterion=CLUSTER_K_CRITERION, workers=CLUSTER_K_WORKERS):
+    """
+    Avalia cada k candidato numa amostra (semente fixa) e devolve {k: score}
+
+    Os candidatos são independentes e rodam em paralelo quando workers != 1.
+    """
+    rng = np.random.default_rng(42)
+    sample_size = min(CLUSTER_SELECTION_SAMPLE, len(X_scaled))
+    X_sample = X_scaled[np.sort(rng.choice(len(X_scaled), sample_size, replace=False))]
+    
+    workers = min(workers or os.cpu_count(), len(k_values))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scores = list(pool.map(score_k, repeat(X_sample), k_values, repeat(criterion)))
+    else:
+        scores = [score_k(X_sample, k, criterion) for k in k_values]
+    return dict(zip(k_values, scores))
+
+
+def cluster_cache_key(X_scaled, k_values, criterion, mode):
+    """Hash da matriz de features padronizada e das configurações da clusterização"""
+    digest = hashlib.sha256(np.ascontiguousarray(X_scaled).data)
+    settings = [k_values, criterion, mode, CLUSTER_SELECTION_SAMPLE, CLUSTER_SILHOUETTE_SAMPLE, CLUSTER_FIT_SAMPLE]
+    digest.update(json.dumps(settings).encode())
+    return digest.hexdigest()
+
+
+def load_cluster_cache():
+    path = Path(OUTPUT_DIR) / CLUSTER_CACHE_FILE
+    return json.loads(path.read_text(encoding='utf-8')) if path.is_file() else {}
+
+
+def save_cluster_cache(key, entry):
+    """Grava uma entrada no cache (mantém só as CLUSTER_CACHE_ENTRIES mais recentes)"""
+    cache = load_cluster_cache()
+    cache.pop(key, None)
+    cache[key] = entry
+    cache = dict(list(cache.items())[-CLUSTER_CACHE_ENTRIES:])
+    path = Path(OUTPUT_DIR) / CLUSTER_CACHE_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps(cache), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def stratified_sample(values, size, strata=CLUSTER_STRATA, seed=42):
+    """
+    Índices (ordenados) de uma amostra estratificada por quantis de `values`
+
+    Cada estrato contribui na proporção do seu tamanho.
+    """
+    n = len(values)
+    if size >= n:
+        return np.arange(n)
+    
+    rng = np.random.default_rng(seed)
+    edges = np.quantile(values, np.linspace(0, 1, strata + 1)[1:-1])
+    bins = np.searchsorted(edges, values, side='right')
+    picks = []
+    for stratum in range(strata):
+        members = np.flatnonzero(bins == stratum)
+        take = int(round(len(members) * size / n))
+        picks.append(rng.choice(members, min(take, len(members)), replace=False))
+    return np.sort(np.concatenate(picks))
+
+
+def predict_in_chunks(centroids, X, chunk_size=CLUSTER_PREDICT_CHUNK, return_inertia=False):
+    """
+    Centróide mais próximo de cada linha, em blocos de memória limitada
+
+    return_inertia: devolve também a distância quadrática média ao centróide
+    """
+    labels = np.empty(len(X), dtype=np.int32)
+    squared = 0.0
+    for start in range(0, len(X), chunk_size):
+        labels[start:start + chunk_size], distances = pairwise_distances_argmin_min(X[start:start + chunk_size],
+                                                                                  centroids)
+        squared += float(np.square(distances).sum())
+    if return_inertia:
+        return labels, squared / max(len(X), 1)
+    return labels
+
 
 def assign_cluster_labels(stats, k):
     """Atribui labels interpretativos aos clusters baseado nas características"""
@@ -259,7 +750,7 @@ def assign_cluster_labels(stats, k):
             ('Estabilidade Emergente', 'Pressão moderada-baixa, renda disponível média-alta, crescimento potencial'),
             ('Alta Renda Consolidada', 'Baixa pressão, alta renda disponível, amplo acesso')
         ]
-    else:  # k == 6
+    elif k == 6:
         cluster_names = [
             ('Sobrevivência Urbana', 'Alta pressão econômica, renda disponível muito baixa, acesso mínimo'),
             ('Vulnerabilidade Crítica', 'Pressão muito alta, renda disponível baixa, suporte necessário'),
@@ -268,6 +759,12 @@ def assign_cluster_labels(stats, k):
             ('Mobilidade Ascendente', 'Pressão baixa-moderada, renda disponível alta, oportunidades amplas'),
             ('Alta Renda Consolidada', 'Baixa pressão, renda disponível muito alta, acesso pleno')
         ]
+    else:
+        # Demais valores de k (faixa ampliada): faixas ordenadas pela renda disponível
+        cluster_names = [
+            (f'Faixa de Renda {i}/{k}', f'Faixa {i} de {k} por renda disponível média (1 = menor)')
+            for i in range(1, k + 1)
+        ]
     
     for i, cluster_id in enumerate(sorted_clusters.index):
         labels[cluster_id] = {
@@ -282,33 +779,17 @@ def assign_cluster_labels(stats, k):
 # ============================================================================
 
 def create_profile_rankings(simulation_df):
-    """Cria rankings contextuais baseados em perfis familiares"""
+    """
+    Cria rankings contextuais baseados em perfis familiares
+
+    Vetorizado (profile_simulation.rank_profiles): escala para grades de
+    100k+ perfis × cidades.
+    """
     print("📊 Criando rankings por perfil familiar...")
     
-    # Calcular QLES simplificado para simulação (baseado apenas em RDR per capita)
-    # Como não temos todas as features, usamos proxy
-    simulation_df['QLES_proxy'] = (
-        simulation_df['per_capita_rdr'] / simulation_df['per_capita_rdr'].max()
-    ) * 100
-    
-    # Criar ranking por perfil
-    simulation_df['rank_position'] = simulation_df.groupby('profile_id')['QLES_proxy'].rank(
-        method='dense', ascending=False
-    ).astype(int)
-    
-    # Agregar por perfil + país/cidade
-    rankings = simulation_df.groupby(['profile_id', 'description', 'country', 'city']).agg({
-        'QLES_proxy': 'mean',
-        'per_capita_rdr': 'mean',
-        'rank_position': 'first'
-    }).reset_index()
-    
-    rankings.rename(columns={
-        'QLES_proxy': 'QLES_avg',
-        'per_capita_rdr': 'avg_per_capita_rdr'
-    }, inplace=True)
-    
-    rankings = rankings.sort_values(['profile_id', 'rank_position'])
+    # QLES simplificado para simulação (baseado apenas em RDR per capita),
+    # rank denso por perfil com uma única ordenação
+    rankings = profile_simulation.rank_profiles(simulation_df)
     
     print(f"✅ Rankings criados para {rankings['profile_id'].nunique()} perfis")
     print(f"   Localizações ranqueadas: {len(rankings)}")
@@ -324,38 +805,21 @@ def create_vulnerability_flags(df):
     """Cria flags simples e interpretáveis de vulnerabilidade"""
     print("⚠️  Analisando vulnerabilidade e risco...")
     
-    vuln_df = df[['person_id']].copy()
+    vuln_df = df[id_columns(df)].copy()
     
     # Usar epr_clean quando disponível, fallback para EPR original
-    epr_to_use = df['epr_clean'].fillna(df['economic_pressure_ratio'])
+    derived = {'epr': df['epr_clean'].fillna(df['economic_pressure_ratio'])}
     
-    # Flag 1: Alta vulnerabilidade (alta pressão E renda disponível negativa/baixa)
-    vuln_df['high_vulnerability'] = (
-        (epr_to_use > 0.8) & 
-        (df['renda_disponivel_real'] < 500)
-    )
-    
-    # Flag 2: Alta dependência de suporte social
-    vuln_df['high_dependency'] = (df['social_support_ratio'] > 0.3)
-    
-    # Flag 3: Pressão extrema
-    vuln_df['extreme_pressure'] = (epr_to_use > 0.9)
-    
-    # Flag 4: Renda negativa (não consegue cobrir custos básicos)
-    vuln_df['negative_income'] = (df['renda_disponivel_real'] < 0)
+    # Flags: todas as condições (coluna, operador, limiar) de cada uma
+    for flag, conditions in VULNERABILITY_FLAGS.items():
+        mask = np.ones(len(df), dtype=bool)
+        for column, op, threshold in conditions:
+            values = derived[column] if column in derived else df[column]
+            mask &= COMPARISONS[op](values, threshold).to_numpy(dtype=bool)
+        vuln_df[flag] = mask
     
     # Classificação de grupo de risco
-    def classify_risk(row):
-        if row['high_vulnerability'] and row['high_dependency']:
-            return 'Risco Crítico'
-        elif row['high_vulnerability'] or row['extreme_pressure']:
-            return 'Risco Alto'
-        elif row['negative_income']:
-            return 'Risco Moderado'
-        else:
-            return 'Risco Baixo'
-    
-    vuln_df['risk_group'] = vuln_df.apply(classify_risk, axis=1)
+    vuln_df['risk_group'] = classify_risk(vuln_df)
     
     print(f"📊 Distribuição de risco:")
     print(vuln_df['risk_group'].value_counts())
@@ -366,135 +830,485 @@ def create_vulnerability_flags(df):
     
     return vuln_df
 
+
+def classify_risk(flags, tiers=RISK_TIERS, default=RISK_DEFAULT_GROUP):
+    """
+    Grupo de risco pelas regras ordenadas de `tiers`, vetorizado (np.select)
+
+    flags: frame com as colunas booleanas citadas nas regras. Retorna um
+    categórico ordenado do menor ao maior risco: `default` primeiro, depois
+    as regras da última para a primeira.
+    """
+    conditions = []
+    for _, rule in tiers:
+        condition = np.ones(len(flags), dtype=bool)
+        for flag in rule.get('all', []):
+            condition &= flags[flag].to_numpy(dtype=bool)
+        if rule.get('any'):
+            condition &= np.logical_or.reduce([flags[flag].to_numpy(dtype=bool) for flag in rule['any']])
+        conditions.append(condition)
+    
+    codes = np.select(conditions, np.arange(len(tiers), 0, -1), default=0)
+    categories = [default] + [group for group, _ in reversed(tiers)]
+    return pd.Categorical.from_codes(codes, categories, ordered=True)
+
 # ============================================================================
 # 6️⃣ SIMULAÇÃO DE CENÁRIOS
 # ============================================================================
 
-def simulate_policy_scenarios(df, qles_df):
-    """Simula cenários determinísticos de políticas"""
-    print("🎬 Simulando cenários de política...")
-    
-    scenarios = []
+def simulate_policy_scenarios(df, qles_df, scenarios=None):
+    """Simula cenários determinísticos de políticas (dataset completo em memória)"""
+    return pd.concat(list(iter_policy_scenarios(df, qles_df, scenarios)), ignore_index=True)
+
+
+def iter_policy_scenarios(df, qles_df, scenarios=None, block_cells=SCENARIO_BLOCK_CELLS):
+    """
+    Simula os cenários declarados em POLICY_SCENARIOS, em blocos
+
+    Cada bloco avalia vários cenários de uma vez como matrizes
+    (cenários × pessoas), sem copiar a população por cenário, e é devolvido
+    já no formato longo do dataset; blocos têm até block_cells células.
+    """
+    scenarios = POLICY_SCENARIOS if scenarios is None else scenarios
+    print(f"🎬 Simulando cenários de política ({len(scenarios)})...")
     
     # Cenário base
-    base = df[['person_id', 'renda_disponivel_real', 'epr_clean',
-               'cost_per_capita', 'renda_disponivel_real_zscore']].copy()
-    base = base.merge(qles_df[['person_id', 'QLES']], on='person_id', how='left')
-    base.rename(columns={'QLES': 'QLES_base'}, inplace=True)
-    
-    # CENÁRIO 1: Aumento de aluguel em +20%
-    print("   Cenário 1: Aumento de aluguel +20%")
-    scenario1 = base.copy()
-    scenario1['housing_cost_increase'] = 0.20 * df['cost_per_capita'] * 0.35  # Assumindo habitação = 35% do custo
-    scenario1['rdr_after'] = scenario1['renda_disponivel_real'] - scenario1['housing_cost_increase']
-    
-    # Usar epr_clean preenchido
-    epr_base = base['epr_clean'].fillna(0.9)
-    scenario1['epr_after'] = np.minimum(
-        epr_base * 1.20,  # Aumenta proporcionalmente
-        1.0
-    )
-    
-    # Recalcular QLES simplificado
-    scenario1['QLES_after'] = scenario1['QLES_base'] * (
-        0.65 +  # Base 65%
-        0.35 * (scenario1['rdr_after'] / (scenario1['renda_disponivel_real'] + 1))  # Ajuste proporcional
-    )
-    scenario1['delta_percent'] = (
-        (scenario1['QLES_after'] - scenario1['QLES_base']) / scenario1['QLES_base']
-    ) * 100
-    scenario1['scenario_name'] = 'Aluguel +20%'
-    
-    scenarios.append(scenario1[['person_id', 'scenario_name', 'QLES_base', 'QLES_after', 'delta_percent']])
-    
-    # CENÁRIO 2: Corte de benefícios em -15%
-    print("   Cenário 2: Corte de benefícios sociais -15%")
-    scenario2 = base.copy()
-    benefit_users = df['receives_social_benefit'] == True
-    scenario2['benefit_cut'] = 0.0
-    scenario2.loc[benefit_users, 'benefit_cut'] = (
-        df.loc[benefit_users, 'renda_disponivel_real'] * 
-        df.loc[benefit_users, 'social_support_ratio'] * 0.15
-    )
-    scenario2['rdr_after'] = scenario2['renda_disponivel_real'] - scenario2['benefit_cut']
-    scenario2['QLES_after'] = scenario2['QLES_base'] * (
-        0.90 -  # Penalização direta -10%
-        0.10 * (scenario2['benefit_cut'] / (scenario2['renda_disponivel_real'] + 1))
-    )
-    scenario2['delta_percent'] = (
-        (scenario2['QLES_after'] - scenario2['QLES_base']) / scenario2['QLES_base']
-    ) * 100
-    scenario2['scenario_name'] = 'Benefícios -15%'
-    
-    scenarios.append(scenario2[['person_id', 'scenario_name', 'QLES_base', 'QLES_after', 'delta_percent']])
-    
-    # Consolidar
-    scenarios_df = pd.concat(scenarios, ignore_index=True)
-    scenarios_df.rename(columns={'QLES_base': 'QLES_before'}, inplace=True)
-    
-    print(f"✅ Cenários simulados: {scenarios_df['scenario_name'].nunique()}")
-    print(f"   Impacto médio Cenário 1: {scenario1['delta_percent'].mean():.2f}%")
-    print(f"   Impacto médio Cenário 2: {scenario2['delta_percent'].mean():.2f}%")
+    ids = id_columns(df)
+    key = person_table.PERSON_KEY
+    if np.array_equal(qles_df[key].to_numpy(), df[key].to_numpy()):
+        # Mesma população e mesma ordem: alinhamento posicional, sem join
+        qles_base = qles_df['QLES'].to_numpy()
+    else:
+        qles_base = df[[key]].merge(qles_df[[key, 'QLES']], on=key, how='left')['QLES'].to_numpy()
+    
+    n = len(df)
+    names = pd.Categorical([scenario['name'] for scenario in scenarios])
+    block = max(1, block_cells // max(n, 1))
+    impacts = []
+    for start in range(0, len(scenarios), block):
+        specs = scenarios[start:start + block]
+        qles_after = evaluate_scenarios(df, qles_base, specs)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = ((qles_after - qles_base) / qles_base) * 100
+        impacts += [np.nanmean(row) if n else np.nan for row in delta]
+        
+        frame = pd.DataFrame({col: np.tile(df[col].to_numpy(), len(specs)) for col in ids})
+        frame['scenario_name'] = pd.Categorical.from_codes(
+            np.repeat(names.codes[start:start + len(specs)], n), names.categories
+        )
+        frame['QLES_before'] = np.tile(qles_base, len(specs))
+        frame['QLES_after'] = qles_after.ravel()
+        frame['delta_percent'] = delta.ravel()
+        yield frame
+    
+    print(f"✅ Cenários simulados: {len(scenarios)}")
+    for scenario, impact in list(zip(scenarios, impacts))[:SCENARIO_REPORT_LIMIT]:
+        print(f"   Impacto médio {scenario['name']}: {impact:.2f}%")
+    if len(scenarios) > SCENARIO_REPORT_LIMIT:
+        print(f"   ... e mais {len(scenarios) - SCENARIO_REPORT_LIMIT} cenários")
     print()
-    
-    return scenarios_df
+
+
+def evaluate_scenarios(df, qles_base, scenarios):
+    """
+    QLES após os choques de cada cenário: matriz (cenários × pessoas)
+
+    Perda de renda = soma dos choques (SCENARIO_SHOCKS); cada tipo de choque
+    e de resposta é avaliado uma vez para todos os cenários que o usam.
+    """
+    rdr = df['renda_disponivel_real'].to_numpy(dtype=float)
+    loss = np.zeros((len(scenarios), len(df)))
+    for shock, formula in SCENARIO_SHOCKS.items():
+        values = np.array([scenario['shocks'].get(shock, 0.0) for scenario in scenarios])
+        rows = np.flatnonzero(values)
+        if len(rows):
+            loss[rows] += formula(values[rows, None], df)
+    
+    qles_after = np.empty_like(loss)
+    for response in SCENARIO_RESPONSES:
+        rows = np.flatnonzero([scenario['response'] == response for scenario in scenarios])
+        if len(rows):
+            base = np.array([scenarios[i]['base'] for i in rows])[:, None]
+            weight = np.array([scenarios[i]['weight'] for i in rows])[:, None]
+            qles_after[rows] = scenario_qles(qles_base, response, base, weight, rdr, loss[rows])
+    return qles_after
+
+
+def _benefit_shock(value, df):
+    benefits = df['total_social_benefits'].to_numpy(dtype=float)
+    return np.where(social_benefits.take_up_mask(df), -value * benefits, 0.0)
+
+
+# Perda mensal de renda disponível por tipo de choque (valor = fração do cenário)
+SCENARIO_SHOCKS = {
+    # Aluguel: fração da parcela de habitação do custo per capita
+    'rent': lambda value, df: value * df['cost_per_capita'].to_numpy(dtype=float) * HOUSING_COST_SHARE,
+    # Benefícios: variação sobre o valor dos benefícios recebidos (só quem adere)
+    'benefit': _benefit_shock,
+    # Salário líquido: aumento salarial é perda negativa
+    'wage': lambda value, df: -value * df['net_salary_brl'].to_numpy(dtype=float),
+    # Alíquota efetiva: pontos percentuais sobre o salário bruto
+    'tax': lambda value, df: value * df['gross_salary_brl'].to_numpy(dtype=float),
+    # Câmbio: depreciação do real repassada à parcela importada do custo per capita
+    'fx': lambda value, df: value * df['cost_per_capita'].to_numpy(dtype=float) * FX_COST_SHARE,
+}
+
+# Maior ganho de um choque favorável, em fração do QLES base (a perda vai no
+# máximo a -100%: QLES 0)
+SCENARIO_MAX_GAIN = 1.0
+
+# QLES após o choque como fração do QLES base (limitado em scenario_qles).
+# A perda é relativa a |RDR| + 1 e RDR negativa conta como renda restante 0 (como
+# RDR = 0): com rdr + 1 o denominador fica negativo para RDR < -1 e uma perda
+# passaria a subir o QLES; assim perda >= 0 nunca o aumenta
+SCENARIO_RESPONSES = {
+    # Ajuste proporcional à renda disponível restante
+    'proportional': lambda base, weight, rdr, loss: (
+        base + weight * ((np.maximum(rdr, 0) - loss) / (np.abs(rdr) + 1))),
+    # Penalização direta mais a perda relativa de renda
+    'penalty': lambda base, weight, rdr, loss: base - weight * (loss / (np.abs(rdr) + 1)),
+}
+
+
+def scenario_qles(qles_base, response, base, weight, rdr, loss):
+    """
+    QLES após o choque, limitado à escala 0–QLES_SCALE
+
+    Perdas negativas (ex.: câmbio favorável) aumentam o QLES sem limite na
+    fórmula da resposta: o ganho fica limitado como a perda, a
+    SCENARIO_MAX_GAIN do QLES base (delta entre -100% e +100% × SCENARIO_MAX_GAIN).
+    """
+    factor = np.clip(SCENARIO_RESPONSES[response](base, weight, rdr, loss), 0.0, 1.0 + SCENARIO_MAX_GAIN)
+    return np.minimum(qles_base * factor, QLES_SCALE)
 
 # ============================================================================
 # 7️⃣ PIPELINE PRINCIPAL
 # ============================================================================
 
-def main():
-    print("=" * 80)
-    print("🏆 GOLD LAYER — DECISION & INSIGHTS")
-    print("=" * 80)
-    print()
-    
-    # Criar diretório de saída
-    import os
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
-    # 1. Carregar dados
-    base_df, simulation_df, comparison_df = load_silver_data()
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera a camada GOLD")
+    parser.add_argument(
+        '--format',
+        choices=sorted(storage.FORMATS),
+        default=storage.DEFAULT_FORMAT,
+        help=f"Formato de armazenamento (padrão: {storage.DEFAULT_FORMAT})"
+    )
+    parser.add_argument(
+        '--export-csv',
+        action='store_true',
+        help="Grava também cópias CSV dos datasets (consumo no Power BI)"
+    )
+    parser.add_argument(
+        '--outputs',
+        nargs='+',
+        choices=list(GOLD_OUTPUTS),
+        help="Outputs GOLD a gerar (padrão: todos); dependências são incluídas automaticamente"
+    )
+    parser.add_argument('--country', nargs='+', help="Filtra a população por país")
+    parser.add_argument('--region', nargs='+', help="Filtra a população por região (region_br)")
+    parser.add_argument('--city', nargs='+', help="Filtra a população por cidade")
+    parser.add_argument(
+        '--with-person-id',
+        action='store_true',
+        help="Inclui o UUID externo person_id nos outputs (padrão: apenas person_key)"
+    )
+    parser.add_argument(
+        '--cluster-mode',
+        choices=CLUSTER_MODES,
+        default=CLUSTER_MODE,
+        help=f"Ajuste final do K-Means: exact, minibatch, sample (amostra estratificada) ou "
+             f"auto (exact até {CLUSTER_EXACT_MAX_ROWS:,} linhas; padrão: {CLUSTER_MODE})"
+    )
+    parser.add_argument(
+        '--cluster-check',
+        action='store_true',
+        help="Ajusta também o K-Means exato e mostra o ARI e o ganho de tempo do modo escolhido"
+    )
+    parser.add_argument(
+        '--k-range',
+        type=int,
+        nargs=2,
+        metavar=('MIN', 'MAX'),
+        default=list(CLUSTER_K_RANGE),
+        help=f"Faixa de k avaliada na seleção do número de clusters (padrão: {CLUSTER_K_RANGE[0]} {CLUSTER_K_RANGE[1]})"
+    )
+    parser.add_argument(
+        '--k-criterion',
+        choices=CLUSTER_K_CRITERIA,
+        default=CLUSTER_K_CRITERION,
+        help=f"Critério da seleção de k (padrão: {CLUSTER_K_CRITERION})"
+    )
+    parser.add_argument(
+        '--k-workers',
+        type=int,
+        default=CLUSTER_K_WORKERS,
+        help="Processos para avaliar os candidatos a k (0 = todos os núcleos; 1 = em série)"
+    )
+    parser.add_argument(
+        '--no-cluster-cache',
+        action='store_true',
+        help=f"Ignora o cache de k/centróides ({CLUSTER_CACHE_FILE}) e refaz a seleção"
+    )
+    parser.add_argument(
+        '--cluster-model',
+        choices=CLUSTER_MODEL_MODES,
+        default=CLUSTER_MODEL_MODE,
+        help="Uso do modelo de clusters salvo: auto (reajusta só acima do limite de drift), "
+             f"assign (só atribuição) ou refit (padrão: {CLUSTER_MODEL_MODE})"
+    )
+    parser.add_argument(
+        '--drift-threshold',
+        type=float,
+        default=CLUSTER_DRIFT_THRESHOLD,
+        help=f"Drift a partir do qual o modo auto reajusta os clusters (padrão: {CLUSTER_DRIFT_THRESHOLD})"
+    )
+    parser.add_argument(
+        '--by-country',
+        action='store_true',
+        help=f"Calcula {', '.join(PARTITIONED_OUTPUTS)} por país, em partições paralelas"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help="Processos para as partições de --by-country (0 = todos os núcleos)"
+    )
+    args = parser.parse_args()
+    if not 2 <= args.k_range[0] <= args.k_range[1]:
+        parser.error("--k-range precisa de 2 <= MIN <= MAX")
+    return args
+
+
+def output_dir(filters=None):
+    """Destino dos outputs: a GOLD ou, com filtros, SUBSET_DIR/<coluna-valor>__..."""
+    if not filters:
+        return OUTPUT_DIR
+    parts = []
+    for col, values in sorted(filters.items()):
+        values = values if isinstance(values, (list, tuple, set)) else [values]
+        parts.append(f"{col}-{'+'.join(sorted(str(value) for value in values))}")
+    return SUBSET_DIR / '__'.join(parts)
+
+
+def build_gold(outputs, filters=None, fmt=None, export_csv=False, with_person_id=False,
+               cluster_options=None):
+    """
+    Calcula e grava exatamente os outputs pedidos (sem expandir dependências)
+
+    Usado pelo main (com a lista já resolvida) e pelo pipeline incremental,
+    que recalcula só os outputs invalidados. Se policy_scenarios for pedido
+    sem quality_of_life_score, o QLES já gravado é reutilizado.
+    Com filtros, a escala do QLES e os clusters vêm dos modelos salvos da
+    população inteira (nada é reajustado no subconjunto) e os outputs vão
+    para output_dir(filters).
+    cluster_options: argumentos nomeados repassados a create_clusters
+    (mode, check, k_range, criterion, workers, use_cache, model_mode,
+    drift_threshold).
+    Retorna as linhas do resumo da execução.
+    """
+    filters = filters or {}
+    destination = output_dir(filters)
+    os.makedirs(destination, exist_ok=True)
+    if filters:
+        print(f"🔎 Execução filtrada: modelos da população inteira, outputs em {destination}\n")
+
+    # 1. Carregar dados (apenas colunas/datasets dos outputs pedidos)
+    base_df, simulation_df = load_silver_data(outputs, filters, with_person_id=with_person_id)
+    summary = []
     
     # 2. Calcular QLES
-    qles_df = calculate_qles(base_df)
-    qles_df.to_csv(f'{OUTPUT_DIR}quality_of_life_score.csv', index=False)
-    print(f"💾 Salvo: quality_of_life_score.csv\n")
+    if 'quality_of_life_score' in outputs:
+        if filters:
+            # Subconjunto: escala 0–100 ajustada na população inteira
+            qles_model = normalization_model.load(OUTPUT_DIR, normalization_model.QLES_MODEL)
+            print(f"📐 Escala do QLES: versão {qles_model['version']} (população inteira)")
+            qles_df = calculate_qles(base_df, model=qles_model)
+        else:
+            qles_df, qles_model = calculate_qles(base_df, return_model=True)
+            version = normalization_model.save(qles_model, OUTPUT_DIR, normalization_model.QLES_MODEL,
+                                               metadata={'people': len(qles_df)})
+            print(f"💾 Escala do QLES salva (versão {version})")
+        storage.write_table(qles_df, destination, 'quality_of_life_score', fmt, csv_export=export_csv)
+        print(f"💾 Salvo: quality_of_life_score\n")
+        summary.append(f"quality_of_life_score       → {len(qles_df)} registros")
+    elif 'policy_scenarios' in outputs:
+        qles_df = storage.read_table(OUTPUT_DIR, 'quality_of_life_score', filters=filters,
+                                     latest_by=person_table.PERSON_KEY)
     
     # 3. Clusterização
-    clusters_df, cluster_stats = create_clusters(base_df)
-    clusters_df.to_csv(f'{OUTPUT_DIR}socioeconomic_clusters.csv', index=False)
-    cluster_stats.to_csv(f'{OUTPUT_DIR}cluster_statistics.csv')
-    print(f"💾 Salvo: socioeconomic_clusters.csv\n")
+    if 'socioeconomic_clusters' in outputs:
+        if filters:
+            # Subconjunto: só atribuição aos centróides da população inteira
+            cluster_model = normalization_model.load(OUTPUT_DIR, normalization_model.CLUSTER_MODEL)
+            print(f"📐 Modelo de clusters: versão {cluster_model['version']} (k={cluster_model['k']})")
+            cluster_stats = storage.read_table(OUTPUT_DIR, 'cluster_statistics').set_index('cluster_id')
+            clusters_df = assign_clusters(base_df, cluster_model, cluster_stats)
+        else:
+            cluster_options = cluster_options or {}
+            try:
+                saved_model = normalization_model.load(OUTPUT_DIR, normalization_model.CLUSTER_MODEL)
+            except FileNotFoundError:
+                if cluster_options.get('model_mode') == 'assign':
+                    raise
+                saved_model = None
+            clusters_df, cluster_stats, cluster_model = create_clusters(
+                base_df, model=saved_model, return_model=True, **cluster_options
+            )
+            if cluster_model is not saved_model:
+                version = normalization_model.save(cluster_model, OUTPUT_DIR, normalization_model.CLUSTER_MODEL,
+                                                   metadata={'people': len(clusters_df)})
+                print(f"💾 Modelo de clusters salvo (versão {version})")
+        storage.write_table(clusters_df, destination, 'socioeconomic_clusters', fmt, csv_export=export_csv)
+        storage.write_table(cluster_stats, destination, 'cluster_statistics', fmt,
+                            csv_export=export_csv, index=True)
+        print(f"💾 Salvo: socioeconomic_clusters\n")
+        summary.append(f"socioeconomic_clusters      → {len(clusters_df)} registros, "
+                       f"{clusters_df['cluster_id'].nunique()} clusters")
     
     # 4. Rankings por perfil
-    rankings_df = create_profile_rankings(simulation_df)
-    rankings_df.to_csv(f'{OUTPUT_DIR}country_rankings_by_profile.csv', index=False)
-    print(f"💾 Salvo: country_rankings_by_profile.csv\n")
+    if 'country_rankings_by_profile' in outputs:
+        rankings_df = create_profile_rankings(simulation_df)
+        storage.write_table(rankings_df, destination, 'country_rankings_by_profile', fmt, csv_export=export_csv)
+        print(f"💾 Salvo: country_rankings_by_profile\n")
+        summary.append(f"country_rankings_by_profile → {len(rankings_df)} rankings")
+    
+    # 4b. Rankings da grade de perfis (opcional)
+    if 'profile_grid_rankings' in outputs:
+        grid_df = storage.read_table(INPUT_DIR, 'cross_country_profile_grid',
+                                     columns=['profile_id', 'description', 'country', 'city', 'per_capita_rdr'])
+        grid_rankings = create_profile_rankings(grid_df)
+        storage.write_table(grid_rankings, destination, 'profile_grid_rankings', fmt, csv_export=export_csv)
+        print(f"💾 Salvo: profile_grid_rankings\n")
+        summary.append(f"profile_grid_rankings       → {len(grid_rankings)} rankings")
     
     # 5. Vulnerabilidade
-    vuln_df = create_vulnerability_flags(base_df)
-    vuln_df.to_csv(f'{OUTPUT_DIR}vulnerability_and_risk.csv', index=False)
-    print(f"💾 Salvo: vulnerability_and_risk.csv\n")
+    if 'vulnerability_and_risk' in outputs:
+        vuln_df = create_vulnerability_flags(base_df)
+        storage.write_table(vuln_df, destination, 'vulnerability_and_risk', fmt, csv_export=export_csv)
+        print(f"💾 Salvo: vulnerability_and_risk\n")
+        summary.append(f"vulnerability_and_risk      → {len(vuln_df)} registros")
     
     # 6. Cenários
-    scenarios_df = simulate_policy_scenarios(base_df, qles_df)
-    scenarios_df.to_csv(f'{OUTPUT_DIR}policy_scenarios.csv', index=False)
-    print(f"💾 Salvo: policy_scenarios.csv\n")
+    if 'policy_scenarios' in outputs:
+        # Primeiro bloco substitui o dataset; os demais entram como partes
+        rows = storage.write_blocks(iter_policy_scenarios(base_df, qles_df), destination,
+                                    'policy_scenarios', fmt, csv_export=export_csv)
+        print(f"💾 Salvo: policy_scenarios\n")
+        summary.append(f"policy_scenarios            → {rows} registros, {len(POLICY_SCENARIOS)} cenários")
+
+    return summary
+
+
+def compute_gold_partition(country, outputs, filters=None, with_person_id=False, qles_dir=None):
+    """
+    Outputs linha a linha de um país (executado num worker, saída silenciada)
+
+    Lê só a partição do país em people_wide e no QLES (filtros empurrados
+    para a leitura). qles_dir: onde está o QLES (padrão: OUTPUT_DIR).
+    Retorna (país, {output: DataFrame}).
+    """
+    frames = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        base_df, _ = load_silver_data(outputs, {**(filters or {}), 'country': country}, with_person_id)
+        if 'vulnerability_and_risk' in outputs:
+            frames['vulnerability_and_risk'] = create_vulnerability_flags(base_df)
+        if 'policy_scenarios' in outputs:
+            qles_df = storage.read_table(qles_dir or OUTPUT_DIR, 'quality_of_life_score',
+                                         filters={'country': country}, latest_by=person_table.PERSON_KEY)
+            frames['policy_scenarios'] = simulate_policy_scenarios(base_df, qles_df)
+    return country, frames
+
+
+def build_gold_by_country(outputs, filters=None, fmt=None, export_csv=False, with_person_id=False,
+                          cluster_options=None, workers=0):
+    """
+    Modo particionado por país
+
+    Outputs da população inteira (QLES, clusters, rankings) rodam uma vez
+    com build_gold; os de PARTITIONED_OUTPUTS rodam por país, em paralelo,
+    e cada partição vira uma parte do dataset. filters['country'] restringe
+    as partições.
+    """
+    filters = dict(filters or {})
+    destination = output_dir(filters)
+    partitioned = [output for output in outputs if output in PARTITIONED_OUTPUTS]
+    global_outputs = [output for output in outputs if output not in PARTITIONED_OUTPUTS]
+    summary = build_gold(global_outputs, filters, fmt, export_csv, with_person_id, cluster_options) \
+        if global_outputs else []
+    if not partitioned:
+        return summary
+    # QLES desta execução (subconjunto) ou o já gravado da população inteira
+    qles_dir = destination if 'quality_of_life_score' in global_outputs else OUTPUT_DIR
+
+    countries = filters.pop('country', None)
+    if countries is None:
+        if 'country' in storage.dataset_columns(INPUT_DIR, person_table.WIDE_TABLE):
+            countries = person_table.read_wide(INPUT_DIR, columns=['country'])['country'].unique()
+        else:
+            countries = ['Brazil']
+    countries = [str(country) for country in countries]
+
+    print(f"🌍 Partições por país ({', '.join(partitioned)}): {', '.join(countries)}")
+    workers = min(workers or os.cpu_count(), len(countries))
+    start = time.perf_counter()
+    tasks = (countries, repeat(partitioned), repeat(filters), repeat(with_person_id), repeat(qles_dir))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(compute_gold_partition, *tasks))
+    else:
+        results = list(map(compute_gold_partition, *tasks))
+    print(f"   ✓ {len(results)} partições em {time.perf_counter() - start:.2f}s ({workers} worker(s))")
+
+    for output in partitioned:
+        rows = storage.write_blocks((frames[output] for _, frames in results), destination, output,
+                                    fmt, csv_export=export_csv)
+        print(f"💾 Salvo: {output} ({len(results)} partes)")
+        summary.append(f"{output:<27} → {rows} registros ({len(results)} países)")
+    print()
+    return summary
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 80)
+    print("🏆 GOLD LAYER — DECISION & INSIGHTS")
+    print("=" * 80)
+    print()
+    
+    outputs = resolve_outputs(args.outputs)
+    filters = {
+        col: values for col, values in
+        [('country', args.country), ('region_br', args.region), ('city', args.city)]
+        if values
+    }
+    cluster_options = {
+        'mode': args.cluster_mode,
+        'check': args.cluster_check,
+        'k_range': tuple(args.k_range),
+        'criterion': args.k_criterion,
+        'workers': args.k_workers,
+        'use_cache': not args.no_cluster_cache,
+        'model_mode': args.cluster_model,
+        'drift_threshold': args.drift_threshold,
+    }
+    if args.by_country:
+        summary = build_gold_by_country(outputs, filters, args.format, args.export_csv, args.with_person_id,
+                                        cluster_options, args.workers)
+    else:
+        summary = build_gold(outputs, filters, args.format, args.export_csv, args.with_person_id,
+                             cluster_options)
     
     # Resumo final
     print("=" * 80)
     print("✅ GOLD LAYER COMPLETA")
     print("=" * 80)
+    datasets = "\n".join(f"{i}. {line}" for i, line in enumerate(summary, start=1))
     print(f"""
-Datasets gerados:
-1. quality_of_life_score.csv       → {len(qles_df)} registros
-2. socioeconomic_clusters.csv      → {len(clusters_df)} registros, {clusters_df['cluster_id'].nunique()} clusters
-3. country_rankings_by_profile.csv → {len(rankings_df)} rankings
-4. vulnerability_and_risk.csv      → {len(vuln_df)} registros
-5. policy_scenarios.csv            → {len(scenarios_df)} cenários
-
-Todos os arquivos estão prontos para consumo direto no Power BI.
+Datasets gerados ({args.format}):
+{datasets}
+
+Use --export-csv para gerar cópias CSV para consumo direto no Power BI.
 Datasets denormalizados, categóricos explícitos, sem JSON aninhado.
     """)
 
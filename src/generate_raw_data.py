@@ -3,23 +3,32 @@ Gerador de dados sintéticos realistas para camada RAW
 Pipeline de análise socioeconômica internacional
 """
 
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 from uuid import uuid4
 from datetime import datetime
 
-# Seed para reprodutibilidade
-np.random.seed(42)
+import paths
+import storage
 
-print("🚀 Iniciando geração de dados RAW...")
+# Seed para reprodutibilidade
+SEED = 42
 
 # ============================================================================
-# ARQUIVO 1: people_raw.csv (10.000 registros)
+# DISTRIBUIÇÕES DA POPULAÇÃO (people_raw.csv)
 # ============================================================================
 
-print("\n📊 Gerando people_raw.csv...")
-
-n_people = 10000
+N_PEOPLE = 10000
 
 # Distribuições realistas baseadas em dados do IBGE/PNAD
 regions = ['SE', 'NE', 'S', 'N', 'CO']
@@ -44,155 +53,733 @@ employment_types = ['CLT', 'PJ', 'informal', 'desempregado']
 rent_statuses = ['aluguel', 'próprio', 'cedido']
 rent_weights = [0.35, 0.50, 0.15]
 
-# Gerando dados
-people_data = []
+genders = ['M', 'F']
 
-for i in range(n_people):
-    person_id = str(uuid4())
-    age = np.random.randint(18, 66)
-    gender = np.random.choice(['M', 'F'])
-    region_br = np.random.choice(regions, p=region_weights)
-    city_br = np.random.choice(cities_by_region[region_br])
-    
-    # Educação (mais jovens tendem a ter mais educação)
-    if age < 30:
-        edu_weights_adj = [0.20, 0.35, 0.15, 0.22, 0.08]
-    elif age < 45:
-        edu_weights_adj = [0.28, 0.35, 0.12, 0.18, 0.07]
-    else:
-        edu_weights_adj = [0.38, 0.32, 0.10, 0.15, 0.05]
-    
-    education_level = np.random.choice(education_levels, p=edu_weights_adj)
-    
-    # Job category (influenciado por educação)
-    if education_level == 'pós':
-        job_category = np.random.choice(['tecnologia', 'serviços', 'indústria'], p=[0.5, 0.4, 0.1])
-    elif education_level == 'superior':
-        job_category = np.random.choice(['tecnologia', 'serviços', 'comércio', 'indústria'], p=[0.3, 0.4, 0.2, 0.1])
-    elif education_level == 'técnico':
-        job_category = np.random.choice(['indústria', 'tecnologia', 'serviços', 'comércio'], p=[0.35, 0.25, 0.25, 0.15])
-    elif education_level == 'médio':
-        job_category = np.random.choice(['comércio', 'serviços', 'informal', 'desempregado'], p=[0.35, 0.30, 0.20, 0.15])
-    else:
-        job_category = np.random.choice(['informal', 'desempregado', 'serviços', 'comércio'], p=[0.40, 0.25, 0.20, 0.15])
-    
-    # Employment type
-    if job_category == 'desempregado':
-        employment_type = 'desempregado'
-    elif job_category == 'informal':
-        employment_type = 'informal'
-    elif job_category == 'tecnologia':
-        employment_type = np.random.choice(['CLT', 'PJ'], p=[0.4, 0.6])
-    else:
-        employment_type = np.random.choice(['CLT', 'PJ', 'informal'], p=[0.6, 0.25, 0.15])
-    
-    # Salário (distribuição log-normal realista)
-    base_salary = 1412  # Salário mínimo 2024
-    
-    if job_category == 'desempregado':
-        gross_salary_brl = 0
-    else:
-        # Multiplicadores por educação
-        edu_multipliers = {
-            'sem ensino médio': np.random.lognormal(0.2, 0.4),
-            'médio': np.random.lognormal(0.5, 0.5),
-            'técnico': np.random.lognormal(1.0, 0.6),
-            'superior': np.random.lognormal(1.5, 0.7),
-            'pós': np.random.lognormal(2.0, 0.8)
-        }
-        
-        # Multiplicadores por categoria
-        job_multipliers = {
-            'informal': 0.7,
-            'serviços': 1.0,
-            'comércio': 0.9,
-            'indústria': 1.2,
-            'tecnologia': 2.5
-        }
-        
-        # Multiplicador regional
-        region_multipliers = {
-            'SE': 1.3,
-            'S': 1.2,
-            'CO': 1.15,
-            'NE': 0.85,
-            'N': 0.9
-        }
-        
-        gross_salary_brl = (
-            base_salary * 
-            edu_multipliers[education_level] * 
-            job_multipliers[job_category] * 
-            region_multipliers[region_br]
-        )
-        
-        # Arredondamento realista
-        gross_salary_brl = round(gross_salary_brl / 100) * 100
-    
-    # Net salary (descontos de INSS + IR simplificados)
-    if gross_salary_brl == 0:
-        net_salary_brl = 0
-    elif gross_salary_brl <= 2000:
-        net_salary_brl = gross_salary_brl * 0.92  # ~8% INSS
-    elif gross_salary_brl <= 4000:
-        net_salary_brl = gross_salary_brl * 0.86  # ~14% INSS + IR
-    elif gross_salary_brl <= 8000:
-        net_salary_brl = gross_salary_brl * 0.80  # ~20% total
-    else:
-        net_salary_brl = gross_salary_brl * 0.72  # ~28% total
-    
-    net_salary_brl = round(net_salary_brl, 2)
-    
-    # Dependentes (mais provável em pessoas mais velhas)
-    if age < 25:
-        dependents = np.random.choice([0, 1], p=[0.85, 0.15])
-    elif age < 35:
-        dependents = np.random.choice([0, 1, 2], p=[0.50, 0.35, 0.15])
-    elif age < 50:
-        dependents = np.random.choice([0, 1, 2, 3], p=[0.30, 0.30, 0.30, 0.10])
-    else:
-        dependents = np.random.choice([0, 1, 2], p=[0.60, 0.25, 0.15])
-    
-    # Rent status
-    rent_status = np.random.choice(rent_statuses, p=rent_weights)
-    
-    # Benefício social (renda baixa tem mais chance)
-    if net_salary_brl == 0:
-        receives_social_benefit = np.random.choice([True, False], p=[0.7, 0.3])
-    elif net_salary_brl <= 2000:
-        receives_social_benefit = np.random.choice([True, False], p=[0.4, 0.6])
-    elif net_salary_brl <= 3000:
-        receives_social_benefit = np.random.choice([True, False], p=[0.15, 0.85])
-    else:
-        receives_social_benefit = False
-    
-    people_data.append({
-        'person_id': person_id,
-        'age': age,
-        'gender': gender,
-        'region_br': region_br,
-        'city_br': city_br,
-        'education_level': education_level,
-        'job_category': job_category,
-        'employment_type': employment_type,
-        'gross_salary_brl': gross_salary_brl,
-        'net_salary_brl': net_salary_brl,
-        'dependents': dependents,
-        'rent_status': rent_status,
-        'receives_social_benefit': receives_social_benefit
+# Salário mínimo 2024
+BASE_SALARY = 1412
+
+# População multi-país (--countries): participação de cada país. Fora do
+# Brasil as cidades são as de economic_context_raw e os salários são
+# gerados sobre o salário mínimo local e gravados em BRL.
+BASE_COUNTRY = 'Brazil'
+COUNTRY_WEIGHTS = {
+    'Brazil': 0.60,
+    'USA': 0.12,
+    'Germany': 0.10,
+    'France': 0.10,
+    'Portugal': 0.08,
+}
+
+# Multiplicadores de salário (log-normal por educação: mu, sigma)
+EDU_LOGNORMAL_PARAMS = {
+    'sem ensino médio': (0.2, 0.4),
+    'médio': (0.5, 0.5),
+    'técnico': (1.0, 0.6),
+    'superior': (1.5, 0.7),
+    'pós': (2.0, 0.8)
+}
+
+# Multiplicadores por categoria
+JOB_MULTIPLIERS = {
+    'informal': 0.7,
+    'serviços': 1.0,
+    'comércio': 0.9,
+    'indústria': 1.2,
+    'tecnologia': 2.5
+}
+
+# Multiplicador regional
+REGION_MULTIPLIERS = {
+    'SE': 1.3,
+    'S': 1.2,
+    'CO': 1.15,
+    'NE': 0.85,
+    'N': 0.9
+}
+
+# ----------------------------------------------------------------------------
+# Tabelas de probabilidade condicionais (linhas = grupo, colunas = categoria)
+# Usadas pelo gerador vetorizado; espelham exatamente os ramos do loop
+# ----------------------------------------------------------------------------
+
+# Educação por faixa etária: <30, 30-44, 45+
+AGE_EDU_BINS = [30, 45]
+EDU_PROBS_BY_AGE = np.array([
+    [0.20, 0.35, 0.15, 0.22, 0.08],
+    [0.28, 0.35, 0.12, 0.18, 0.07],
+    [0.38, 0.32, 0.10, 0.15, 0.05],
+])
+
+# Categoria de trabalho por educação (colunas na ordem de job_categories)
+JOB_PROBS_BY_EDU = np.array([
+    # serviços, indústria, tecnologia, comércio, informal, desempregado
+    [0.20, 0.00, 0.00, 0.15, 0.40, 0.25],  # sem ensino médio
+    [0.30, 0.00, 0.00, 0.35, 0.20, 0.15],  # médio
+    [0.25, 0.35, 0.25, 0.15, 0.00, 0.00],  # técnico
+    [0.40, 0.10, 0.30, 0.20, 0.00, 0.00],  # superior
+    [0.40, 0.10, 0.50, 0.00, 0.00, 0.00],  # pós
+])
+
+# Tipo de vínculo por categoria (colunas na ordem de employment_types)
+EMPLOYMENT_PROBS_BY_JOB = np.array([
+    # CLT, PJ, informal, desempregado
+    [0.60, 0.25, 0.15, 0.00],  # serviços
+    [0.60, 0.25, 0.15, 0.00],  # indústria
+    [0.40, 0.60, 0.00, 0.00],  # tecnologia
+    [0.60, 0.25, 0.15, 0.00],  # comércio
+    [0.00, 0.00, 1.00, 0.00],  # informal
+    [0.00, 0.00, 0.00, 1.00],  # desempregado
+])
+
+# Dependentes (0-3) por faixa etária: <25, 25-34, 35-49, 50+
+AGE_DEPENDENTS_BINS = [25, 35, 50]
+DEPENDENTS_PROBS_BY_AGE = np.array([
+    [0.85, 0.15, 0.00, 0.00],
+    [0.50, 0.35, 0.15, 0.00],
+    [0.30, 0.30, 0.30, 0.10],
+    [0.60, 0.25, 0.15, 0.00],
+])
+
+# Faixas de salário líquido: (limite superior do bruto, fator líquido)
+NET_SALARY_BANDS = [
+    (2000, 0.92),  # ~8% INSS
+    (4000, 0.86),  # ~14% INSS + IR
+    (8000, 0.80),  # ~20% total
+]
+NET_SALARY_TOP_FACTOR = 0.72  # ~28% total
+
+# Probabilidade de benefício social por faixa de renda líquida:
+# renda zero, <=2000, <=3000, acima
+BENEFIT_INCOME_BINS = [2000, 3000]
+BENEFIT_PROB_ZERO_INCOME = 0.7
+BENEFIT_PROBS_BY_INCOME = np.array([0.4, 0.15, 0.0])
+
+
+# ============================================================================
+# GERADOR ORIGINAL (LOOP POR PESSOA)
+# ============================================================================
+
+def generate_people_loop(n_people):
+    """
+    Gera a população pessoa a pessoa (implementação original)
+    Mantido como referência para comparar distribuições e throughput
+    """
+    rng = np.random.default_rng(SEED)
+    people_data = []
+
+    for i in range(n_people):
+        person_id = str(uuid4())
+        age = rng.integers(18, 66)
+        gender = rng.choice(['M', 'F'])
+        region_br = rng.choice(regions, p=region_weights)
+        city_br = rng.choice(cities_by_region[region_br])
+
+        # Educação (mais jovens tendem a ter mais educação)
+        if age < 30:
+            edu_weights_adj = [0.20, 0.35, 0.15, 0.22, 0.08]
+        elif age < 45:
+            edu_weights_adj = [0.28, 0.35, 0.12, 0.18, 0.07]
+        else:
+            edu_weights_adj = [0.38, 0.32, 0.10, 0.15, 0.05]
+
+        education_level = rng.choice(education_levels, p=edu_weights_adj)
+
+        # Job category (influenciado por educação)
+        if education_level == 'pós':
+            job_category = rng.choice(['tecnologia', 'serviços', 'indústria'], p=[0.5, 0.4, 0.1])
+        elif education_level == 'superior':
+            job_category = rng.choice(['tecnologia', 'serviços', 'comércio', 'indústria'], p=[0.3, 0.4, 0.2, 0.1])
+        elif education_level == 'técnico':
+            job_category = rng.choice(['indústria', 'tecnologia', 'serviços', 'comércio'], p=[0.35, 0.25, 0.25, 0.15])
+        elif education_level == 'médio':
+            job_category = rng.choice(['comércio', 'serviços', 'informal', 'desempregado'], p=[0.35, 0.30, 0.20, 0.15])
+        else:
+            job_category = rng.choice(['informal', 'desempregado', 'serviços', 'comércio'], p=[0.40, 0.25, 0.20, 0.15])
+
+        # Employment type
+        if job_category == 'desempregado':
+            employment_type = 'desempregado'
+        elif job_category == 'informal':
+            employment_type = 'informal'
+        elif job_category == 'tecnologia':
+            employment_type = rng.choice(['CLT', 'PJ'], p=[0.4, 0.6])
+        else:
+            employment_type = rng.choice(['CLT', 'PJ', 'informal'], p=[0.6, 0.25, 0.15])
+
+        # Salário (distribuição log-normal realista)
+        if job_category == 'desempregado':
+            gross_salary_brl = 0
+        else:
+            # Multiplicadores por educação
+            edu_multipliers = {
+                level: rng.lognormal(mu, sigma)
+                for level, (mu, sigma) in EDU_LOGNORMAL_PARAMS.items()
+            }
+
+            gross_salary_brl = (
+                BASE_SALARY *
+                edu_multipliers[education_level] *
+                JOB_MULTIPLIERS[job_category] *
+                REGION_MULTIPLIERS[region_br]
+            )
+
+            # Arredondamento realista
+            gross_salary_brl = round(gross_salary_brl / 100) * 100
+
+        # Net salary (descontos de INSS + IR simplificados)
+        if gross_salary_brl == 0:
+            net_salary_brl = 0
+        elif gross_salary_brl <= 2000:
+            net_salary_brl = gross_salary_brl * 0.92  # ~8% INSS
+        elif gross_salary_brl <= 4000:
+            net_salary_brl = gross_salary_brl * 0.86  # ~14% INSS + IR
+        elif gross_salary_brl <= 8000:
+            net_salary_brl = gross_salary_brl * 0.80  # ~20% total
+        else:
+            net_salary_brl = gross_salary_brl * 0.72  # ~28% total
+
+        net_salary_brl = round(net_salary_brl, 2)
+
+        # Dependentes (mais provável em pessoas mais velhas)
+        if age < 25:
+            dependents = rng.choice([0, 1], p=[0.85, 0.15])
+        elif age < 35:
+            dependents = rng.choice([0, 1, 2], p=[0.50, 0.35, 0.15])
+        elif age < 50:
+            dependents = rng.choice([0, 1, 2, 3], p=[0.30, 0.30, 0.30, 0.10])
+        else:
+            dependents = rng.choice([0, 1, 2], p=[0.60, 0.25, 0.15])
+
+        # Rent status
+        rent_status = rng.choice(rent_statuses, p=rent_weights)
+
+        # Benefício social (renda baixa tem mais chance)
+        if net_salary_brl == 0:
+            receives_social_benefit = rng.choice([True, False], p=[0.7, 0.3])
+        elif net_salary_brl <= 2000:
+            receives_social_benefit = rng.choice([True, False], p=[0.4, 0.6])
+        elif net_salary_brl <= 3000:
+            receives_social_benefit = rng.choice([True, False], p=[0.15, 0.85])
+        else:
+            receives_social_benefit = False
+
+        people_data.append({
+            'person_key': i,
+            'person_id': person_id,
+            'age': age,
+            'gender': gender,
+            'region_br': region_br,
+            'city_br': city_br,
+            'education_level': education_level,
+            'job_category': job_category,
+            'employment_type': employment_type,
+            'gross_salary_brl': gross_salary_brl,
+            'net_salary_brl': net_salary_brl,
+            'dependents': dependents,
+            'rent_status': rent_status,
+            'receives_social_benefit': receives_social_benefit
+        })
+
+    return pd.DataFrame(people_data)
+
+
+# ============================================================================
+# GERADOR VETORIZADO (ARRAYS NUMPY POR LOTE)
+# ============================================================================
+
+def _draw_categorical(rng, probs, groups=None, size=None):
+    """
+    Sorteia índices de categoria para cada linha via CDF inversa
+
+    probs: vetor (K,) de probabilidades, ou matriz (G, K) condicional ao grupo
+    groups: índice do grupo de cada linha (obrigatório se probs for 2D)
+    """
+    probs = np.asarray(probs, dtype=float)
+    cdf = np.cumsum(probs, axis=-1)
+    cdf /= cdf[..., -1:]  # Normaliza erros de arredondamento nas somas
+
+    if probs.ndim == 1:
+        u = rng.random(size)
+        return np.searchsorted(cdf, u, side='right')
+
+    u = rng.random(len(groups))
+    idx = (u[:, None] >= cdf[groups]).sum(axis=1)
+    return np.minimum(idx, probs.shape[1] - 1)
+
+
+def _uuid4_strings(rng, n):
+    """Gera UUID4 em lote a partir do RNG (reprodutível, sem loop Python)"""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # versão 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # variante RFC 4122
+
+    hex_digits = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+    nibbles = np.empty((n, 32), dtype=np.uint8)
+    nibbles[:, 0::2] = raw >> 4
+    nibbles[:, 1::2] = raw & 0x0F
+    chars = hex_digits[nibbles]
+
+    out = np.full((n, 36), ord('-'), dtype=np.uint8)
+    # Layout 8-4-4-4-12: (posição no texto, posição no hex, largura)
+    for dst, src, width in ((0, 0, 8), (9, 8, 4), (14, 12, 4), (19, 16, 4), (24, 20, 12)):
+        out[:, dst:dst + width] = chars[:, src:src + width]
+
+    return out.view('S36').ravel().astype(str).astype(object)
+
+
+def country_population_params(country):
+    """
+    Parâmetros da população de um país fora do Brasil, derivados de ECONOMIC_CONTEXT_DATA
+
+    Valores monetários já em BRL (moeda dos salários em people_raw):
+    brl_per_local = BRL por USD / moeda local por USD.
+    """
+    rows = [row for row in ECONOMIC_CONTEXT_DATA if row['country'] == country]
+    if not rows:
+        raise ValueError(f"País sem contexto econômico: {country}")
+    brl_per_usd = np.mean([row['usd_rate'] for row in ECONOMIC_CONTEXT_DATA if row['currency'] == 'BRL'])
+    brl_per_local = brl_per_usd / np.mean([row['usd_rate'] for row in rows])
+    return {
+        'cities': [row['city'] for row in rows],
+        'min_wage_brl': np.mean([row['local_min_wage'] for row in rows]) * brl_per_local,
+        'net_factor': 1 - np.mean([row['effective_tax_rate'] for row in rows]),
+    }
+
+
+def people_city_categories(countries):
+    """Vocabulário de city_br: 25 cidades brasileiras + cidades dos demais países pedidos"""
+    categories = [city for region in regions for city in cities_by_region[region]]
+    for country in countries:
+        if country != BASE_COUNTRY:
+            categories += country_population_params(country)['cities']
+    return categories
+
+
+def _draw_brazil_block(rng, n, city_categories):
+    """Atributos de n pessoas no Brasil (regiões, cidades e faixas de IR/INSS brasileiras)"""
+    age = rng.integers(18, 66, size=n)
+    gender_idx = rng.integers(0, len(genders), size=n)
+
+    region_idx = _draw_categorical(rng, region_weights, size=n)
+    # Cidades uniformes dentro da região
+    city_table = np.array([cities_by_region[r] for r in regions], dtype=object)
+    city_idx = rng.integers(0, city_table.shape[1], size=n)
+
+    # Educação | faixa etária
+    edu_idx = _draw_categorical(rng, EDU_PROBS_BY_AGE, np.digitize(age, AGE_EDU_BINS))
+
+    # Trabalho | educação
+    job_idx = _draw_categorical(rng, JOB_PROBS_BY_EDU, edu_idx)
+
+    # Vínculo | trabalho
+    employment_idx = _draw_categorical(rng, EMPLOYMENT_PROBS_BY_JOB, job_idx)
+
+    # Salário bruto: base * lognormal(educação) * categoria * região
+    job_multiplier_table = np.array([JOB_MULTIPLIERS.get(j, 0.0) for j in job_categories])
+    region_multiplier_table = np.array([REGION_MULTIPLIERS[r] for r in regions])
+    edu_params = np.array([EDU_LOGNORMAL_PARAMS[e] for e in education_levels])
+
+    edu_multiplier = rng.lognormal(edu_params[edu_idx, 0], edu_params[edu_idx, 1])
+    gross = (
+        BASE_SALARY *
+        edu_multiplier *
+        job_multiplier_table[job_idx] *
+        region_multiplier_table[region_idx]
+    )
+    gross_salary_brl = (np.rint(gross / 100) * 100).astype(np.int32)
+    gross_salary_brl[job_idx == job_categories.index('desempregado')] = 0
+
+    # Salário líquido por faixa do bruto
+    band_limits = [limit for limit, _ in NET_SALARY_BANDS]
+    band_factors = np.array([factor for _, factor in NET_SALARY_BANDS] + [NET_SALARY_TOP_FACTOR])
+    net_factor = band_factors[np.searchsorted(band_limits, gross_salary_brl, side='left')]
+    net_salary_brl = np.round(gross_salary_brl * net_factor, 2)
+
+    # Dependentes | faixa etária
+    dependents = _draw_categorical(rng, DEPENDENTS_PROBS_BY_AGE, np.digitize(age, AGE_DEPENDENTS_BINS))
+
+    # Situação de moradia
+    rent_idx = _draw_categorical(rng, rent_weights, size=n)
+
+    # Benefício social | faixa de renda líquida
+    benefit_prob = np.where(
+        net_salary_brl == 0,
+        BENEFIT_PROB_ZERO_INCOME,
+        BENEFIT_PROBS_BY_INCOME[np.searchsorted(BENEFIT_INCOME_BINS, net_salary_brl, side='left')]
+    )
+    receives_social_benefit = rng.random(n) < benefit_prob
+
+    city_codes = pd.Index(city_categories).get_indexer(city_table.ravel())
+    return {
+        'age': age, 'gender_idx': gender_idx, 'region_idx': region_idx,
+        'city_idx': city_codes[region_idx * city_table.shape[1] + city_idx],
+        'edu_idx': edu_idx, 'job_idx': job_idx, 'employment_idx': employment_idx,
+        'gross_salary_brl': gross_salary_brl, 'net_salary_brl': net_salary_brl,
+        'dependents': dependents, 'rent_idx': rent_idx,
+        'receives_social_benefit': receives_social_benefit,
+    }
+
+
+def _draw_country_block(rng, n, country, city_categories):
+    """
+    Atributos de n pessoas de um país fora do Brasil
+
+    Mesmas distribuições condicionais de educação, trabalho, dependentes e
+    moradia; salário sobre o salário mínimo local (sem multiplicador
+    regional), líquido pela alíquota efetiva média do país e convertido para
+    BRL. region_br fica vazio (regiões são brasileiras) e a cidade é uma das
+    cidades do país em economic_context_raw, sem remapeamento.
+    """
+    params = country_population_params(country)
+    age = rng.integers(18, 66, size=n)
+    gender_idx = rng.integers(0, len(genders), size=n)
+    city_codes = pd.Index(city_categories).get_indexer(params['cities'])
+    city_idx = city_codes[rng.integers(0, len(city_codes), size=n)]
+
+    edu_idx = _draw_categorical(rng, EDU_PROBS_BY_AGE, np.digitize(age, AGE_EDU_BINS))
+    job_idx = _draw_categorical(rng, JOB_PROBS_BY_EDU, edu_idx)
+    employment_idx = _draw_categorical(rng, EMPLOYMENT_PROBS_BY_JOB, job_idx)
+
+    job_multiplier_table = np.array([JOB_MULTIPLIERS.get(j, 0.0) for j in job_categories])
+    edu_params = np.array([EDU_LOGNORMAL_PARAMS[e] for e in education_levels])
+    edu_multiplier = rng.lognormal(edu_params[edu_idx, 0], edu_params[edu_idx, 1])
+    gross = params['min_wage_brl'] * edu_multiplier * job_multiplier_table[job_idx]
+    gross_salary_brl = (np.rint(gross / 100) * 100).astype(np.int32)
+    gross_salary_brl[job_idx == job_categories.index('desempregado')] = 0
+    net_salary_brl = np.round(gross_salary_brl * params['net_factor'], 2)
+
+    dependents = _draw_categorical(rng, DEPENDENTS_PROBS_BY_AGE, np.digitize(age, AGE_DEPENDENTS_BINS))
+    rent_idx = _draw_categorical(rng, rent_weights, size=n)
+
+    # Faixas de renda do benefício proporcionais ao salário mínimo do país
+    income_bins = np.array(BENEFIT_INCOME_BINS) * params['min_wage_brl'] / BASE_SALARY
+    benefit_prob = np.where(
+        net_salary_brl == 0,
+        BENEFIT_PROB_ZERO_INCOME,
+        BENEFIT_PROBS_BY_INCOME[np.searchsorted(income_bins, net_salary_brl, side='left')]
+    )
+    receives_social_benefit = rng.random(n) < benefit_prob
+
+    return {
+        'age': age, 'gender_idx': gender_idx, 'region_idx': np.full(n, -1),
+        'city_idx': city_idx, 'edu_idx': edu_idx, 'job_idx': job_idx,
+        'employment_idx': employment_idx, 'gross_salary_brl': gross_salary_brl,
+        'net_salary_brl': net_salary_brl, 'dependents': dependents, 'rent_idx': rent_idx,
+        'receives_social_benefit': receives_social_benefit,
+    }
+
+
+def country_sizes(rng, n, countries):
+    """Pessoas por país: multinomial sobre COUNTRY_WEIGHTS (sem sorteio com um só país)"""
+    if len(countries) == 1:
+        return [n]
+    weights = np.array([COUNTRY_WEIGHTS[country] for country in countries], dtype=float)
+    return rng.multinomial(n, weights / weights.sum()).tolist()
+
+
+def generate_people_vectorized(n_people, rng=None, start_key=0, with_uuid=True, countries=None):
+    """
+    Gera a população inteira como arrays NumPy (sem loop por pessoa)
+
+    Cada atributo é sorteado de uma só vez para todas as linhas; as
+    distribuições condicionais (educação|idade, trabalho|educação, ...)
+    usam as tabelas de probabilidade acima indexadas pelo grupo da linha.
+    Mantém as mesmas distribuições marginais e condicionais do loop.
+
+    countries: países da população (padrão: só o Brasil). Com mais de um, o
+    tamanho de cada país é sorteado por COUNTRY_WEIGHTS e as pessoas saem em
+    blocos contíguos por país, na ordem pedida; salários sempre em BRL.
+
+    person_key é a chave inteira densa (start_key, start_key + 1, ...) usada
+    em todos os joins do pipeline; person_id (UUID4) é apenas um identificador
+    externo opcional, sorteado por último para não alterar os demais atributos.
+    Enums saem como categóricos direto dos índices sorteados (ver schema.py).
+    """
+    if rng is None:
+        rng = np.random.default_rng(SEED)
+    countries = list(countries or [BASE_COUNTRY])
+    city_categories = people_city_categories(countries)
+
+    blocks = []
+    for country, size in zip(countries, country_sizes(rng, n_people, countries)):
+        if country == BASE_COUNTRY:
+            blocks.append(_draw_brazil_block(rng, size, city_categories))
+        else:
+            blocks.append(_draw_country_block(rng, size, country, city_categories))
+    cols = {key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]}
+    sizes = [len(block['age']) for block in blocks]
+
+    n = n_people
+    df = pd.DataFrame({
+        'person_key': np.arange(start_key, start_key + n, dtype=np.int64),
+        'age': cols['age'].astype(np.int8),
+        'gender': pd.Categorical.from_codes(cols['gender_idx'], genders),
+        'country': pd.Categorical.from_codes(np.repeat(np.arange(len(countries)), sizes), countries),
+        'region_br': pd.Categorical.from_codes(cols['region_idx'], regions),
+        'city_br': pd.Categorical.from_codes(cols['city_idx'], city_categories),
+        'education_level': pd.Categorical.from_codes(cols['edu_idx'], education_levels),
+        'job_category': pd.Categorical.from_codes(cols['job_idx'], job_categories),
+        'employment_type': pd.Categorical.from_codes(cols['employment_idx'], employment_types),
+        'gross_salary_brl': cols['gross_salary_brl'],
+        'net_salary_brl': cols['net_salary_brl'],
+        'dependents': cols['dependents'].astype(np.int8),
+        'rent_status': pd.Categorical.from_codes(cols['rent_idx'], rent_statuses),
+        'receives_social_benefit': cols['receives_social_benefit']
     })
 
-df_people = pd.DataFrame(people_data)
-df_people.to_csv('people_raw.csv', index=False, encoding='utf-8')
-print(f"✅ people_raw.csv gerado: {len(df_people)} registros")
+    if with_uuid:
+        df.insert(1, 'person_id', _uuid4_strings(rng, n))
+
+    return df
+
+
+PEOPLE_ENGINES = {
+    'vectorized': generate_people_vectorized,
+    'loop': generate_people_loop,
+}
+
 
 # ============================================================================
-# ARQUIVO 2: economic_context_raw.csv
+# ESCRITA EM BLOCOS (STREAMING) COM RETOMADA
 # ============================================================================
 
-print("\n🌍 Gerando economic_context_raw.csv...")
+CHUNK_SIZE = 1_000_000
+
+SUMMARY_COLUMNS = ['country', 'region_br', 'education_level', 'job_category']
+
+
+def _empty_people_stats():
+    """Acumuladores do resumo final (serializáveis em JSON)"""
+    return {
+        'count': 0,
+        'gross_sum': 0.0,
+        'unemployed': 0,
+        'informal': 0,
+        'social_benefit': 0,
+        # Salário bruto é múltiplo de 100: histograma exato para a mediana
+        'gross_hist': [],
+        'value_counts': {col: {} for col in SUMMARY_COLUMNS},
+    }
+
+
+def _update_people_stats(stats, df):
+    """Atualiza os acumuladores com um bloco da população"""
+    stats['count'] += len(df)
+    stats['gross_sum'] += float(df['gross_salary_brl'].sum())
+    stats['unemployed'] += int((df['employment_type'] == 'desempregado').sum())
+    stats['informal'] += int((df['employment_type'] == 'informal').sum())
+    stats['social_benefit'] += int(df['receives_social_benefit'].sum())
+
+    bins = np.bincount((df['gross_salary_brl'].to_numpy() // 100).astype(np.int64))
+    hist = np.array(stats['gross_hist'], dtype=np.int64)
+    if len(hist) < len(bins):
+        hist = np.pad(hist, (0, len(bins) - len(hist)))
+    hist[:len(bins)] += bins
+    stats['gross_hist'] = hist.tolist()
+
+    for col in SUMMARY_COLUMNS:
+        if col not in df.columns:  # country não existe no engine loop
+            continue
+        counts = stats['value_counts'][col]
+        for value, n in df[col].value_counts().items():
+            if n:  # categóricos listam também as categorias sem ocorrência
+                counts[value] = counts.get(value, 0) + int(n)
+
+    return stats
+
+
+def _merge_people_stats(stats, other):
+    """Combina os acumuladores de dois blocos (ordem irrelevante)"""
+    for key in ('count', 'gross_sum', 'unemployed', 'informal', 'social_benefit'):
+        stats[key] += other[key]
+
+    hist = np.array(stats['gross_hist'], dtype=np.int64)
+    other_hist = np.array(other['gross_hist'], dtype=np.int64)
+    size = max(len(hist), len(other_hist))
+    stats['gross_hist'] = (
+        np.pad(hist, (0, size - len(hist))) + np.pad(other_hist, (0, size - len(other_hist)))
+    ).tolist()
+
+    for col in SUMMARY_COLUMNS:
+        counts = stats['value_counts'][col]
+        for value, n in other['value_counts'][col].items():
+            counts[value] = counts.get(value, 0) + n
+
+    return stats
+
+
+def _median_from_hist(hist):
+    """Mediana do salário bruto a partir do histograma de faixas de R$ 100"""
+    hist = np.asarray(hist)
+    total = hist.sum()
+    if total == 0:
+        return 0.0
+    cumulative = np.cumsum(hist)
+    lower = np.searchsorted(cumulative, (total - 1) // 2, side='right')
+    upper = np.searchsorted(cumulative, total // 2, side='right')
+    return (lower + upper) / 2 * 100
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    tmp_path.write_text(json.dumps(payload), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def shard_seeds(n_shards, seed=SEED):
+    """
+    Sementes independentes por shard (SeedSequence.spawn)
+
+    O shard N sempre recebe o mesmo filho da SeedSequence raiz, então seu
+    conteúdo depende apenas de (seed, N, tamanho do shard) e não da ordem de
+    execução nem do número de workers.
+    """
+    return np.random.SeedSequence(seed).spawn(n_shards)
+
+
+def generate_people_shard(shard_seed, size, header, fmt, start_key, with_uuid, countries=None):
+    """
+    Gera um shard da população e já o serializa no formato de saída
+
+    Executado nos workers: devolve os bytes prontos para gravar e os
+    acumuladores do resumo, evitando trafegar o DataFrame entre processos.
+    """
+    rng = np.random.default_rng(shard_seed)
+    df = generate_people_vectorized(size, rng, start_key=start_key, with_uuid=with_uuid, countries=countries)
+    payload = storage.serialize_table(df, fmt, header=header)
+    return payload, _update_people_stats(_empty_people_stats(), df)
+
+
+def _iter_shards(tasks, workers):
+    """Executa os shards em ordem, em série ou num pool de processos com janela limitada"""
+    if workers == 1:
+        for task in tasks:
+            yield generate_people_shard(*task)
+        return
+
+    # Janela de shards em voo: mantém a memória limitada e a ordem de escrita
+    window = 2 * workers
+    tasks = iter(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            executor.submit(generate_people_shard, *task)
+            for task in islice(tasks, window)
+        )
+        while pending:
+            result = pending.popleft().result()
+            for task in islice(tasks, 1):
+                pending.append(executor.submit(generate_people_shard, *task))
+            yield result
+
+
+def write_people_chunked(output_dir, n_people, chunk_size=CHUNK_SIZE, seed=SEED,
+                         resume=True, workers=1, fmt=None, with_uuid=True, countries=None):
+    """
+    Gera e grava people_raw em shards de tamanho fixo
+
+    Cada shard usa seu próprio Generator (ver shard_seeds) e é serializado
+    na ordem dos índices; o pico de memória depende só de chunk_size e do
+    número de workers. Com workers > 1 os shards são gerados num pool de
+    processos; a saída é idêntica byte a byte para qualquer número de workers.
+
+    O shard N recebe as chaves person_key [N * chunk_size, ...), então a chave
+    também independe do número de workers.
+
+    Em CSV os shards são anexados a people_raw.csv; nos formatos colunares
+    cada shard vira um arquivo people_raw/part-NNNNN.<ext>.
+
+    Após cada shard é gravado um manifesto (people_raw.progress.json) com o
+    offset em bytes e os acumuladores do resumo; uma execução interrompida
+    retoma do último shard completo quando chamada com os mesmos parâmetros.
+
+    Retorna os acumuladores do resumo (ver _empty_people_stats).
+    """
+    fmt = storage.resolve_format(fmt)
+    output_dir = Path(output_dir)
+    manifest_path = output_dir / 'people_raw.progress.json'
+    params = {'n_people': n_people, 'chunk_size': chunk_size, 'seed': seed, 'format': fmt,
+              'with_uuid': with_uuid, 'countries': list(countries or [BASE_COUNTRY])}
+
+    if fmt == 'csv':
+        output_path = storage.dataset_path(output_dir, 'people_raw', fmt)
+    else:
+        output_path = output_dir / 'people_raw'
+        output_path.mkdir(parents=True, exist_ok=True)
+
+    # Sem linhas, um único shard vazio grava o schema (CSV só com o cabeçalho,
+    # parte colunar sem linhas com os tipos de schema.py): people_raw continua legível
+    n_shards = max(1, -(-n_people // chunk_size))
+    seeds = shard_seeds(n_shards, seed)
+    stats = _empty_people_stats()
+    shards_done = 0
+    offset = 0
+
+    if resume and manifest_path.exists() and output_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        if manifest['params'] == params:
+            shards_done = manifest['shards_done']
+            offset = manifest['offset']
+            stats = manifest['stats']
+            print(f"   ↩️  Retomando do shard {shards_done}/{n_shards}")
+        else:
+            print("   ⚠️  Manifesto com parâmetros diferentes, recomeçando do zero")
+    # Linhas já gravadas antes desta execução (fora da taxa de linhas/s)
+    resumed_rows = stats['count']
+
+    if fmt != 'csv':
+        # Partes de execuções anteriores além do último checkpoint
+        for part in output_path.glob('part-*'):
+            if int(part.name.split('.')[0].split('-')[1]) >= shards_done:
+                part.unlink()
+    storage.remove_shadowing(output_dir, 'people_raw', fmt)
+
+    tasks = [
+        (seeds[shard], min(chunk_size, n_people - shard * chunk_size), shard == 0, fmt,
+         shard * chunk_size, with_uuid, params['countries'])
+        for shard in range(shards_done, n_shards)
+    ]
+
+    with ExitStack() as stack:
+        if fmt == 'csv':
+            f = stack.enter_context(open(output_path, 'r+b' if offset else 'wb'))
+            # Descarta qualquer shard parcial escrito após o último checkpoint
+            f.truncate(offset)
+            f.seek(offset)
+
+        start = time.perf_counter()
+        for shard, (payload, shard_stats) in enumerate(_iter_shards(tasks, workers), start=shards_done):
+            if fmt == 'csv':
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                offset = f.tell()
+            else:
+                part_path = output_path / f"part-{shard:05d}{storage.FORMATS[fmt]}"
+                tmp_path = part_path.with_name(part_path.name + '.tmp')
+                tmp_path.write_bytes(payload)
+                os.replace(tmp_path, part_path)
+            _merge_people_stats(stats, shard_stats)
+
+            _write_json_atomic(manifest_path, {
+                'params': params,
+                'shards_done': shard + 1,
+                'offset': offset,
+                'stats': stats,
+            })
+            elapsed = time.perf_counter() - start
+            rows = stats['count']
+            rate = (rows - resumed_rows) / elapsed
+            print(f"   ✓ Shard {shard + 1}/{n_shards}: {rows:,}/{n_people:,} linhas ({rate:,.0f} linhas/s)")
+
+    manifest_path.unlink(missing_ok=True)
+    return stats
+
 
-economic_context_data = [
+# ============================================================================
+# TABELAS DE CONTEXTO (economic, cultural, opportunity, social)
+# ============================================================================
+
+ECONOMIC_CONTEXT_DATA = [
     # Brasil - principais cidades
     {
         'country': 'Brazil', 'city': 'São Paulo', 'currency': 'BRL',
@@ -330,17 +917,7 @@ economic_context_data = [
     }
 ]
 
-df_economic_context = pd.DataFrame(economic_context_data)
-df_economic_context.to_csv('economic_context_raw.csv', index=False, encoding='utf-8')
-print(f"✅ economic_context_raw.csv gerado: {len(df_economic_context)} registros")
-
-# ============================================================================
-# ARQUIVO 3: cultural_costs_raw.csv
-# ============================================================================
-
-print("\n🎭 Gerando cultural_costs_raw.csv...")
-
-cultural_costs_data = [
+CULTURAL_COSTS_DATA = [
     {
         'country': 'Brazil',
         'streaming_cost': 45.0,  # Netflix + Spotify
@@ -383,17 +960,7 @@ cultural_costs_data = [
     }
 ]
 
-df_cultural_costs = pd.DataFrame(cultural_costs_data)
-df_cultural_costs.to_csv('cultural_costs_raw.csv', index=False, encoding='utf-8')
-print(f"✅ cultural_costs_raw.csv gerado: {len(df_cultural_costs)} registros")
-
-# ============================================================================
-# ARQUIVO 4: opportunity_costs_raw.csv
-# ============================================================================
-
-print("\n🎓 Gerando opportunity_costs_raw.csv...")
-
-opportunity_costs_data = [
+OPPORTUNITY_COSTS_DATA = [
     {
         'country': 'Brazil',
         'technical_course': 400.0,  # mensal
@@ -436,17 +1003,7 @@ opportunity_costs_data = [
     }
 ]
 
-df_opportunity_costs = pd.DataFrame(opportunity_costs_data)
-df_opportunity_costs.to_csv('opportunity_costs_raw.csv', index=False, encoding='utf-8')
-print(f"✅ opportunity_costs_raw.csv gerado: {len(df_opportunity_costs)} registros")
-
-# ============================================================================
-# ARQUIVO 5: social_benefits_raw.csv
-# ============================================================================
-
-print("\n🏛️ Gerando social_benefits_raw.csv...")
-
-social_benefits_data = [
+SOCIAL_BENEFITS_DATA = [
     # Brasil
     {
         'country': 'Brazil',
@@ -578,46 +1135,201 @@ social_benefits_data = [
     }
 ]
 
-df_social_benefits = pd.DataFrame(social_benefits_data)
-df_social_benefits.to_csv('social_benefits_raw.csv', index=False, encoding='utf-8')
-print(f"✅ social_benefits_raw.csv gerado: {len(df_social_benefits)} registros")
-
 # ============================================================================
-# RESUMO FINAL
+# PIPELINE PRINCIPAL
 # ============================================================================
 
-print("\n" + "="*80)
-print("✅ GERAÇÃO COMPLETA!")
-print("="*80)
-
-print("\n📊 Estatísticas people_raw.csv:")
-print(f"   Total de pessoas: {len(df_people):,}")
-print(f"   Salário médio bruto: R$ {df_people['gross_salary_brl'].mean():,.2f}")
-print(f"   Salário mediano: R$ {df_people['gross_salary_brl'].median():,.2f}")
-print(f"   Taxa de desemprego: {(df_people['employment_type']=='desempregado').sum()/len(df_people)*100:.1f}%")
-print(f"   Taxa de informalidade: {(df_people['employment_type']=='informal').sum()/len(df_people)*100:.1f}%")
-print(f"   Recebem benefício social: {df_people['receives_social_benefit'].sum():,} ({df_people['receives_social_benefit'].sum()/len(df_people)*100:.1f}%)")
-
-print("\n📋 Distribuição por região:")
-print(df_people['region_br'].value_counts().sort_index())
-
-print("\n🎓 Distribuição por educação:")
-print(df_people['education_level'].value_counts())
-
-print("\n💼 Distribuição por categoria de trabalho:")
-print(df_people['job_category'].value_counts())
-
-print("\n🌍 Arquivos gerados:")
-print("   ✅ people_raw.csv")
-print("   ✅ economic_context_raw.csv")
-print("   ✅ cultural_costs_raw.csv")
-print("   ✅ opportunity_costs_raw.csv")
-print("   ✅ social_benefits_raw.csv")
-
-print("\n💡 Próximos passos sugeridos:")
-print("   1. Validar consistência dos dados")
-print("   2. Criar camada BRONZE (limpeza básica)")
-print("   3. Criar camada SILVER (normalização)")
-print("   4. Criar camada GOLD (métricas agregadas)")
-
-print("\n" + "="*80)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gera os datasets sintéticos da camada RAW")
+    parser.add_argument(
+        '--engine',
+        choices=sorted(PEOPLE_ENGINES),
+        default='vectorized',
+        help="Gerador da população: 'vectorized' (arrays NumPy) ou 'loop' (original, por pessoa)"
+    )
+    parser.add_argument(
+        '--n-people',
+        type=int,
+        default=N_PEOPLE,
+        help=f"Tamanho da população sintética (padrão: {N_PEOPLE:,})"
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=CHUNK_SIZE,
+        help=f"Linhas por shard gravado em people_raw (padrão: {CHUNK_SIZE:,})"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="Processos para gerar shards em paralelo (0 = todos os núcleos; padrão: 1)"
+    )
+    parser.add_argument(
+        '--no-resume',
+        action='store_true',
+        help="Ignora o manifesto de progresso e regera people_raw do zero"
+    )
+    parser.add_argument(
+        '--output-dir',
+        type=Path,
+        default=paths.RAW_DIR,
+        help=f"Diretório de saída dos arquivos RAW (padrão: {paths.RAW_DIR})"
+    )
+    parser.add_argument(
+        '--no-uuid',
+        action='store_true',
+        help="Não gera a coluna externa person_id (UUID4); o pipeline usa apenas person_key"
+    )
+    parser.add_argument(
+        '--format',
+        choices=sorted(storage.FORMATS),
+        default=storage.DEFAULT_FORMAT,
+        help=f"Formato de armazenamento (padrão: {storage.DEFAULT_FORMAT})"
+    )
+    parser.add_argument(
+        '--countries',
+        nargs='+',
+        choices=list(COUNTRY_WEIGHTS),
+        default=[BASE_COUNTRY],
+        help="Países da população, com participação proporcional a COUNTRY_WEIGHTS "
+             f"(padrão: {BASE_COUNTRY}; só com --engine vectorized)"
+    )
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size precisa ser >= 1")
+    if args.engine == 'loop' and args.countries != [BASE_COUNTRY]:
+        parser.error("--countries exige --engine vectorized")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("🚀 Iniciando geração de dados RAW...")
+
+    # ========================================================================
+    # ARQUIVO 1: people_raw
+    # ========================================================================
+
+    print(f"\n📊 Gerando people_raw ({args.n_people:,} pessoas)...")
+
+    output_dir = args.output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    if args.engine == 'loop':
+        # Engine original: população inteira em memória (apenas para comparação)
+        df_people = generate_people_loop(args.n_people)
+        if args.no_uuid:
+            df_people = df_people.drop(columns='person_id')
+        storage.write_table(df_people, output_dir, 'people_raw', args.format)
+        people_stats = _update_people_stats(_empty_people_stats(), df_people)
+        del df_people
+    else:
+        people_stats = write_people_chunked(
+            output_dir,
+            args.n_people,
+            chunk_size=args.chunk_size,
+            resume=not args.no_resume,
+            workers=args.workers or os.cpu_count(),
+            fmt=args.format,
+            with_uuid=not args.no_uuid,
+            countries=args.countries
+        )
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ people_raw gerado: {people_stats['count']} registros")
+    print(f"   ⏱️  Engine '{args.engine}': {elapsed:.2f}s ({people_stats['count'] / elapsed:,.0f} linhas/s)")
+
+    # ========================================================================
+    # ARQUIVO 2: economic_context_raw
+    # ========================================================================
+
+    print("\n🌍 Gerando economic_context_raw...")
+
+    df_economic_context = pd.DataFrame(ECONOMIC_CONTEXT_DATA)
+    storage.write_table(df_economic_context, output_dir, 'economic_context_raw', args.format)
+    print(f"✅ economic_context_raw gerado: {len(df_economic_context)} registros")
+
+    # ========================================================================
+    # ARQUIVO 3: cultural_costs_raw
+    # ========================================================================
+
+    print("\n🎭 Gerando cultural_costs_raw...")
+
+    df_cultural_costs = pd.DataFrame(CULTURAL_COSTS_DATA)
+    storage.write_table(df_cultural_costs, output_dir, 'cultural_costs_raw', args.format)
+    print(f"✅ cultural_costs_raw gerado: {len(df_cultural_costs)} registros")
+
+    # ========================================================================
+    # ARQUIVO 4: opportunity_costs_raw
+    # ========================================================================
+
+    print("\n🎓 Gerando opportunity_costs_raw...")
+
+    df_opportunity_costs = pd.DataFrame(OPPORTUNITY_COSTS_DATA)
+    storage.write_table(df_opportunity_costs, output_dir, 'opportunity_costs_raw', args.format)
+    print(f"✅ opportunity_costs_raw gerado: {len(df_opportunity_costs)} registros")
+
+    # ========================================================================
+    # ARQUIVO 5: social_benefits_raw
+    # ========================================================================
+
+    print("\n🏛️ Gerando social_benefits_raw...")
+
+    df_social_benefits = pd.DataFrame(SOCIAL_BENEFITS_DATA)
+    storage.write_table(df_social_benefits, output_dir, 'social_benefits_raw', args.format)
+    print(f"✅ social_benefits_raw gerado: {len(df_social_benefits)} registros")
+
+    # ========================================================================
+    # RESUMO FINAL
+    # ========================================================================
+
+    print("\n" + "="*80)
+    print("✅ GERAÇÃO COMPLETA!")
+    print("="*80)
+
+    total = people_stats['count']
+    counts = people_stats['value_counts']
+
+    print("\n📊 Estatísticas people_raw:")
+    print(f"   Total de pessoas: {total:,}")
+    if total:
+        print(f"   Salário médio bruto: R$ {people_stats['gross_sum'] / total:,.2f}")
+        print(f"   Salário mediano: R$ {_median_from_hist(people_stats['gross_hist']):,.2f}")
+        print(f"   Taxa de desemprego: {people_stats['unemployed']/total*100:.1f}%")
+        print(f"   Taxa de informalidade: {people_stats['informal']/total*100:.1f}%")
+        print(f"   Recebem benefício social: {people_stats['social_benefit']:,} ({people_stats['social_benefit']/total*100:.1f}%)")
+
+        if len(counts.get('country', {})) > 1:
+            print("\n🌍 Distribuição por país:")
+            print(pd.Series(counts['country'], name='count').sort_values(ascending=False))
+
+        print("\n📋 Distribuição por região:")
+        print(pd.Series(counts['region_br'], name='count').sort_index())
+
+        print("\n🎓 Distribuição por educação:")
+        print(pd.Series(counts['education_level'], name='count').sort_values(ascending=False))
+
+        print("\n💼 Distribuição por categoria de trabalho:")
+        print(pd.Series(counts['job_category'], name='count').sort_values(ascending=False))
+
+    print(f"\n🌍 Arquivos gerados ({args.format}):")
+    print("   ✅ people_raw")
+    print("   ✅ economic_context_raw")
+    print("   ✅ cultural_costs_raw")
+    print("   ✅ opportunity_costs_raw")
+    print("   ✅ social_benefits_raw")
+
+    print("\n💡 Próximos passos sugeridos:")
+    print("   1. Validar consistência dos dados")
+    print("   2. Criar camada BRONZE (limpeza básica)")
+    print("   3. Criar camada SILVER (normalização)")
+    print("   4. Criar camada GOLD (métricas agregadas)")
+
+    print("\n" + "="*80)
+
+
+if __name__ == "__main__":
+    main()
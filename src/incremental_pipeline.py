@@ -0,0 +1,489 @@
+"""
+Pipeline incremental (RAW → SILVER → GOLD) guiado por hashes de conteúdo
+Cada dataset RAW e cada parâmetro das etapas recebe um hash; só as etapas
+(e colunas) cuja linhagem mudou desde a última execução são recalculadas
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import generate_enriched_data as silver
+import generate_gold_data as gold
+import normalization_model
+import paths
+import person_table
+import profile_simulation
+import schema
+import social_benefits
+import storage
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+RAW_DIR = paths.RAW_DIR
+ENRICHED_DIR = paths.ENRICHED_DIR
+GOLD_DIR = paths.GOLD_DIR
+
+# Datasets RAW rastreados
+RAW_INPUTS = ['people_raw', 'economic_context_raw', 'cultural_costs_raw',
+              'opportunity_costs_raw', 'social_benefits_raw']
+
+# Parâmetros rastreados: nome -> módulo onde a configuração é definida
+PARAMS = {
+    'CITY_MAPPING': silver,
+    'DEPENDENCY_FACTOR': silver,
+    'BENEFIT_TAKE_UP_COLUMN': social_benefits,
+    'ZSCORE_GROUP_BY': silver,  # sobrescrito por --zscore-by
+    'FAMILY_PROFILES': profile_simulation,
+    'QLES_WEIGHTS': gold,
+    'CLUSTER_K_RANGE': gold,
+    'CLUSTER_K_CRITERION': gold,
+    'VULNERABILITY_FLAGS': gold,
+    'RISK_TIERS': gold,
+    'POLICY_SCENARIOS': gold,
+    'HOUSING_COST_SHARE': gold,
+    'FX_COST_SHARE': gold,
+}
+
+# Estado da última execução, um arquivo por camada (junto dos datasets que
+# descreve: apagar a camada também invalida o estado)
+STATE_FILE = 'pipeline_state.json'
+STATE_FORMAT = 1
+
+# Bloco de leitura ao calcular o hash dos arquivos RAW
+HASH_BLOCK_SIZE = 1 << 20
+
+
+# ============================================================================
+# HASHES DE CONTEÚDO
+# ============================================================================
+
+def file_digest(path, cache):
+    """
+    SHA-256 do conteúdo de um arquivo
+
+    cache: {caminho: {'size', 'mtime_ns', 'sha256'}} da execução anterior;
+    arquivos com tamanho e mtime inalterados não são relidos.
+    """
+    stat = path.stat()
+    cached = cache.get(str(path))
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return cached['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    cache[str(path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return cache[str(path)]['sha256']
+
+
+def hash_inputs(raw_dir, cache):
+    """Hash de cada dataset RAW (arquivo único, partes ou partições); None se ausente"""
+    hashes = {}
+    for name in RAW_INPUTS:
+        try:
+            path, fmt = storage.find_dataset(raw_dir, name)
+        except FileNotFoundError:
+            hashes[name] = None
+            continue
+        root = path if path.is_dir() else path.parent
+        digest = hashlib.sha256(fmt.encode())
+        for file in storage.dataset_files(raw_dir, name):
+            digest.update(str(file.relative_to(root)).encode())
+            digest.update(file_digest(file, cache).encode())
+        hashes[name] = digest.hexdigest()
+    return hashes
+
+
+def hash_value(value):
+    """Hash estável de um valor de configuração (JSON com chaves ordenadas)"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def hash_params(overrides=None):
+    values = {name: getattr(module, name) for name, module in PARAMS.items()}
+    values.update(overrides or {})
+    return {name: hash_value(value) for name, value in values.items()}
+
+
+# ============================================================================
+# GRAFO DE ETAPAS E LINHAGEM
+# ============================================================================
+
+def build_stages():
+    """
+    Grafo de etapas em ordem topológica: etapas SILVER, uma normalização por
+    métrica e um output GOLD por etapa
+
+    Cada etapa: layer, inputs (datasets RAW), params, requires (etapas),
+    columns (colunas de people_wide) e datasets produzidos.
+    """
+    stages = {
+        name: {'layer': 'silver', 'datasets': [], **spec}
+        for name, spec in silver.SILVER_STAGES.items()
+    }
+    producers = {col: name for name, spec in stages.items() for col in spec['columns']}
+
+    for metric in dict.fromkeys(silver.ZSCORE_METRICS + silver.MINMAX_METRICS):
+        columns = [f'{metric}_zscore'] if metric in silver.ZSCORE_METRICS else []
+        if metric in silver.MINMAX_METRICS:
+            columns.append(f'{metric}_minmax')
+        stages[f'normalize:{metric}'] = {
+            'layer': 'silver',
+            'inputs': [],
+            'params': ['ZSCORE_GROUP_BY'] if metric in silver.ZSCORE_METRICS else [],
+            'requires': [producers[metric]],
+            'columns': columns,
+            'datasets': [],
+            'metric': metric,
+        }
+        producers.update({col: f'normalize:{metric}' for col in columns})
+
+    dataset_producers = {ds: name for name, spec in stages.items() for ds in spec['datasets']}
+    for output, spec in gold.GOLD_OUTPUTS.items():
+        if spec.get('optional'):
+            continue
+        requires = [producers[gold.SILVER_COLUMN_ALIASES.get(col, col)] for col in spec['columns']]
+        requires += [dataset_producers[ds] for ds in spec['datasets']]
+        requires += spec.get('requires', [])
+        stages[output] = {
+            'layer': 'gold',
+            'inputs': [],
+            'params': spec.get('params', []),
+            'requires': list(dict.fromkeys(requires)),
+            'columns': [],
+            'datasets': [output],
+        }
+    return stages
+
+
+def stage_fingerprints(stages, input_hashes, param_hashes):
+    """Hash de cada etapa: seus inputs, params e os hashes das etapas de que depende"""
+    fingerprints = {}
+    for name, spec in stages.items():
+        payload = {
+            'inputs': {i: input_hashes.get(i) for i in spec['inputs']},
+            'params': {p: param_hashes.get(p) for p in spec['params']},
+            'requires': {r: fingerprints[r] for r in spec['requires']},
+        }
+        fingerprints[name] = hash_value(payload)
+    return fingerprints
+
+
+def column_lineage(stages):
+    """
+    Linhagem transitiva: para cada coluna/dataset, a etapa que o produz e
+    todos os datasets RAW e parâmetros dos quais depende
+    """
+    closure = {}
+    for name, spec in stages.items():
+        inputs, params = set(spec['inputs']), set(spec['params'])
+        for required in spec['requires']:
+            inputs |= closure[required][0]
+            params |= closure[required][1]
+        closure[name] = (inputs, params)
+
+    lineage = {'columns': {}, 'datasets': {}}
+    for name, spec in stages.items():
+        entry = {'stage': name, 'inputs': sorted(closure[name][0]), 'params': sorted(closure[name][1])}
+        for col in spec['columns']:
+            lineage['columns'][col] = entry
+        for ds in spec['datasets']:
+            lineage['datasets'][ds] = entry
+    return lineage
+
+
+# ============================================================================
+# ESTADO E PLANO
+# ============================================================================
+
+def state_path(layer):
+    return (ENRICHED_DIR if layer == 'silver' else GOLD_DIR) / STATE_FILE
+
+
+def load_state(layer):
+    path = state_path(layer)
+    if not path.is_file():
+        return {'inputs': {}, 'params': {}, 'stages': {}, 'files': {}}
+    state = json.loads(path.read_text(encoding='utf-8'))
+    if state.get('format') != STATE_FORMAT:
+        return {'inputs': {}, 'params': {}, 'stages': {}, 'files': {}}
+    return state
+
+
+def save_state(layer, stages, fingerprints, input_hashes, param_hashes, lineage, files=None):
+    """Grava o estado da camada (escrita atômica)"""
+    names = [name for name, spec in stages.items() if spec['layer'] == layer]
+    state = {
+        'format': STATE_FORMAT,
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+        'inputs': input_hashes,
+        'params': param_hashes,
+        'stages': {name: fingerprints[name] for name in names},
+        'lineage': {
+            'columns': {c: e for c, e in lineage['columns'].items() if e['stage'] in names},
+            'datasets': {d: e for d, e in lineage['datasets'].items() if e['stage'] in names},
+        },
+        'files': files or {},
+    }
+    path = state_path(layer)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def outputs_exist(name, spec):
+    """Confere se o que a etapa produz está em disco"""
+    directory = GOLD_DIR if spec['layer'] == 'gold' else ENRICHED_DIR
+    try:
+        for ds in spec['datasets']:
+            storage.find_dataset(directory, ds)
+        if spec['columns']:
+            available = set(storage.dataset_columns(ENRICHED_DIR, person_table.WIDE_TABLE))
+            # person_id é opcional (RAW gerada com --no-uuid)
+            if not set(spec['columns']) - {'person_id'} <= available:
+                return False
+    except FileNotFoundError:
+        return False
+    if 'metric' in spec:
+        return normalization_model.model_path(ENRICHED_DIR, normalization_model.SILVER_MODEL).is_file()
+    return True
+
+
+def plan_stages(stages, fingerprints, lineage, input_hashes, param_hashes, force=False):
+    """
+    Decide quais etapas recalcular
+
+    Retorna {etapa: motivo} só para as etapas invalidadas: hash da linhagem
+    diferente do estado salvo, saída ausente ou --force.
+    """
+    states = {layer: load_state(layer) for layer in ('silver', 'gold')}
+    entries = {**lineage['columns'], **lineage['datasets']}
+    closure = {e['stage']: e for e in entries.values()}
+
+    invalid = {}
+    for name, spec in stages.items():
+        state = states[spec['layer']]
+        if force:
+            invalid[name] = '--force'
+        elif not outputs_exist(name, spec):
+            invalid[name] = 'saída ausente'
+        elif name not in state['stages']:
+            invalid[name] = 'sem estado anterior'
+        elif state['stages'][name] != fingerprints[name]:
+            entry = closure.get(name, {'inputs': spec['inputs'], 'params': spec['params']})
+            changed = [i for i in entry['inputs'] if state['inputs'].get(i) != input_hashes.get(i)]
+            changed += [p for p in entry['params'] if state['params'].get(p) != param_hashes.get(p)]
+            invalid[name] = f"mudou: {', '.join(changed)}" if changed else 'linhagem alterada'
+    return invalid
+
+
+# ============================================================================
+# EXECUÇÃO
+# ============================================================================
+
+def recompute_stage(name, df, refs):
+    """Recalcula as colunas de uma etapa SILVER por pessoa"""
+    if name == 'household_costs':
+        return silver.calculate_household_costs(df, refs['economic_context_raw'], refs['social_benefits_raw'])
+    if name == 'economic_metrics':
+        return silver.calculate_economic_metrics(df, refs['economic_context_raw'])
+    if name == 'cultural_access':
+        return silver.calculate_cultural_access(df, refs['cultural_costs_raw'])
+    if name == 'opportunity_access':
+        return silver.calculate_opportunity_access(df, refs['opportunity_costs_raw'])
+    raise ValueError(f"Etapa SILVER desconhecida: {name}")
+
+
+def run_silver(stages, invalid, fmt, zscore_by):
+    """
+    Recalcula as etapas SILVER invalidadas
+
+    Com people_raw inalterado, parte de people_wide já gravada e substitui
+    apenas as colunas das etapas invalidadas; se people_raw mudou, refaz a
+    tabela inteira a partir da RAW (mesmo caminho de generate_enriched_data).
+    """
+    person_stages = [n for n, s in silver.SILVER_STAGES.items() if s['columns'] and n != 'people']
+    normalize_stages = [n for n in stages if 'metric' in stages[n]]
+
+    if 'people' in invalid:
+        recompute = person_stages + normalize_stages
+    else:
+        recompute = [n for n in person_stages + normalize_stages if n in invalid]
+
+    if recompute:
+        economic, cultural, opportunity, social = silver.load_person_reference_tables(RAW_DIR)
+        refs = {
+            'economic_context_raw': economic,
+            'cultural_costs_raw': cultural,
+            'opportunity_costs_raw': opportunity,
+            'social_benefits_raw': social,
+        }
+        if 'people' in invalid:
+            df = person_table.ensure_person_key(storage.read_table(RAW_DIR, 'people_raw'))
+            print(f"   ✓ people_raw: {len(df):,} pessoas (recálculo completo)")
+        else:
+            # Colunas gravadas em float32 voltam a float64 para os cálculos
+            df = schema.widen_floats(person_table.read_wide(ENRICHED_DIR))
+            print(f"   ✓ {person_table.WIDE_TABLE}: {len(df):,} pessoas (recálculo parcial)")
+
+        for name in person_stages:
+            if name in recompute:
+                df = df.drop(columns=[c for c in stages[name]['columns'] if c in df.columns])
+                df = recompute_stage(name, df, refs)
+                print(f"   ✓ {name}: {len(stages[name]['columns'])} colunas")
+
+        if 'household_costs' in recompute:
+            benefits = silver.generate_social_benefits_enriched(df, social)
+            storage.write_table(benefits, ENRICHED_DIR, 'social_benefits_enriched', fmt)
+            print(f"   ✓ social_benefits_enriched: {len(benefits):,} pares pessoa × programa")
+
+        metrics = [stages[n]['metric'] for n in normalize_stages if n in recompute]
+        if metrics:
+            fitted = normalization_model.fit(
+                df, zscore_by,
+                [m for m in metrics if m in silver.ZSCORE_METRICS],
+                [m for m in metrics if m in silver.MINMAX_METRICS],
+            )
+            df = normalization_model.apply(df, fitted)
+            # Estatísticas das métricas não recalculadas são mantidas
+            try:
+                previous = normalization_model.load(ENRICHED_DIR, normalization_model.SILVER_MODEL)
+            except FileNotFoundError:
+                previous = {'zscore': {}, 'minmax': {}}
+            model = {
+                'group_by': zscore_by,
+                'zscore': {**previous['zscore'], **fitted['zscore']},
+                'minmax': {**previous['minmax'], **fitted['minmax']},
+            }
+            version = normalization_model.save(model, ENRICHED_DIR, normalization_model.SILVER_MODEL,
+                                               metadata={'people': len(df), 'refit': metrics})
+            print(f"   ✓ normalização: {', '.join(metrics)} (modelo versão {version})")
+
+        people_wide = silver.generate_people_wide(df)
+        storage.write_table(people_wide, ENRICHED_DIR, person_table.WIDE_TABLE, fmt)
+        print(f"   ✓ {person_table.WIDE_TABLE} gravada ({len(people_wide):,} linhas)")
+
+    if 'cross_country' in invalid:
+        economic = silver.load_reference_tables(RAW_DIR)[0]
+        df_cross, df_comparisons = silver.generate_cross_country_comparison(None, economic)
+        storage.write_table(df_cross, ENRICHED_DIR, 'cross_country_family_simulation', fmt)
+        storage.write_table(df_comparisons, ENRICHED_DIR, 'cross_country_family_comparison', fmt)
+        print(f"   ✓ cross_country: {len(df_cross):,} simulações, {len(df_comparisons):,} comparações")
+
+
+def run_gold(invalid, fmt):
+    """Recalcula só os outputs GOLD invalidados (build_gold não expande dependências)"""
+    outputs = [output for output in gold.GOLD_OUTPUTS if output in invalid]
+    if outputs:
+        gold.build_gold(outputs, fmt=fmt)
+
+
+# ============================================================================
+# PIPELINE PRINCIPAL
+# ============================================================================
+
+def print_plan(stages, invalid):
+    for layer in ('silver', 'gold'):
+        print(f"   {layer.upper()}")
+        for name, spec in stages.items():
+            if spec['layer'] != layer:
+                continue
+            if name in invalid:
+                produced = f"{len(spec['columns'])} colunas" if spec['columns'] else ', '.join(spec['datasets'])
+                print(f"     ↻ {name:<36} {invalid[name]} → {produced}")
+            else:
+                print(f"     ✓ {name:<36} em dia")
+    print()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Executa SILVER e GOLD de forma incremental, recalculando só as etapas "
+                    "cujos dados RAW ou parâmetros mudaram"
+    )
+    parser.add_argument(
+        '--format',
+        choices=sorted(storage.FORMATS),
+        default=storage.DEFAULT_FORMAT,
+        help=f"Formato de armazenamento (padrão: {storage.DEFAULT_FORMAT})"
+    )
+    parser.add_argument(
+        '--zscore-by',
+        default=silver.ZSCORE_GROUP_BY,
+        choices=['country', 'region_br', 'city_br'],
+        help=f"Chave de agrupamento dos z-scores (padrão: {silver.ZSCORE_GROUP_BY})"
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help="Mostra o plano (etapas invalidadas e motivo) sem executar"
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help="Recalcula todas as etapas (ex.: após mudar o código das métricas)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 70)
+    print("PIPELINE INCREMENTAL (RAW → SILVER → GOLD)")
+    print("=" * 70)
+    print()
+
+    start = time.perf_counter()
+    silver_state = load_state('silver')
+    files = silver_state.get('files', {})
+    input_hashes = hash_inputs(RAW_DIR, files)
+    param_hashes = hash_params({'ZSCORE_GROUP_BY': args.zscore_by})
+    stages = build_stages()
+    fingerprints = stage_fingerprints(stages, input_hashes, param_hashes)
+    lineage = column_lineage(stages)
+    invalid = plan_stages(stages, fingerprints, lineage, input_hashes, param_hashes, args.force)
+    print(f"🔑 Hashes calculados em {time.perf_counter() - start:.2f}s")
+    print()
+
+    print("📋 Plano:")
+    print_plan(stages, invalid)
+    if args.dry_run:
+        return
+    if not invalid:
+        print("✅ Nada a recalcular: RAW e parâmetros inalterados")
+        return
+
+    silver_invalid = {n for n in invalid if stages[n]['layer'] == 'silver'}
+    if silver_invalid:
+        print("🥈 SILVER")
+        layer_start = time.perf_counter()
+        run_silver(stages, silver_invalid, args.format, args.zscore_by)
+        save_state('silver', stages, fingerprints, input_hashes, param_hashes, lineage, files)
+        print(f"   ⏱  {time.perf_counter() - layer_start:.2f}s")
+        print()
+
+    gold_invalid = {n for n in invalid if stages[n]['layer'] == 'gold'}
+    if gold_invalid:
+        print("🥇 GOLD")
+        layer_start = time.perf_counter()
+        run_gold(gold_invalid, args.format)
+        save_state('gold', stages, fingerprints, input_hashes, param_hashes, lineage)
+        print(f"   ⏱  {time.perf_counter() - layer_start:.2f}s")
+        print()
+
+    print(f"✅ {len(invalid)} de {len(stages)} etapas recalculadas em {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
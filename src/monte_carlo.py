@@ -0,0 +1,339 @@
+"""
+Simulação Monte Carlo de cenários de política
+Em vez de um choque determinístico, sorteia milhares de cenários por pessoa
+(inflação de aluguel, trajetórias de câmbio e transições para o desemprego)
+e reduz os resultados com agregadores online: a memória não cresce com o
+número de sorteios
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import generate_gold_data as gold
+import paths
+import person_table
+import storage
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+RAW_DIR = paths.RAW_DIR
+ENRICHED_DIR = paths.ENRICHED_DIR
+GOLD_DIR = paths.GOLD_DIR
+
+MC_DRAWS = 1_000
+MC_SEED = 42
+
+# Pessoas por tarefa (fixo: o resultado não depende do número de workers) e
+# sorteios avaliados por vez em cada tarefa (limita a memória)
+MC_CHUNK_PEOPLE = 10_000
+MC_DRAW_BATCH = 250
+
+# Choques macro, comuns a toda a população em cada sorteio
+RENT_INFLATION_RANGE = (0.05, 0.30)  # Uniforme
+FX_HORIZON_MONTHS = 12
+# Trajetórias mensais lognormais a partir das cotações de economic_context_raw
+# (drift e volatilidade anuais); o choque é a depreciação média do real na
+# cesta ao longo do horizonte
+FX_DRIFT = {'usd_rate': 0.0, 'eur_rate': 0.0}
+FX_VOLATILITY = {'usd_rate': 0.15, 'eur_rate': 0.13}
+FX_BASKET = {'usd_rate': 0.6, 'eur_rate': 0.4}
+
+# Choque individual: probabilidade de perder o emprego no horizonte, por tipo
+# de vínculo, e fração da renda líquida mantida (seguro-desemprego, bicos)
+UNEMPLOYMENT_PROBABILITY = {'CLT': 0.04, 'PJ': 0.06, 'informal': 0.10, 'desempregado': 0.0}
+UNEMPLOYMENT_REPLACEMENT = 0.40
+
+# Resposta do QLES à perda de renda (ver gold.SCENARIO_RESPONSES)
+MC_RESPONSE = {'response': 'proportional', 'base': 0.65, 'weight': 0.35}
+
+# Histograma do delta do QLES (%) para os percentis: precisão de meio ponto.
+# A faixa cobre todos os deltas possíveis (gold.scenario_qles limita o QLES
+# após o choque a [0, (1 + SCENARIO_MAX_GAIN) × QLES base]), então nenhum
+# valor é saturado nas pontas
+HIST_RANGE = (-100.0, 100.0 * gold.SCENARIO_MAX_GAIN)
+HIST_BINS = int(round((HIST_RANGE[1] - HIST_RANGE[0]) * 2))
+PERCENTILES = [5, 50, 95]
+
+PEOPLE_COLUMNS = ['renda_disponivel_real', 'cost_per_capita', 'net_salary_brl', 'employment_type']
+
+
+# ============================================================================
+# SORTEIOS
+# ============================================================================
+
+def load_fx_rates(raw_dir=RAW_DIR, country='Brazil'):
+    """Cotações iniciais (usd_rate, eur_rate) do país em economic_context_raw"""
+    context = storage.read_table(raw_dir, 'economic_context_raw', columns=['country', *FX_BASKET])
+    return context.loc[context['country'] == country, list(FX_BASKET)].mean().to_dict()
+
+
+def draw_macro_shocks(seed_seq, draws, fx_rates):
+    """
+    Choques comuns a todas as pessoas em cada sorteio
+
+    Retorna {'rent': (draws,), 'fx': (draws,)} e as cotações finais de cada
+    moeda (para o relatório).
+    """
+    rng = np.random.default_rng(seed_seq)
+    rent = rng.uniform(*RENT_INFLATION_RANGE, size=draws)
+
+    dt = 1 / 12
+    fx = np.zeros(draws)
+    final_rates = {}
+    for currency, weight in FX_BASKET.items():
+        sigma = FX_VOLATILITY[currency]
+        steps = rng.normal((FX_DRIFT[currency] - sigma ** 2 / 2) * dt, sigma * np.sqrt(dt),
+                           size=(draws, FX_HORIZON_MONTHS))
+        path = np.exp(np.cumsum(steps, axis=1))  # Cotação / cotação inicial, mês a mês
+        fx += weight * (path.mean(axis=1) - 1.0)
+        final_rates[currency] = fx_rates[currency] * path[:, -1]
+    return {'rent': rent, 'fx': fx}, final_rates
+
+
+# ============================================================================
+# AGREGAÇÃO ONLINE
+# ============================================================================
+
+def simulate_chunk(people, qles_base, macro, seed_seq):
+    """
+    Roda todos os sorteios para um bloco de pessoas (executado num worker)
+
+    Por pessoa mantém contagem, média e M2 do delta do QLES (Welford, lotes
+    combinados pela fórmula de Chan), contagem de renda negativa e um
+    histograma de HIST_BINS bins; nada depende do número de sorteios.
+    """
+    rng = np.random.default_rng(seed_seq)
+    n = len(people)
+    rdr = people['renda_disponivel_real'].to_numpy(dtype=float)
+    net = people['net_salary_brl'].to_numpy(dtype=float)
+    unemployment = people['employment_type'].astype(object).map(UNEMPLOYMENT_PROBABILITY) \
+        .fillna(0.0).to_numpy(dtype=float)
+
+    count = np.zeros(n)
+    mean = np.zeros(n)
+    m2 = np.zeros(n)
+    negative = np.zeros(n)
+    hist = np.zeros((n, HIST_BINS), dtype=np.int32)
+    low, high = HIST_RANGE
+    width = (high - low) / HIST_BINS
+    offsets = np.arange(n) * HIST_BINS
+
+    draws = len(macro['rent'])
+    for start in range(0, draws, MC_DRAW_BATCH):
+        batch = slice(start, start + MC_DRAW_BATCH)
+        loss = gold.SCENARIO_SHOCKS['rent'](macro['rent'][batch, None], people)
+        loss += gold.SCENARIO_SHOCKS['fx'](macro['fx'][batch, None], people)
+        unemployed = rng.random(loss.shape) < unemployment
+        loss += unemployed * (net * (1 - UNEMPLOYMENT_REPLACEMENT))
+
+        qles_after = gold.scenario_qles(qles_base, MC_RESPONSE['response'], MC_RESPONSE['base'],
+                                        MC_RESPONSE['weight'], rdr, loss)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = ((qles_after - qles_base) / qles_base) * 100
+        negative += (rdr - loss < 0).sum(axis=0)
+
+        # Welford em lote (Chan): só deltas finitos (QLES base 0 não tem delta)
+        valid = np.isfinite(delta)
+        batch_count = valid.sum(axis=0)
+        safe = np.where(valid, delta, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            batch_mean = np.where(batch_count > 0, safe.sum(axis=0) / batch_count, 0.0)
+        batch_m2 = (np.where(valid, delta - batch_mean, 0.0) ** 2).sum(axis=0)
+        total = count + batch_count
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shift = np.where(total > 0, batch_count / total, 0.0)
+        diff = batch_mean - mean
+        mean += diff * shift
+        m2 += batch_m2 + diff ** 2 * count * shift
+        count = total
+
+        bins = np.clip(((safe - low) / width).astype(np.int64), 0, HIST_BINS - 1)
+        flat = (bins + offsets)[valid]
+        hist += np.bincount(flat, minlength=n * HIST_BINS).reshape(n, HIST_BINS).astype(np.int32)
+
+    # Histogramas somados por cluster: só k linhas voltam ao processo principal
+    clusters = people['cluster_id'].to_numpy()
+    return {
+        'count': count, 'mean': mean, 'm2': m2,
+        'negative': negative / draws,
+        'percentiles': histogram_percentiles(hist, PERCENTILES),
+        'cluster_hist': {cid: hist[clusters == cid].sum(axis=0) for cid in np.unique(clusters)},
+    }
+
+
+def histogram_percentiles(hist, percentiles):
+    """Percentis (centro do bin) de cada linha de uma matriz de histogramas"""
+    low, high = HIST_RANGE
+    centers = low + (np.arange(HIST_BINS) + 0.5) * (high - low) / HIST_BINS
+    cumulative = np.cumsum(hist, axis=1)
+    total = cumulative[:, -1:]
+    result = {}
+    for p in percentiles:
+        position = (cumulative < np.ceil(total * p / 100)).sum(axis=1)
+        result[p] = np.where(total[:, 0] > 0, centers[np.minimum(position, HIST_BINS - 1)], np.nan)
+    return result
+
+
+def combine_groups(groups, count, mean, m2):
+    """Combina (contagem, média, M2) por pessoa em estatísticas por grupo (Chan)"""
+    frame = pd.DataFrame({'group': groups, 'count': count, 'sum': count * mean, 'm2': m2})
+    totals = frame.groupby('group', sort=True)[['count', 'sum', 'm2']].sum()
+    group_mean = totals['sum'] / totals['count']
+    spread = count * (mean - group_mean.reindex(groups).to_numpy()) ** 2
+    m2_total = totals['m2'] + pd.Series(spread).groupby(groups, sort=True).sum()
+    return totals['count'], group_mean, np.sqrt(m2_total / totals['count'])
+
+
+# ============================================================================
+# SIMULAÇÃO
+# ============================================================================
+
+def run_monte_carlo(people, qles_base, draws=MC_DRAWS, seed=MC_SEED, workers=0, fx_rates=None):
+    """
+    Simula `draws` sorteios para cada pessoa, em paralelo por blocos de pessoas
+
+    Fluxos independentes de números aleatórios (SeedSequence.spawn): um para
+    os choques macro e um por bloco de pessoas. Retorna (estatísticas por
+    pessoa, histograma agregado por cluster, cotações finais do câmbio).
+    """
+    macro_seq, people_seq = np.random.SeedSequence(seed).spawn(2)
+    macro, final_rates = draw_macro_shocks(macro_seq, draws, fx_rates or load_fx_rates())
+
+    starts = range(0, len(people), MC_CHUNK_PEOPLE)
+    chunk_seqs = people_seq.spawn(len(starts))
+    tasks = [(people.iloc[s:s + MC_CHUNK_PEOPLE], qles_base[s:s + MC_CHUNK_PEOPLE], macro, chunk_seq)
+             for s, chunk_seq in zip(starts, chunk_seqs)]
+
+    workers = min(workers or os.cpu_count(), max(len(tasks), 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_chunk, *zip(*tasks)))
+    else:
+        results = [simulate_chunk(*task) for task in tasks]
+
+    cluster_hist = pd.DataFrame(0, index=np.unique(people['cluster_id']), columns=range(HIST_BINS))
+    for result in results:
+        for cid, counts in result.pop('cluster_hist').items():
+            cluster_hist.loc[cid] += counts
+
+    stats = {
+        name: np.concatenate([result[name] for result in results])
+        for name in ('count', 'mean', 'm2', 'negative')
+    }
+    stats['percentiles'] = {
+        p: np.concatenate([result['percentiles'][p] for result in results]) for p in PERCENTILES
+    }
+    return stats, cluster_hist, final_rates
+
+
+def person_summary(people, qles_base, stats):
+    summary = people[gold.id_columns(people) + ['cluster_id']].copy()
+    summary['QLES_before'] = qles_base
+    summary['draws'] = stats['count'].astype(np.int32)
+    summary['delta_mean'] = np.where(stats['count'] > 0, stats['mean'], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        summary['delta_std'] = np.sqrt(stats['m2'] / stats['count'])
+    for p in PERCENTILES:
+        summary[f'delta_p{p:02d}'] = stats['percentiles'][p]
+    summary['prob_negative_income'] = stats['negative']
+    return summary
+
+
+def cluster_summary(people, stats, cluster_hist):
+    valid = stats['count'] > 0
+    groups = people['cluster_id'].to_numpy()
+    draws, mean, std = combine_groups(groups[valid], stats['count'][valid],
+                                      stats['mean'][valid], stats['m2'][valid])
+    summary = people.groupby('cluster_id', sort=True).agg(
+        cluster_label=('cluster_label', 'first'),
+        people=(person_table.PERSON_KEY, 'count'),
+    )
+    summary['draws'] = draws
+    summary['delta_mean'] = mean
+    summary['delta_std'] = std
+    percentiles = histogram_percentiles(cluster_hist.loc[summary.index].to_numpy(), PERCENTILES)
+    for p in PERCENTILES:
+        summary[f'delta_p{p:02d}'] = percentiles[p]
+    summary['prob_negative_income'] = pd.Series(stats['negative']).groupby(groups).mean()
+    return summary
+
+
+def load_inputs():
+    """Pessoas da SILVER com QLES e cluster da GOLD, alinhadas por person_key"""
+    key = person_table.PERSON_KEY
+    ids = [key, 'person_id'] if 'person_id' in storage.dataset_columns(GOLD_DIR, 'quality_of_life_score') else [key]
+    people = person_table.read_wide(ENRICHED_DIR, columns=[key] + PEOPLE_COLUMNS)
+    qles = storage.read_table(GOLD_DIR, 'quality_of_life_score', columns=ids + ['QLES'], latest_by=key)
+    clusters = storage.read_table(GOLD_DIR, 'socioeconomic_clusters',
+                                  columns=[key, 'cluster_id', 'cluster_label'], latest_by=key)
+    people = people.merge(qles, on=key).merge(clusters, on=key)
+    return people, people['QLES'].to_numpy(dtype=float)
+
+
+# ============================================================================
+# PIPELINE PRINCIPAL
+# ============================================================================
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Simulação Monte Carlo dos choques de política (estatísticas por pessoa e por cluster)"
+    )
+    parser.add_argument('--draws', type=int, default=MC_DRAWS,
+                        help=f"Sorteios por pessoa (padrão: {MC_DRAWS:,})")
+    parser.add_argument('--seed', type=int, default=MC_SEED,
+                        help=f"Semente raiz dos fluxos aleatórios (padrão: {MC_SEED})")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Processos (0 = todos os núcleos; 1 = em série)")
+    parser.add_argument(
+        '--format',
+        choices=sorted(storage.FORMATS),
+        default=storage.DEFAULT_FORMAT,
+        help=f"Formato de armazenamento (padrão: {storage.DEFAULT_FORMAT})"
+    )
+    parser.add_argument('--export-csv', action='store_true',
+                        help="Grava também cópias CSV dos datasets (consumo no Power BI)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 80)
+    print("🎲 MONTE CARLO — CENÁRIOS DE POLÍTICA")
+    print("=" * 80)
+    print()
+
+    people, qles_base = load_inputs()
+    print(f"📥 {len(people):,} pessoas × {args.draws:,} sorteios")
+    start = time.perf_counter()
+    stats, cluster_hist, final_rates = run_monte_carlo(people, qles_base, args.draws, args.seed, args.workers)
+    print(f"✅ Simulação concluída em {time.perf_counter() - start:.2f}s")
+    for currency, rates in final_rates.items():
+        p05, p50, p95 = np.percentile(rates, [5, 50, 95])
+        print(f"   {currency} em {FX_HORIZON_MONTHS} meses: P5 {p05:.2f} | P50 {p50:.2f} | P95 {p95:.2f}")
+    print()
+
+    persons = person_summary(people, qles_base, stats)
+    clusters = cluster_summary(people, stats, cluster_hist)
+    storage.write_table(persons, GOLD_DIR, 'monte_carlo_person', args.format, csv_export=args.export_csv)
+    storage.write_table(clusters, GOLD_DIR, 'monte_carlo_cluster', args.format,
+                        csv_export=args.export_csv, index=True)
+
+    print("📊 Por cluster (delta do QLES em %):")
+    for cluster_id, row in clusters.iterrows():
+        print(f"   {row['cluster_label']}: média {row['delta_mean']:.2f} | P5 {row['delta_p05']:.1f} | "
+              f"P95 {row['delta_p95']:.1f} | P(renda negativa) {row['prob_negative_income']:.1%}")
+    print()
+    print(f"💾 Salvo: monte_carlo_person ({len(persons):,} registros), monte_carlo_cluster ({len(clusters)} clusters)")
+
+
+if __name__ == "__main__":
+    main()
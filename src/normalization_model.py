@@ -0,0 +1,202 @@
+"""
+Modelo de normalização persistido (z-score, Min-Max e escala do QLES)
+Estatísticas ajustadas na população completa e reaplicadas a lotes novos
+sem recalcular as camadas inteiras; a persistência versionada também guarda
+o modelo de clusters da GOLD
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Versão do formato do artefato (muda só se a estrutura do JSON mudar)
+MODEL_FORMAT = 1
+
+# Nomes dos artefatos: estatísticas da SILVER, escala do QLES e modelo de
+# clusters (scaler + centróides + rótulos) na GOLD
+SILVER_MODEL = 'normalization_model'
+QLES_MODEL = 'qles_model'
+CLUSTER_MODEL = 'cluster_model'
+
+
+# ============================================================================
+# AJUSTE E APLICAÇÃO
+# ============================================================================
+
+def fit(df, group_by, zscore_metrics, minmax_metrics):
+    """
+    Ajusta as estatísticas de normalização numa população
+
+    Uma única agregação agrupada (média, desvio e contagem de todas as
+    métricas de z-score por grupo) e uma única agregação global (min/max).
+    """
+    zscore_metrics = [m for m in zscore_metrics if m in df.columns]
+    minmax_metrics = [m for m in minmax_metrics if m in df.columns]
+    model = {'group_by': group_by, 'zscore': {}, 'minmax': {}}
+
+    if zscore_metrics:
+        codes, groups = pd.factorize(df[group_by], sort=False)
+        stats = df[zscore_metrics].groupby(codes, sort=True).agg(['mean', 'std', 'count'])
+        stats = stats[stats.index >= 0]  # Linhas sem grupo não entram no ajuste
+        for metric in zscore_metrics:
+            model['zscore'][metric] = {
+                str(groups[code]): {
+                    'mean': _to_json(stats.at[code, (metric, 'mean')]),
+                    'std': _to_json(stats.at[code, (metric, 'std')]),
+                    'count': int(stats.at[code, (metric, 'count')]),
+                }
+                for code in stats.index
+            }
+
+    if minmax_metrics:
+        bounds = df[minmax_metrics].agg(['min', 'max'])
+        for metric in minmax_metrics:
+            model['minmax'][metric] = {
+                'min': _to_json(bounds.at['min', metric]),
+                'max': _to_json(bounds.at['max', metric]),
+            }
+
+    return model
+
+
+def apply(df, model):
+    """
+    Aplica um modelo ajustado: acrescenta <métrica>_zscore e <métrica>_minmax
+
+    Grupos degenerados (desvio 0 ou indefinido) recebem z-score 0.0; grupos
+    que não existiam no ajuste (ou chave ausente) ficam NaN.
+    """
+    if model['zscore']:
+        codes, groups = pd.factorize(df[model['group_by']], sort=False)
+        valid = codes >= 0
+        rows = np.where(valid, codes, 0)
+
+        for metric, by_group in model['zscore'].items():
+            if metric not in df.columns:
+                continue
+            # Estatísticas por grupo presente no lote, indexadas pelo código
+            mean = np.array([by_group.get(str(g), {}).get('mean', np.nan) for g in groups] or [np.nan], dtype=float)
+            std = np.array([by_group.get(str(g), {}).get('std', np.nan) for g in groups] or [np.nan], dtype=float)
+            known = np.array([str(g) in by_group for g in groups] or [False])
+
+            values = df[metric].to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                zscore = np.where(std[rows] > 0, (values - mean[rows]) / std[rows], 0.0)
+            df[f'{metric}_zscore'] = np.where(valid & known[rows], zscore, np.nan)
+
+    for metric, bounds in model['minmax'].items():
+        if metric not in df.columns:
+            continue
+        min_val, max_val = _from_json(bounds['min']), _from_json(bounds['max'])
+        if max_val > min_val:
+            df[f'{metric}_minmax'] = (df[metric] - min_val) / (max_val - min_val)
+        else:
+            df[f'{metric}_minmax'] = 0.0
+
+    return df
+
+
+def merge(models):
+    """
+    Combina modelos ajustados em partições disjuntas da população (ex.: países)
+
+    Z-score: cada grupo vem da única partição que o contém (a chave de
+    agrupamento precisa estar contida na chave de partição). Min-Max: menor
+    mínimo e maior máximo entre as partições. O resultado é igual ao de
+    fit() na população inteira.
+    """
+    merged = {'group_by': models[0]['group_by'], 'zscore': {}, 'minmax': {}}
+    for model in models:
+        for metric, by_group in model['zscore'].items():
+            groups = merged['zscore'].setdefault(metric, {})
+            overlap = set(groups) & set(by_group)
+            if overlap:
+                raise ValueError(f"Grupos de z-score em mais de uma partição ({metric}): {sorted(overlap)}")
+            groups.update(by_group)
+        for metric, bounds in model['minmax'].items():
+            current = merged['minmax'].setdefault(metric, dict(bounds))
+            current['min'] = _to_json(np.fmin(_from_json(current['min']), _from_json(bounds['min'])))
+            current['max'] = _to_json(np.fmax(_from_json(current['max']), _from_json(bounds['max'])))
+    return merged
+
+
+def fit_range(values):
+    """Ajusta a escala Min-Max de uma série (ex.: QLES_raw → 0-100)"""
+    return {'min': _to_json(values.min()), 'max': _to_json(values.max())}
+
+
+def apply_range(values, model, scale=1.0):
+    """Reescala uma série com uma escala ajustada (min → 0, max → scale)"""
+    min_val, max_val = _from_json(model['min']), _from_json(model['max'])
+    return ((values - min_val) / (max_val - min_val)) * scale
+
+
+def _to_json(value):
+    """Float do NumPy → valor JSON (inf/NaN como string, round-trip exato)"""
+    value = float(value)
+    return value if np.isfinite(value) else str(value)
+
+
+def _from_json(value):
+    return float(value)
+
+
+# ============================================================================
+# PERSISTÊNCIA VERSIONADA
+# ============================================================================
+
+def model_path(directory, name, version=None):
+    """<name>.json é sempre a versão mais recente; <name>.vNNNN.json o histórico"""
+    directory = Path(directory)
+    if version is None:
+        return directory / f"{name}.json"
+    return directory / f"{name}.v{version:04d}.json"
+
+
+def save(model, directory, name, metadata=None):
+    """
+    Grava uma nova versão do modelo e a torna a versão corrente
+
+    Retorna o número da versão gravada (1, 2, ...).
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        version = load(directory, name)['version'] + 1
+    except FileNotFoundError:
+        version = 1
+
+    artifact = {
+        'format': MODEL_FORMAT,
+        'name': name,
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'metadata': metadata or {},
+        **model,
+    }
+    payload = json.dumps(artifact, ensure_ascii=False, indent=2)
+    for path in (model_path(directory, name, version), model_path(directory, name)):
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(payload, encoding='utf-8')
+        os.replace(tmp_path, path)
+    return version
+
+
+def load(directory, name, version=None):
+    """Carrega a versão corrente (ou uma versão específica) do modelo"""
+    path = model_path(directory, name, version)
+    if not path.is_file():
+        raise FileNotFoundError(f"Modelo '{path.name}' não encontrado em {directory}")
+    model = json.loads(path.read_text(encoding='utf-8'))
+    if model.get('format') != MODEL_FORMAT:
+        raise ValueError(f"Formato de modelo não suportado: {model.get('format')!r} (esperado {MODEL_FORMAT})")
+    return model
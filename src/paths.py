@@ -0,0 +1,20 @@
+"""
+Diretórios das camadas do pipeline (RAW, SILVER e GOLD)
+Resolvidos a partir da raiz do repositório, independentes do diretório de
+onde cada script é executado
+"""
+
+import os
+from pathlib import Path
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Raiz do repositório (pai de src/), sobrescrevível por variável de ambiente
+ROOT_DIR = Path(os.environ.get('ERS_ROOT_DIR', Path(__file__).resolve().parent.parent))
+
+RAW_DIR = ROOT_DIR / 'raw'
+ENRICHED_DIR = ROOT_DIR / 'enriched'
+GOLD_DIR = ROOT_DIR / 'gold'
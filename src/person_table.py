@@ -0,0 +1,210 @@
+"""
+Tabela larga de pessoas da camada SILVER
+Um único dataset canônico (people_wide) com todas as métricas por pessoa;
+os quatro datasets enriched por pessoa são visões (projeções) dele
+"""
+
+import numpy as np
+
+import storage
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+WIDE_TABLE = 'people_wide'
+
+# Chave interna por pessoa (int64 contígua); person_id (UUID) é só um
+# identificador externo opcional, mantido quando existe na camada RAW
+PERSON_KEY = 'person_key'
+
+# Colunas de cada visão por pessoa (ordem preservada nas exportações)
+PERSON_VIEWS = {
+    'people_enriched': [
+        'person_key', 'person_id', 'age', 'gender', 'region_br', 'city_br', 'education_level',
+        'job_category', 'employment_type', 'gross_salary_brl', 'net_salary_brl',
+        'dependents', 'rent_status', 'receives_social_benefit',
+        # Custos
+        'total_household_cost', 'housing_cost', 'dependent_adjustment',
+        # Benefícios
+        'total_social_benefits',
+        # Métricas principais
+        'renda_disponivel_real',
+        'economic_pressure_ratio',
+        'epr_clean',  # EPR limpo para análises
+        'cost_per_capita',
+        'adjusted_min_wage',
+        'dist_salario_minimo_ajustado',
+        'subsistence_gap',
+        'social_support_ratio',
+        # Normalizações
+        'renda_disponivel_real_zscore',
+        'renda_disponivel_real_minmax',
+        'economic_pressure_ratio_minmax'
+    ],
+    'household_costs_enriched': [
+        'person_key', 'person_id', 'city_br', 'dependents', 'rent_status',
+        'housing_cost',
+        'basic_food_cost',
+        'transport_cost',
+        'utilities_cost',
+        'healthcare_cost',
+        'dependent_adjustment',
+        'total_household_cost',
+        'cost_per_capita',
+        'economic_pressure_ratio',
+        'epr_clean'  # EPR limpo para análises
+    ],
+    'cultural_access_enriched': [
+        'person_key', 'person_id', 'country', 'city_br',
+        'renda_disponivel_real',
+        'streaming_cost', 'internet_cost', 'cinema_ticket',
+        'cultural_events', 'music_subscription',
+        'cultural_basic_cost',
+        'iac_raw',
+        'iac_raw_zscore',
+        'iac_raw_minmax'
+    ],
+    'opportunity_access_enriched': [
+        'person_key', 'person_id', 'country', 'city_br',
+        'renda_disponivel_real',
+        'technical_course', 'college_private', 'language_course',
+        'emergency_savings_target', 'mobility_cost',
+        'ioe_technical', 'ioe_college', 'ioe_language',
+        'ioe_savings', 'ioe_mobility',
+        'ioe_raw',
+        'ioe_raw_zscore',
+        'ioe_raw_minmax'
+    ],
+}
+
+# Colunas das tabelas de dimensão por tabela RAW (custos iguais para todas as
+# pessoas da mesma cidade/país): não são gravadas em people_wide; as visões
+# que as listam recebem os valores por consulta de índice na exportação e na
+# leitura (lookup de generate_enriched_data.dimension_lookup)
+DIMENSION_COLUMNS = {
+    'economic_context_raw': ['basic_food_cost', 'transport_cost', 'utilities_cost', 'healthcare_cost'],
+    'cultural_costs_raw': ['streaming_cost', 'internet_cost', 'cinema_ticket', 'cultural_events',
+                           'music_subscription'],
+    'opportunity_costs_raw': ['technical_course', 'college_private', 'language_course',
+                              'emergency_savings_target', 'mobility_cost'],
+}
+DIMENSION_VALUE_COLUMNS = {col for cols in DIMENSION_COLUMNS.values() for col in cols}
+
+# Colunas da pessoa que localizam as linhas das dimensões
+DIMENSION_KEYS = ['country', 'city_br']
+
+# Colunas da tabela larga: união das visões, sem repetições nem colunas de dimensão
+WIDE_COLUMNS = list(dict.fromkeys(
+    col for cols in PERSON_VIEWS.values() for col in cols if col not in DIMENSION_VALUE_COLUMNS
+))
+
+
+# ============================================================================
+# CHAVE POR PESSOA
+# ============================================================================
+
+def ensure_person_key(df):
+    """
+    Garante a coluna person_key em frames de árvores antigas (só com person_id)
+
+    A chave é a posição da linha no dataset, a mesma atribuída pelo gerador RAW.
+    """
+    if PERSON_KEY not in df.columns:
+        df.insert(0, PERSON_KEY, np.arange(len(df), dtype=np.int64))
+    return df
+
+
+# ============================================================================
+# ESCRITA
+# ============================================================================
+
+def build_wide_table(df):
+    """Seleciona as colunas canônicas por pessoa (uma única cópia de cada)"""
+    return df[[col for col in WIDE_COLUMNS if col in df.columns]]
+
+
+def build_view(df, view, lookup=None):
+    """
+    Projeta uma visão por pessoa a partir da tabela larga (ou do frame completo)
+
+    lookup(df, colunas) -> {coluna: vetor}: preenche as colunas de dimensão
+    da visão que não estão no frame; sem ele, essas colunas são omitidas.
+    """
+    columns = PERSON_VIEWS[view]
+    missing = [col for col in columns if col in DIMENSION_VALUE_COLUMNS and col not in df.columns]
+    if missing and lookup is not None:
+        df = df.assign(**lookup(df, missing))
+    return df[[col for col in columns if col in df.columns]]
+
+
+def export_views(df, directory, views=None, fmt=None, csv_export=False, lookup=None):
+    """
+    Materializa visões por pessoa como datasets separados
+
+    Só necessário para consumidores externos (ex.: Power BI); os leitores do
+    pipeline projetam as visões direto da tabela larga. As colunas de
+    dimensão das visões vêm de lookup (ver build_view).
+    """
+    for view in views or PERSON_VIEWS:
+        view_df = build_view(df, view, lookup)
+        storage.write_table(view_df, directory, view, fmt, csv_export=csv_export)
+        print(f"   ✓ {view} ({len(view_df):,} linhas, visão exportada)")
+
+
+# ============================================================================
+# LEITURA
+# ============================================================================
+
+def read_wide(directory, columns=None, filters=None):
+    """
+    Lê a tabela larga (projeção e filtros empurrados para a leitura)
+
+    Lotes pontuados incrementalmente ficam em partes separadas; a versão
+    mais recente de cada person_key prevalece.
+    """
+    return storage.read_table(directory, WIDE_TABLE, columns=columns, filters=filters, latest_by=PERSON_KEY)
+
+
+def has_wide_table(directory):
+    try:
+        storage.find_dataset(directory, WIDE_TABLE)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def read_person_view(directory, view, columns=None, filters=None, lookup=None):
+    """
+    Lê uma visão por pessoa
+
+    Usa a tabela larga quando ela existe (projeção direta, sem joins);
+    cai para o arquivo da visão em árvores antigas sem people_wide.
+    lookup: preenche as colunas de dimensão da visão (ver build_view); só
+            as chaves de dimensão são lidas a mais da tabela larga
+    """
+    if has_wide_table(directory):
+        available = set(storage.dataset_columns(directory, WIDE_TABLE))
+        if columns is None:
+            columns = [col for col in PERSON_VIEWS[view]
+                       if col in available or (lookup is not None and col in DIMENSION_VALUE_COLUMNS)]
+        stored = [col for col in columns if col in available]
+        dimension_columns = [col for col in columns if col not in available and col in DIMENSION_VALUE_COLUMNS]
+        if not dimension_columns or lookup is None:
+            return read_wide(directory, columns=stored, filters=filters)
+
+        keys = [key for key in DIMENSION_KEYS if key in available and key not in stored]
+        df = read_wide(directory, columns=stored + keys, filters=filters)
+        df = df.assign(**lookup(df, dimension_columns))
+        return df[[col for col in columns if col in df.columns]]
+
+    if PERSON_KEY in storage.dataset_columns(directory, view):
+        return storage.read_table(directory, view, columns=columns, filters=filters)
+
+    # Visão antiga sem person_key: a chave é posicional, então a leitura é
+    # completa e o filtro de linhas é aplicado só depois de atribuí-la
+    df = ensure_person_key(storage.read_table(directory, view))
+    if filters:
+        df = df[storage.filter_mask(df, filters)].reset_index(drop=True)
+    return df[columns] if columns is not None else df
@@ -0,0 +1,315 @@
+"""
+Motor de simulação de perfis familiares × cidades
+Avalia a fórmula de custo domiciliar para uma grade arbitrária de perfis em
+todas as cidades de uma vez (arrays perfil × cidade com broadcasting)
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Perfis familiares típicos (simulação cross-country original)
+FAMILY_PROFILES = [
+    {
+        'profile_id': 'F1',
+        'description': 'Casal sem filhos, classe média',
+        'net_salary': 6000,
+        'dependents': 0,
+        'rent_status': 'aluguel'
+    },
+    {
+        'profile_id': 'F2',
+        'description': 'Família com 2 filhos, classe média',
+        'net_salary': 8000,
+        'dependents': 2,
+        'rent_status': 'aluguel'
+    },
+    {
+        'profile_id': 'F3',
+        'description': 'Família com 3 filhos, classe média-baixa',
+        'net_salary': 5000,
+        'dependents': 3,
+        'rent_status': 'aluguel'
+    },
+    {
+        'profile_id': 'F4',
+        'description': 'Profissional solteiro, classe média-alta',
+        'net_salary': 10000,
+        'dependents': 0,
+        'rent_status': 'aluguel'
+    },
+]
+
+# Fator sobre o aluguel por situação de moradia
+# (próprio/cedido: 50% do aluguel em manutenção/IPTU)
+HOUSING_FACTOR = {
+    'aluguel': 1.0,
+    'próprio': 0.5,
+    'cedido': 0.5,
+}
+
+# Custo adicional por dependente (escala de consumo)
+DEPENDENT_WEIGHTS = {
+    'basic_food_cost': 0.6,   # Criança consome ~60% do adulto em comida
+    'utilities_cost': 0.3,    # 30% adicional em utilities
+    'healthcare_cost': 0.4,   # 40% adicional em saúde
+}
+
+# Composição do domicílio: número de adultos
+HOUSEHOLD_COMPOSITIONS = {
+    'um_adulto': 1,
+    'dois_adultos': 2,
+}
+
+# Custo de cada adulto além do primeiro (consumo individual completo,
+# utilities compartilhadas)
+EXTRA_ADULT_WEIGHTS = {
+    'basic_food_cost': 1.0,
+    'transport_cost': 1.0,
+    'utilities_cost': 0.3,
+    'healthcare_cost': 1.0,
+}
+
+# Grade padrão de perfis (produto cartesiano das dimensões)
+DEFAULT_PROFILE_GRID = {
+    'net_salary': list(range(1500, 30001, 500)),
+    'max_dependents': 5,
+    'rent_status': list(HOUSING_FACTOR),
+    'household': list(HOUSEHOLD_COMPOSITIONS),
+}
+
+# Perfis avaliados por bloco (limita a memória dos arrays perfil × cidade)
+PROFILE_CHUNK_SIZE = 50_000
+
+COST_COLUMNS = ['avg_rent_single', 'avg_rent_family', 'basic_food_cost', 'transport_cost',
+                'utilities_cost', 'healthcare_cost', 'usd_rate']
+
+
+# ============================================================================
+# GRADE DE PERFIS
+# ============================================================================
+
+def build_profile_grid(net_salary=None, max_dependents=None, rent_status=None, household=None):
+    """
+    Produto cartesiano faixas salariais × dependentes (0..N) × moradia × composição
+
+    Parâmetros omitidos usam DEFAULT_PROFILE_GRID. Retorna um DataFrame com
+    uma linha por perfil (profile_id G0000001, G0000002, ...).
+    """
+    net_salary = DEFAULT_PROFILE_GRID['net_salary'] if net_salary is None else net_salary
+    max_dependents = DEFAULT_PROFILE_GRID['max_dependents'] if max_dependents is None else max_dependents
+    rent_status = rent_status or DEFAULT_PROFILE_GRID['rent_status']
+    household = household or DEFAULT_PROFILE_GRID['household']
+
+    grid = pd.MultiIndex.from_product(
+        [net_salary, range(max_dependents + 1), rent_status, household],
+        names=['net_salary', 'dependents', 'rent_status', 'household']
+    ).to_frame(index=False)
+
+    grid.insert(0, 'profile_id', [f"G{i:07d}" for i in range(1, len(grid) + 1)])
+    grid.insert(1, 'description', (
+        grid['household'].astype(str) + ', ' + grid['dependents'].astype(str) + ' dependentes, ' +
+        grid['rent_status'].astype(str) + ', renda ' + grid['net_salary'].astype(str)
+    ))
+    grid['adults'] = grid['household'].map(HOUSEHOLD_COMPOSITIONS).astype(np.int8)
+    return grid
+
+
+# ============================================================================
+# SIMULAÇÃO
+# ============================================================================
+
+def simulate_profile_costs(profiles, economic_df):
+    """
+    Avalia custos e RDR de cada perfil em cada cidade (arrays P × C)
+
+    profiles: DataFrame com net_salary, dependents, rent_status e,
+              opcionalmente, adults (padrão 1)
+    Retorna um dict de arrays (P, C): total_household_cost_local,
+    net_salary_usd, total_household_cost_usd, renda_disponivel_real_usd e
+    per_capita_rdr.
+    """
+    city = {col: economic_df[col].to_numpy(dtype=float)[None, :] for col in COST_COLUMNS}
+
+    net_salary = profiles['net_salary'].to_numpy(dtype=float)[:, None]
+    dependents = profiles['dependents'].to_numpy(dtype=float)[:, None]
+    adults = (profiles['adults'].to_numpy(dtype=float) if 'adults' in profiles
+              else np.ones(len(profiles)))[:, None]
+    housing_factor = profiles['rent_status'].map(HOUSING_FACTOR).to_numpy(dtype=float)[:, None]
+
+    # Aluguel de solteiro só para quem mora sozinho e sem dependentes
+    living_alone = (dependents == 0) & (adults == 1)
+    housing_cost = np.where(living_alone, city['avg_rent_single'], city['avg_rent_family']) * housing_factor
+
+    dependent_adjustment = dependents * sum(city[col] * w for col, w in DEPENDENT_WEIGHTS.items())
+    extra_adult_cost = (adults - 1) * sum(city[col] * w for col, w in EXTRA_ADULT_WEIGHTS.items())
+
+    total_cost = (
+        housing_cost +
+        city['basic_food_cost'] +
+        city['transport_cost'] +
+        city['utilities_cost'] +
+        city['healthcare_cost'] +
+        dependent_adjustment +
+        extra_adult_cost
+    )
+
+    # Converte para USD para comparação internacional
+    net_salary_usd = net_salary / city['usd_rate']
+    total_cost_usd = total_cost / city['usd_rate']
+    rdr_usd = net_salary_usd - total_cost_usd
+
+    return {
+        'total_household_cost_local': total_cost,
+        'net_salary_usd': net_salary_usd,
+        'total_household_cost_usd': total_cost_usd,
+        'renda_disponivel_real_usd': rdr_usd,
+        'per_capita_rdr': rdr_usd / (dependents + adults),
+    }
+
+
+def simulate_profiles(profiles, economic_df, chunk_size=PROFILE_CHUNK_SIZE):
+    """
+    Tabela longa perfil × cidade (formato de cross_country_family_simulation)
+
+    Ordem: perfil no laço externo, cidade (ordem de economic_df) no interno.
+    Os perfis são avaliados em blocos de chunk_size para limitar a memória.
+    """
+    profiles = pd.DataFrame(profiles).reset_index(drop=True)
+    economic_df = economic_df.reset_index(drop=True)
+    n_cities = len(economic_df)
+    countries = economic_df['country'].to_numpy(dtype=object)
+    cities = economic_df['city'].to_numpy(dtype=object)
+
+    frames = []
+    for start in range(0, len(profiles), chunk_size):
+        block = profiles.iloc[start:start + chunk_size]
+        arrays = simulate_profile_costs(block, economic_df)
+        n_block = len(block)
+        frames.append(pd.DataFrame({
+            'profile_id': np.repeat(block['profile_id'].to_numpy(dtype=object), n_cities),
+            'description': np.repeat(block['description'].to_numpy(dtype=object), n_cities),
+            'country': np.tile(countries, n_block),
+            'city': np.tile(cities, n_block),
+            'dependents': np.repeat(block['dependents'].to_numpy(), n_cities),
+            'net_salary_local': np.repeat(block['net_salary'].to_numpy(), n_cities),
+            'net_salary_usd': arrays['net_salary_usd'].ravel(),
+            'total_household_cost_local': arrays['total_household_cost_local'].ravel(),
+            'total_household_cost_usd': arrays['total_household_cost_usd'].ravel(),
+            'renda_disponivel_real_usd': arrays['renda_disponivel_real_usd'].ravel(),
+            'per_capita_rdr': arrays['per_capita_rdr'].ravel(),
+        }))
+
+    return pd.concat(frames, ignore_index=True) if len(frames) != 1 else frames[0]
+
+
+# ============================================================================
+# RANKING
+# ============================================================================
+
+def dense_rank_rows(values, ascending=False):
+    """Rank denso em cada linha de uma matriz (P, C), ordenando linha a linha"""
+    key = values if ascending else -values
+    order = np.argsort(key, axis=1, kind='stable')
+    sorted_key = np.take_along_axis(key, order, axis=1)
+
+    new_value = np.ones(sorted_key.shape, dtype=bool)
+    new_value[:, 1:] = sorted_key[:, 1:] != sorted_key[:, :-1]
+
+    ranks = np.empty(key.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, np.cumsum(new_value, axis=1), axis=1)
+    return ranks
+
+
+def grouped_dense_rank(values, groups, ascending=False):
+    """
+    Rank denso de values dentro de cada grupo (equivale a groupby().rank('dense'))
+
+    groups: códigos inteiros do grupo de cada linha
+    Quando os grupos formam blocos contíguos de mesmo tamanho (layout de
+    simulate_profiles: perfil × cidades), ordena cada linha da matriz
+    (P, C); caso geral, uma única ordenação lexicográfica (grupo, valor).
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Cada grupo num único bloco contíguo, todos do mesmo tamanho?
+    block_start = np.r_[True, groups[1:] != groups[:-1]]
+    n_blocks = int(block_start.sum())
+    if len(values) % n_blocks == 0 and n_blocks == len(np.unique(groups[block_start])):
+        matrix_groups = groups.reshape(n_blocks, -1)
+        if (matrix_groups == matrix_groups[:, :1]).all():
+            return dense_rank_rows(values.reshape(n_blocks, -1), ascending).ravel()
+
+    key = values if ascending else -values
+    order = np.lexsort((key, groups))
+
+    sorted_key = key[order]
+    sorted_groups = groups[order]
+    group_start = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+    new_value = group_start | np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+
+    # Contagem de valores distintos acumulada, reiniciada a cada grupo
+    distinct = np.cumsum(new_value)
+    offset = np.maximum.accumulate(np.where(group_start, distinct - 1, 0))
+
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[order] = distinct - offset
+    return ranks
+
+
+RANKING_KEYS = ['profile_id', 'description', 'country', 'city']
+
+
+def rank_profiles(simulation_df):
+    """
+    Ranking das cidades para cada perfil pelo proxy de QLES (RDR per capita)
+
+    Mesmo resultado de groupby(perfil).rank('dense') + agregação por
+    perfil/local + ordenação por (perfil, posição), sem groupby no caso
+    comum de uma linha por perfil × local.
+    """
+    per_capita_rdr = simulation_df['per_capita_rdr'].to_numpy(dtype=float)
+    qles_proxy = per_capita_rdr / np.nanmax(per_capita_rdr) * 100
+    codes = {col: pd.factorize(simulation_df[col], sort=True)[0] for col in RANKING_KEYS}
+
+    rankings = simulation_df[RANKING_KEYS].copy()
+    rankings['QLES_avg'] = qles_proxy
+    rankings['avg_per_capita_rdr'] = per_capita_rdr
+    rankings['rank_position'] = grouped_dense_rank(qles_proxy, codes['profile_id'])
+
+    # Perfil + local repetido (várias linhas por local): média, como no groupby original
+    if _has_repeated_locations(codes):
+        rankings = rankings.groupby(RANKING_KEYS, observed=True, sort=True).agg({
+            'QLES_avg': 'mean',
+            'avg_per_capita_rdr': 'mean',
+            'rank_position': 'first'
+        }).reset_index()
+        codes = {col: pd.factorize(rankings[col], sort=True)[0] for col in RANKING_KEYS}
+
+    # Ordem: perfil, posição e, nos empates, descrição/país/cidade
+    order = np.lexsort((codes['city'], codes['country'], codes['description'],
+                        rankings['rank_position'].to_numpy(), codes['profile_id']))
+    return rankings.take(order).reset_index(drop=True)
+
+
+def _has_repeated_locations(codes):
+    """Algum perfil aparece mais de uma vez no mesmo (descrição, país, cidade)?"""
+    profiles = codes['profile_id']
+    location = codes['country'].astype(np.int64) * (codes['city'].max() + 1) + codes['city']
+
+    block_start = np.r_[True, profiles[1:] != profiles[:-1]]
+    n_blocks = int(block_start.sum())
+    if len(profiles) % n_blocks == 0 and n_blocks == len(np.unique(profiles[block_start])):
+        # Layout perfil × cidades: basta checar locais distintos em cada linha
+        rows = np.sort(location.reshape(n_blocks, -1), axis=1)
+        if not (rows[:, 1:] == rows[:, :-1]).any():
+            return False
+
+    return pd.DataFrame(codes).duplicated().any()
@@ -0,0 +1,391 @@
+"""
+Orquestrador do pipeline RAW → SILVER → GOLD
+Modela as camadas como um DAG de etapas, executa etapas independentes em
+paralelo num pool de processos e grava um relatório de tempos por etapa com
+o caminho crítico
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import generate_enriched_data as silver
+import generate_gold_data as gold
+import generate_raw_data as raw
+import paths
+import storage
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Etapas das camadas RAW e SILVER; os outputs GOLD viram etapas 'gold:<output>'
+# com dependências derivadas de GOLD_OUTPUTS (colunas por pessoa →
+# people_wide, datasets cross-country → cross_country, 'requires' → outro
+# output GOLD)
+BASE_STAGES = {
+    'raw': {'requires': []},
+    'silver:people_wide': {'requires': ['raw']},
+    'silver:cross_country': {'requires': ['raw']},
+}
+
+# Dataset SILVER → etapa que o produz
+SILVER_DATASET_STAGES = {
+    'cross_country_family_simulation': 'silver:cross_country',
+    'cross_country_profile_grid': 'silver:cross_country',
+    'social_benefits_enriched': 'silver:people_wide',
+}
+
+# Relatório de tempos da última execução
+TIMING_REPORT = paths.ROOT_DIR / 'pipeline_timing.json'
+
+
+# ============================================================================
+# DAG
+# ============================================================================
+
+def build_dag(outputs=None, start='raw'):
+    """
+    Monta o DAG de etapas em ordem topológica
+
+    outputs: outputs GOLD (padrão: os não opcionais; dependências incluídas)
+    start: primeira camada executada ('raw', 'silver' ou 'gold'); etapas de
+           camadas anteriores são consideradas prontas e saem do DAG
+    """
+    dag = {name: dict(spec) for name, spec in BASE_STAGES.items()}
+    for output in gold.resolve_outputs(outputs):
+        spec = gold.GOLD_OUTPUTS[output]
+        requires = ['silver:people_wide'] if spec['columns'] else []
+        requires += [SILVER_DATASET_STAGES[ds] for ds in spec['datasets']]
+        requires += [f'gold:{required}' for required in spec.get('requires', [])]
+        dag[f'gold:{output}'] = {'requires': list(dict.fromkeys(requires))}
+
+    # Etapas SILVER que nenhum output pedido usa não precisam rodar
+    needed = {r for spec in dag.values() for r in spec['requires']}
+    dag = {name: spec for name, spec in dag.items() if not name.startswith('silver:') or name in needed}
+
+    layers = ['raw', 'silver', 'gold']
+    skipped = {name for name in dag if layers.index(name.split(':')[0]) < layers.index(start)}
+    return {
+        name: {'requires': [r for r in spec['requires'] if r not in skipped]}
+        for name, spec in dag.items() if name not in skipped
+    }
+
+
+def critical_path(dag, timings):
+    """
+    Caminho crítico: a cadeia de dependências com a maior soma de durações
+
+    É o limite inferior do tempo total com workers ilimitados; etapas fora
+    dele podem ficar mais lentas sem atrasar o pipeline.
+    """
+    longest, previous = {}, {}
+    for name, spec in dag.items():  # dag já está em ordem topológica
+        before = max(spec['requires'], key=lambda r: longest[r], default=None)
+        longest[name] = timings[name]['duration'] + (longest[before] if before else 0.0)
+        previous[name] = before
+
+    name = max(longest, key=longest.get)
+    path = []
+    while name is not None:
+        path.append(name)
+        name = previous[name]
+    return path[::-1], longest[path[0]]
+
+
+# ============================================================================
+# EXECUÇÃO DAS ETAPAS
+# ============================================================================
+
+def execute_stage(name, options):
+    """Executa uma etapa (chamada no processo principal ou num worker)"""
+    if name == 'raw':
+        raw.main(['--n-people', str(options['n_people']), '--format', options['format'],
+                  '--output-dir', str(paths.RAW_DIR), '--workers', str(options['workers']),
+                  '--countries', *options['countries']])
+    elif name == 'silver:people_wide':
+        silver.build_people_wide(options['format'], options['zscore_by'],
+                                 options['export_views'], options['export_csv'],
+                                 options['by_country'], options['workers'])
+    elif name == 'silver:cross_country':
+        silver.build_cross_country(options['format'], options['export_csv'], options['profile_grid'])
+    elif name.startswith('gold:') and options['by_country']:
+        gold.build_gold_by_country([name.split(':', 1)[1]], fmt=options['format'],
+                                   export_csv=options['export_csv'],
+                                   cluster_options={'workers': options['workers']}, workers=options['workers'])
+    elif name.startswith('gold:'):
+        gold.build_gold([name.split(':', 1)[1]], fmt=options['format'], export_csv=options['export_csv'],
+                        cluster_options={'workers': options['workers']})
+    else:
+        raise ValueError(f"Etapa desconhecida: {name}")
+
+
+def run_stage(name, options):
+    """
+    Executa uma etapa capturando sua saída (os logs dos workers não se misturam)
+
+    Retorna início/fim em epoch (comparáveis entre processos), pid, saída e,
+    em caso de falha, o traceback.
+    """
+    buffer = io.StringIO()
+    result = {'stage': name, 'pid': os.getpid(), 'error': None}
+    result['start'] = time.time()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            execute_stage(name, options)
+    except Exception:
+        result['error'] = traceback.format_exc()
+    result['end'] = time.time()
+    result['output'] = buffer.getvalue()
+    return result
+
+
+def run_dag(dag, options, workers):
+    """
+    Executa o DAG: cada etapa é submetida assim que suas dependências terminam
+
+    A etapa 'raw' roda sempre no processo principal (ela própria usa um pool
+    de processos para os shards de people_raw). Com workers=1 tudo roda em
+    série, sem pool. Etapas submetidas ao pool recebem workers=1: os pools
+    internos (partições por país, seleção de k) não multiplicam os processos.
+    Retorna {etapa: resultado de run_stage}.
+    """
+    results = {}
+    pending = dict(dag)
+
+    def ready():
+        return [name for name, spec in pending.items() if all(r in results for r in spec['requires'])]
+
+    def finish(result):
+        results[result['stage']] = result
+        report_stage(result)
+        if result['error']:
+            raise RuntimeError(f"Etapa {result['stage']} falhou")
+
+    if 'raw' in pending:
+        del pending['raw']
+        finish(run_stage('raw', options))
+
+    if workers == 1:
+        while pending:
+            name = ready()[0]
+            del pending[name]
+            finish(run_stage(name, options))
+        return results
+
+    stage_options = {**options, 'workers': 1}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or running:
+            for name in ready():
+                del pending[name]
+                running[pool.submit(run_stage, name, stage_options)] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                try:
+                    finish(future.result())
+                except RuntimeError:
+                    for other in running:
+                        other.cancel()
+                    raise
+    return results
+
+
+def report_stage(result):
+    """Mostra a saída de uma etapa concluída, em bloco"""
+    duration = result['end'] - result['start']
+    status = '❌' if result['error'] else '✅'
+    print(f"{status} {result['stage']} ({duration:.2f}s, pid {result['pid']})")
+    for line in result['output'].rstrip().splitlines():
+        print(f"   │ {line}")
+    if result['error']:
+        print(result['error'])
+    print()
+
+
+# ============================================================================
+# RELATÓRIO DE TEMPOS
+# ============================================================================
+
+def timing_report(dag, results, wall_time, workers):
+    """Tempos por etapa (relativos ao início), soma serial e caminho crítico"""
+    origin = min(result['start'] for result in results.values())
+    timings = {
+        name: {
+            'start': round(results[name]['start'] - origin, 3),
+            'end': round(results[name]['end'] - origin, 3),
+            'duration': round(results[name]['end'] - results[name]['start'], 3),
+            'requires': dag[name]['requires'],
+            'pid': results[name]['pid'],
+        }
+        for name in dag
+    }
+    path, path_time = critical_path(dag, timings)
+    for name in timings:
+        timings[name]['critical'] = name in path
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'workers': workers,
+        'wall_time': round(wall_time, 3),
+        'serial_time': round(sum(t['duration'] for t in timings.values()), 3),
+        'critical_path': path,
+        'critical_path_time': round(path_time, 3),
+        'stages': timings,
+    }
+
+
+def print_timing_report(report):
+    print("⏱️  Tempos por etapa (* = caminho crítico):")
+    for name, timing in report['stages'].items():
+        mark = '*' if timing['critical'] else ' '
+        print(f"   {mark} {name:<36} início {timing['start']:>7.2f}s   duração {timing['duration']:>7.2f}s")
+    print()
+    print(f"   Caminho crítico: {' → '.join(report['critical_path'])} ({report['critical_path_time']:.2f}s)")
+    print(f"   Tempo total: {report['wall_time']:.2f}s com {report['workers']} worker(s) "
+          f"(soma das etapas: {report['serial_time']:.2f}s)")
+
+
+# ============================================================================
+# PIPELINE PRINCIPAL
+# ============================================================================
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Executa RAW → SILVER → GOLD como um DAG, com etapas independentes em paralelo"
+    )
+    parser.add_argument(
+        '--from',
+        dest='start',
+        choices=['raw', 'silver', 'gold'],
+        help="Primeira camada executada (padrão: raw se a camada RAW não existir ou se --n-people/--countries "
+             "forem passados, senão silver)"
+    )
+    parser.add_argument(
+        '--outputs',
+        nargs='+',
+        choices=list(gold.GOLD_OUTPUTS),
+        help="Outputs GOLD a gerar (padrão: todos os não opcionais); dependências incluídas"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help="Processos do pool (0 = todos os núcleos; 1 = execução em série)"
+    )
+    parser.add_argument(
+        '--n-people',
+        type=int,
+        help=f"Tamanho da população quando a camada RAW é gerada (padrão: {raw.N_PEOPLE:,})"
+    )
+    parser.add_argument(
+        '--format',
+        choices=sorted(storage.FORMATS),
+        default=storage.DEFAULT_FORMAT,
+        help=f"Formato de armazenamento (padrão: {storage.DEFAULT_FORMAT})"
+    )
+    parser.add_argument(
+        '--zscore-by',
+        default=silver.ZSCORE_GROUP_BY,
+        choices=['country', 'region_br', 'city_br'],
+        help=f"Chave de agrupamento dos z-scores (padrão: {silver.ZSCORE_GROUP_BY})"
+    )
+    parser.add_argument(
+        '--countries',
+        nargs='+',
+        choices=list(raw.COUNTRY_WEIGHTS),
+        help=f"Países da população quando a camada RAW é gerada (padrão: {raw.BASE_COUNTRY})"
+    )
+    parser.add_argument('--by-country', action='store_true',
+                        help="SILVER e outputs GOLD linha a linha em partições por país, em paralelo")
+    parser.add_argument('--profile-grid', action='store_true',
+                        help="Simula também a grade completa de perfis (SILVER)")
+    parser.add_argument('--export-views', action='store_true',
+                        help="Materializa as visões por pessoa da SILVER")
+    parser.add_argument('--export-csv', action='store_true',
+                        help="Grava também cópias CSV dos datasets (consumo no Power BI)")
+    parser.add_argument(
+        '--report',
+        default=TIMING_REPORT,
+        help=f"Arquivo JSON do relatório de tempos (padrão: {TIMING_REPORT})"
+    )
+    args = parser.parse_args()
+
+    # Parâmetros da RAW passados explicitamente exigem gerar a RAW de novo
+    raw_options = [flag for flag, value in [('--n-people', args.n_people), ('--countries', args.countries)]
+                   if value is not None]
+    if raw_options and args.start not in (None, 'raw'):
+        parser.error(f"{'/'.join(raw_options)} exige --from raw (a RAW existente seria usada)")
+    if raw_options:
+        args.start = 'raw'
+    args.n_people = raw.N_PEOPLE if args.n_people is None else args.n_people
+    args.countries = args.countries or [raw.BASE_COUNTRY]
+    return args
+
+
+def main():
+    args = parse_args()
+    workers = args.workers or os.cpu_count()
+
+    start = args.start
+    if start is None:
+        try:
+            storage.find_dataset(paths.RAW_DIR, 'people_raw')
+            start = 'silver'
+        except FileNotFoundError:
+            start = 'raw'
+
+    outputs = args.outputs
+    if args.profile_grid and not outputs:
+        outputs = list(gold.GOLD_OUTPUTS)
+    profile_grid = args.profile_grid or 'profile_grid_rankings' in (outputs or [])
+    dag = build_dag(outputs, start)
+
+    print("=" * 80)
+    print("🚀 PIPELINE RAW → SILVER → GOLD")
+    print("=" * 80)
+    print(f"Raiz: {paths.ROOT_DIR}")
+    print(f"Etapas ({len(dag)}, {workers} worker(s)):")
+    for name, spec in dag.items():
+        after = f" ← {', '.join(spec['requires'])}" if spec['requires'] else ''
+        print(f"   • {name}{after}")
+    print()
+
+    options = {
+        'n_people': args.n_people,
+        'format': args.format,
+        'workers': workers,
+        'zscore_by': args.zscore_by,
+        'profile_grid': profile_grid,
+        'export_views': args.export_views,
+        'export_csv': args.export_csv,
+        'countries': args.countries,
+        'by_country': args.by_country,
+    }
+    began = time.perf_counter()
+    try:
+        results = run_dag(dag, options, workers)
+    except RuntimeError as error:
+        print(f"❌ Pipeline interrompido: {error}")
+        raise SystemExit(1)
+    wall_time = time.perf_counter() - began
+
+    report = timing_report(dag, results, wall_time, workers)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("=" * 80)
+    print_timing_report(report)
+    print(f"   Relatório salvo em {args.report}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
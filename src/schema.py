@@ -0,0 +1,155 @@
+"""
+Schema central dos datasets do pipeline (RAW, SILVER e GOLD)
+Tipos compactos por coluna: categóricos para enums, inteiros pequenos para
+contagens e float32 para valores monetários de custo
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# CATEGÓRICOS
+# ============================================================================
+
+# Vocabulário de cada coluna enumerada (None = categorias inferidas dos dados).
+# Valores fora da lista não são descartados: entram como categorias extras
+# ao final, então o schema nunca transforma um valor válido em NaN.
+CATEGORIES = {
+    'gender': ['M', 'F'],
+    'region_br': ['SE', 'NE', 'S', 'N', 'CO'],
+    'city_br': [
+        'São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Vitória', 'Campinas',
+        'Salvador', 'Fortaleza', 'Recife', 'Natal', 'São Luís',
+        'Curitiba', 'Porto Alegre', 'Florianópolis', 'Joinville', 'Londrina',
+        'Manaus', 'Belém', 'Porto Velho', 'Rio Branco', 'Macapá',
+        'Brasília', 'Goiânia', 'Campo Grande', 'Cuiabá', 'Palmas',
+    ],
+    'education_level': ['sem ensino médio', 'médio', 'técnico', 'superior', 'pós'],
+    'job_category': ['serviços', 'indústria', 'tecnologia', 'comércio', 'informal', 'desempregado'],
+    'employment_type': ['CLT', 'PJ', 'informal', 'desempregado'],
+    'rent_status': ['aluguel', 'próprio', 'cedido'],
+    'country': None,
+    'city': None,
+    'QLES_bucket': ['Very Low', 'Low', 'Medium', 'High', 'Very High'],
+    'cluster_label': None,
+    'cluster_description': None,
+    'risk_group': ['Risco Baixo', 'Risco Moderado', 'Risco Alto', 'Risco Crítico'],
+    'scenario_name': None,
+    'benefit_name': None,
+}
+
+# Categóricos com ordem semântica (permitem comparação e ordenação)
+ORDERED_CATEGORIES = {'education_level', 'QLES_bucket', 'risk_group'}
+
+
+# ============================================================================
+# NUMÉRICOS
+# ============================================================================
+
+# Inteiros pequenos (aplicados só quando a conversão é exata)
+INTEGER_DTYPES = {
+    'age': 'int8',
+    'dependents': 'int8',
+    'gross_salary_brl': 'int32',
+    'cluster_id': 'int8',
+}
+
+# Custos em R$ (valores de até dezenas de milhares): float32 mantém a
+# precisão de centavos. Salários, RDR, razões e scores normalizados
+# continuam float64, pois alimentam normalizações e rankings.
+FLOAT32_COLUMNS = {
+    # Custos domiciliares
+    'housing_cost', 'basic_food_cost', 'transport_cost', 'utilities_cost',
+    'healthcare_cost', 'dependent_adjustment', 'total_household_cost',
+    'cost_per_capita', 'adjusted_min_wage', 'total_social_benefits', 'benefit_value',
+    # Custos culturais
+    'streaming_cost', 'internet_cost', 'cinema_ticket', 'cultural_events',
+    'music_subscription', 'cultural_basic_cost',
+    # Custos de oportunidade
+    'technical_course', 'college_private', 'language_course',
+    'emergency_savings_target', 'mobility_cost',
+    # Médias por cluster (já arredondadas em 2 casas)
+    'avg_rdr', 'avg_epr', 'avg_iac', 'avg_ioe', 'avg_cost_per_capita',
+}
+
+
+# ============================================================================
+# PARTICIONAMENTO
+# ============================================================================
+
+# Hierarquia geográfica das partições em disco (país → região → cidade)
+GEO_PARTITION_KEYS = ['country', 'region_br', 'city_br']
+
+# Datasets por pessoa gravados em partições por chave geográfica
+# (layout 'partitioned' do storage); só entram as chaves presentes no frame
+PARTITIONED_DATASETS = {
+    # SILVER
+    'people_wide': GEO_PARTITION_KEYS,
+    'people_enriched': GEO_PARTITION_KEYS,
+    'household_costs_enriched': GEO_PARTITION_KEYS,
+    'cultural_access_enriched': GEO_PARTITION_KEYS,
+    'opportunity_access_enriched': GEO_PARTITION_KEYS,
+    'social_benefits_enriched': ['country'],
+    # GOLD (cidade como 'city', nome usado na GOLD)
+    'quality_of_life_score': ['country', 'region_br', 'city'],
+}
+
+
+# ============================================================================
+# APLICAÇÃO
+# ============================================================================
+
+def categorical(values, column):
+    """Converte valores para o categórico da coluna (vocabulário fixo + extras)"""
+    categories = CATEGORIES[column]
+    values = pd.Series(values, copy=False)
+    if categories is None:
+        return values.astype('category')
+
+    present = values.dropna().unique()
+    extra = sorted(set(present) - set(categories))
+    dtype = pd.CategoricalDtype(categories + extra, ordered=column in ORDERED_CATEGORIES)
+    return values.astype(dtype)
+
+
+def apply_schema(df):
+    """
+    Converte as colunas conhecidas de um frame para os tipos compactos
+
+    Colunas fora do schema ficam intactas; o frame original não é alterado.
+    Chamado pelo backend de armazenamento em toda leitura e escrita.
+    """
+    df = df.copy(deep=False)
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORIES:
+            if pd.api.types.is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+                df[col] = categorical(series, col)
+        elif col in INTEGER_DTYPES:
+            # Só converte quando a conversão é exata (sem NaN nem frações)
+            values = series.to_numpy()
+            if pd.api.types.is_numeric_dtype(series) and np.all(np.isfinite(values)) \
+                    and np.all(values == np.trunc(values)):
+                df[col] = series.astype(INTEGER_DTYPES[col])
+        elif col in FLOAT32_COLUMNS:
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                df[col] = series.astype(np.float32)
+    return df
+
+
+
+def widen_floats(df):
+    """
+    Volta colunas float32 para float64 antes de cálculos encadeados
+
+    Usado nas tabelas de referência (poucas linhas) para que as métricas por
+    pessoa sejam calculadas em float64; o float32 fica só no armazenamento.
+    """
+    float32_cols = [col for col in df.columns if df[col].dtype == np.float32]
+    return df.astype({col: np.float64 for col in float32_cols}) if float32_cols else df
+
+
+def partition_keys(name, columns):
+    """Chaves de partição de um dataset presentes nas colunas (lista vazia = arquivo único)"""
+    return [col for col in PARTITIONED_DATASETS.get(name, []) if col in columns]
@@ -0,0 +1,151 @@
+"""
+Pontuação incremental de pessoas novas ou alteradas
+Aplica os modelos persistidos (normalização da SILVER, escala do QLES e
+modelo de clusters) só às linhas de um lote e grava o resultado como novas
+partes dos datasets, sem recalcular as camadas inteiras
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import generate_enriched_data as silver
+import generate_gold_data as gold
+import normalization_model
+import paths
+import person_table
+import schema
+import storage
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+RAW_DIR = paths.RAW_DIR
+ENRICHED_DIR = paths.ENRICHED_DIR
+GOLD_DIR = paths.GOLD_DIR
+
+# Outputs GOLD calculados linha a linha (clusters: atribuição aos centróides
+# salvos, sem reajuste; rankings dependem da população inteira e só são
+# atualizados numa execução completa)
+INCREMENTAL_GOLD_OUTPUTS = ['quality_of_life_score', 'vulnerability_and_risk', 'policy_scenarios',
+                            'socioeconomic_clusters']
+
+
+# ============================================================================
+# PONTUAÇÃO
+# ============================================================================
+
+def score_silver(batch, model, fmt=None):
+    """Calcula as métricas SILVER do lote e acrescenta uma parte a people_wide"""
+    economic, cultural, opportunity, social = silver.load_person_reference_tables(RAW_DIR)
+    df = silver.enrich_people(batch, economic, cultural, opportunity, social, model)
+    wide = person_table.build_wide_table(df)
+    path = storage.append_part(wide, ENRICHED_DIR, person_table.WIDE_TABLE, fmt)
+    print(f"   ✓ {person_table.WIDE_TABLE}: +{len(wide):,} linhas ({path.name})")
+    # A GOLD parte dos tipos gravados (custos em float32), como na execução completa
+    return schema.apply_schema(wide)
+
+
+def score_gold(wide, qles_model, cluster_model, fmt=None):
+    """Calcula os outputs GOLD linha a linha do lote com a escala de QLES e os clusters persistidos"""
+    columns = [person_table.PERSON_KEY]
+    if 'person_id' in storage.dataset_columns(GOLD_DIR, 'quality_of_life_score'):
+        columns.append('person_id')
+    for output in INCREMENTAL_GOLD_OUTPUTS:
+        for col in gold.GOLD_OUTPUTS[output]['columns']:
+            col = gold.SILVER_COLUMN_ALIASES.get(col, col)
+            if col not in columns:
+                columns.append(col)
+
+    if 'country' in wide.columns:
+        columns.append('country')
+    base = wide[[col for col in columns if col in wide.columns]].copy()
+    if 'country' not in base.columns:
+        base['country'] = silver.BASE_COUNTRY
+    base = base.rename(columns={'city_br': 'city'})
+
+    qles_df = gold.calculate_qles(base, model=qles_model)
+    cluster_stats = storage.read_table(GOLD_DIR, 'cluster_statistics').set_index('cluster_id')
+    outputs = {
+        'quality_of_life_score': qles_df,
+        'vulnerability_and_risk': gold.create_vulnerability_flags(base),
+        'policy_scenarios': gold.simulate_policy_scenarios(base, qles_df),
+        'socioeconomic_clusters': gold.assign_clusters(base, cluster_model, cluster_stats),
+    }
+    for name, frame in outputs.items():
+        path = storage.append_part(frame, GOLD_DIR, name, fmt)
+        print(f"   ✓ {name}: +{len(frame):,} linhas ({path.name})")
+
+
+# ============================================================================
+# PIPELINE PRINCIPAL
+# ============================================================================
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Pontua um lote de pessoas novas/alteradas com os modelos de normalização salvos"
+    )
+    parser.add_argument(
+        '--batch-dir',
+        type=Path,
+        required=True,
+        help="Diretório do lote no formato RAW (dataset people_raw, com person_key)"
+    )
+    parser.add_argument(
+        '--batch-name',
+        default='people_raw',
+        help="Nome do dataset do lote dentro de --batch-dir (padrão: people_raw)"
+    )
+    parser.add_argument(
+        '--format',
+        choices=sorted(storage.FORMATS),
+        default=storage.DEFAULT_FORMAT,
+        help=f"Formato das novas partes (padrão: {storage.DEFAULT_FORMAT})"
+    )
+    parser.add_argument(
+        '--skip-gold',
+        action='store_true',
+        help="Atualiza apenas a camada SILVER"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 70)
+    print("PONTUAÇÃO INCREMENTAL")
+    print("=" * 70)
+    print()
+
+    start = time.perf_counter()
+    batch = storage.read_table(args.batch_dir, args.batch_name)
+    if person_table.PERSON_KEY not in batch.columns:
+        raise ValueError(
+            f"O lote precisa da coluna {person_table.PERSON_KEY}: chaves novas para pessoas novas, "
+            "chaves existentes para linhas alteradas"
+        )
+    print(f"📥 Lote: {len(batch):,} pessoas")
+
+    model = normalization_model.load(ENRICHED_DIR, normalization_model.SILVER_MODEL)
+    print(f"📐 Modelo de normalização SILVER: versão {model['version']} ({model['created_at']})")
+    wide = score_silver(batch, model, args.format)
+
+    if not args.skip_gold:
+        qles_model = normalization_model.load(GOLD_DIR, normalization_model.QLES_MODEL)
+        print(f"📐 Escala do QLES: versão {qles_model['version']} ({qles_model['created_at']})")
+        cluster_model = normalization_model.load(GOLD_DIR, normalization_model.CLUSTER_MODEL)
+        print(f"📐 Modelo de clusters: versão {cluster_model['version']} (k={cluster_model['k']})")
+        print()
+        score_gold(wide, qles_model, cluster_model, args.format)
+
+    print()
+    print(f"✅ Lote pontuado em {time.perf_counter() - start:.2f}s")
+    print("   Centróides dos clusters e rankings são atualizados apenas na próxima execução completa.")
+    print()
+
+
+if __name__ == "__main__":
+    main()
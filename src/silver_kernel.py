@@ -0,0 +1,130 @@
+"""
+Kernel fundido das métricas SILVER por pessoa
+Custos domiciliares, pressão econômica, acesso cultural e oportunidades
+numa única tabela de expressões, avaliada bloco a bloco em buffers de saída
+pré-alocados: com numexpr, cada métrica é uma única passada sobre o bloco,
+sem os temporários de replace(0, nan), fillna(0) e where por coluna
+"""
+
+import re
+
+import numpy as np
+
+try:
+    import numexpr
+    HAS_NUMEXPR = True
+except ImportError:  # pragma: no cover - depende do ambiente
+    HAS_NUMEXPR = False
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Linhas por bloco: os custos lidos por índice e os temporários do fallback
+# NumPy têm o tamanho do bloco, não o da população
+CHUNK_ROWS = 65_536
+
+# Fórmula de cada métrica, na ordem de cálculo (uma métrica pode usar as
+# anteriores). Nomes livres são colunas da pessoa, custos das dimensões
+# (lidos por índice no bloco) ou parâmetros escalares (dependency_factor).
+# Divisões por custo zero dão NaN, como replace(0, np.nan), e NaN conta como
+# 0 na soma do IOE, como fillna(0). social_support_ratio é a parcela da renda
+# (salário + benefícios) vinda de benefícios: 1 para quem só tem benefícios e
+# 0 para quem não tem renda nenhuma.
+METRIC_EXPRESSIONS = {
+    # Custos e renda (etapa household_costs)
+    'housing_cost': "where(dependents == 0, avg_rent_single, avg_rent_family) * where(owned_home, 0.5, 1.0)",
+    'dependent_adjustment': "dependents * (basic_food_cost * 0.6 + utilities_cost * 0.3 + healthcare_cost * 0.4)",
+    'total_household_cost': ("housing_cost + basic_food_cost + transport_cost + utilities_cost + "
+                             "healthcare_cost + dependent_adjustment"),
+    'renda_disponivel_real': "net_salary_brl + total_social_benefits - total_household_cost",
+    # Pressão econômica e estrutura familiar (etapa economic_metrics)
+    'economic_pressure_ratio': "total_household_cost / net_salary_brl",
+    'epr_clean': ("where((economic_pressure_ratio > 0) & (economic_pressure_ratio < 2.0), "
+                  "economic_pressure_ratio, nan)"),
+    'cost_per_capita': "total_household_cost / (dependents + 1)",
+    'adjusted_min_wage': "local_min_wage * (1 + dependents * dependency_factor)",
+    'dist_salario_minimo_ajustado': "(net_salary_brl - adjusted_min_wage) / adjusted_min_wage",
+    'subsistence_gap': "net_salary_brl - total_household_cost",
+    'social_support_ratio': ("where(net_salary_brl + total_social_benefits > 0, "
+                             "total_social_benefits / (net_salary_brl + total_social_benefits), 0)"),
+    # Acesso cultural (etapa cultural_access)
+    'cultural_basic_cost': "streaming_cost + internet_cost + cinema_ticket + cultural_events + music_subscription",
+    'iac_raw': "renda_disponivel_real / where(cultural_basic_cost == 0, nan, cultural_basic_cost)",
+    # Oportunidades econômicas (etapa opportunity_access)
+    'ioe_technical': "renda_disponivel_real / where(technical_course == 0, nan, technical_course)",
+    'ioe_college': "renda_disponivel_real / where(college_private == 0, nan, college_private)",
+    'ioe_language': "renda_disponivel_real / where(language_course == 0, nan, language_course)",
+    'ioe_savings': "renda_disponivel_real / where(emergency_savings_target == 0, nan, emergency_savings_target)",
+    'ioe_mobility': "renda_disponivel_real / where(mobility_cost == 0, nan, mobility_cost)",
+    'ioe_raw': ("where(ioe_technical != ioe_technical, 0, ioe_technical) + "
+                "where(ioe_college != ioe_college, 0, ioe_college) + "
+                "where(ioe_language != ioe_language, 0, ioe_language) + "
+                "where(ioe_savings != ioe_savings, 0, ioe_savings) + "
+                "where(ioe_mobility != ioe_mobility, 0, ioe_mobility)"),
+}
+
+
+# ============================================================================
+# AVALIAÇÃO
+# ============================================================================
+
+def expression_names(metrics):
+    """Nomes usados nas fórmulas das métricas (entradas, métricas e funções)"""
+    return set(re.findall(r'[A-Za-z_]\w*', ' '.join(METRIC_EXPRESSIONS[name] for name in metrics)))
+
+
+def _evaluate_expression(expression, local, out):
+    if HAS_NUMEXPR:
+        numexpr.evaluate(expression, local_dict=local, out=out)
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[...] = eval(expression, {'__builtins__': {}, 'where': np.where}, local)
+
+
+def evaluate(metrics, columns, lookups=None, params=None, chunk_rows=CHUNK_ROWS):
+    """
+    Calcula métricas de METRIC_EXPRESSIONS para todas as pessoas, bloco a bloco
+
+    metrics: métricas pedidas, avaliadas na ordem de METRIC_EXPRESSIONS;
+             as demais entradas das fórmulas vêm de columns/lookups/params
+    columns: {nome: vetor por pessoa} (inteiros são convertidos no bloco)
+    lookups: {nome: (vetor da dimensão, códigos por pessoa)}; o custo de
+             cada pessoa é lido com np.take direto num buffer do bloco
+    params: escalares usados nas fórmulas (ex.: dependency_factor)
+    Retorna {métrica: vetor float64}, cada um um buffer alocado uma única vez.
+    """
+    metrics = [name for name in METRIC_EXPRESSIONS if name in set(metrics)]
+    n = len(next(iter(columns.values())))
+    # Só as colunas e os custos que as fórmulas pedidas usam
+    used = expression_names(metrics) - set(metrics)
+    columns = {name: values for name, values in columns.items() if name in used}
+    lookups = {name: lookup for name, lookup in (lookups or {}).items() if name in used}
+    scalars = {'nan': np.nan, **(params or {})}
+
+    outputs = {name: np.empty(n, dtype=np.float64) for name in metrics}
+    size = min(chunk_rows, n) or 1
+    # Buffers reaproveitados por todos os blocos: entradas inteiras e custos das dimensões
+    cast = {name: np.empty(size, dtype=np.float64) for name, values in columns.items()
+            if values.dtype not in (np.float64, np.bool_)}
+    gathered = {name: np.empty(size, dtype=np.float64) for name in lookups}
+
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        rows = stop - start
+        local = dict(scalars)
+        for name, values in columns.items():
+            if name in cast:
+                buffer = cast[name][:rows]
+                np.copyto(buffer, values[start:stop], casting='unsafe')
+                local[name] = buffer
+            else:
+                local[name] = values[start:stop]
+        for name, (vector, codes) in lookups.items():
+            local[name] = np.take(vector, codes[start:stop], out=gathered[name][:rows])
+        for name in metrics:
+            local[name] = outputs[name][start:stop]
+            _evaluate_expression(METRIC_EXPRESSIONS[name], local, local[name])
+
+    return outputs
@@ -0,0 +1,173 @@
+"""
+Motor de elegibilidade de benefícios sociais
+Avalia todas as regras de social_benefits_raw para todas as pessoas como um
+join por intervalos: regras ordenadas por limite de renda per capita e uma
+busca binária por pessoa (sem laço por pessoa nem por programa)
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Coluna de adesão: só quem declara receber benefício soma os valores dos
+# programas para os quais é elegível (None = todo elegível recebe)
+BENEFIT_TAKE_UP_COLUMN = 'receives_social_benefit'
+
+# Colunas de uma regra em social_benefits_raw
+RULE_COLUMNS = ['country', 'benefit_name', 'monthly_value', 'eligibility_income_threshold',
+                'per_dependent_bonus', 'max_dependents']
+
+
+# ============================================================================
+# ÍNDICE DE REGRAS
+# ============================================================================
+
+def build_rule_index(benefits_df):
+    """
+    Indexa as regras por país, ordenadas por limite de renda per capita
+
+    Para cada país:
+    - thresholds (R,): limites em ordem crescente; quem tem renda per capita
+      <= thresholds[r] é elegível à regra r e a todas as seguintes
+    - values (R, D+1): valor mensal da regra r para d = 0..D dependentes
+      (monthly_value + per_dependent_bonus × min(d, max_dependents))
+    - suffix (R+1, D+1): soma dos valores das regras r..R-1 (linha R = 0),
+      de modo que o total de uma pessoa é uma única leitura por índice
+    D é o maior max_dependents do país: acima dele nenhum bônus cresce.
+    """
+    index = {}
+    rules = benefits_df[RULE_COLUMNS]
+    for country, group in rules.groupby('country', sort=False, observed=True):
+        group = group.sort_values('eligibility_income_threshold', kind='stable')
+        cap = group['max_dependents'].to_numpy(dtype=np.int64)
+        dependents = np.arange(cap.max() + 1)
+
+        values = (
+            group['monthly_value'].to_numpy(dtype=float)[:, None] +
+            group['per_dependent_bonus'].to_numpy(dtype=float)[:, None] *
+            np.minimum(dependents[None, :], cap[:, None])
+        )
+        suffix = np.zeros((len(group) + 1, len(dependents)))
+        suffix[:-1] = np.cumsum(values[::-1], axis=0)[::-1]
+
+        index[country] = {
+            'names': group['benefit_name'].to_numpy(dtype=object),
+            'thresholds': group['eligibility_income_threshold'].to_numpy(dtype=float),
+            'values': values,
+            'suffix': suffix,
+        }
+    return index
+
+
+# ============================================================================
+# AVALIAÇÃO
+# ============================================================================
+
+def per_capita_income(df):
+    """Renda líquida per capita do domicílio (titular + dependentes)"""
+    return df['net_salary_brl'].to_numpy(dtype=float) / (df['dependents'].to_numpy(dtype=float) + 1)
+
+
+def _country_rows(df, index):
+    """(país, linhas) para cada país com regras; pessoas de outros países não recebem nada"""
+    countries = pd.Categorical(df['country'], categories=list(index))
+    codes = countries.codes
+    for code, country in enumerate(index):
+        rows = np.flatnonzero(codes == code)
+        if len(rows):
+            yield country, rows
+
+
+def _first_eligible(rules, per_capita):
+    # Primeira regra cujo limite cobre a renda per capita (as seguintes também cobrem)
+    return np.searchsorted(rules['thresholds'], per_capita, side='left')
+
+
+def _dependent_column(rules, dependents):
+    return np.clip(dependents, 0, rules['values'].shape[1] - 1)
+
+
+def take_up_mask(df, take_up_column=BENEFIT_TAKE_UP_COLUMN):
+    """Pessoas que recebem os valores para os quais são elegíveis"""
+    if take_up_column is None or take_up_column not in df.columns:
+        return np.ones(len(df), dtype=bool)
+    return (df[take_up_column] == True).to_numpy()
+
+
+def total_benefits(df, benefits_df, take_up_column=BENEFIT_TAKE_UP_COLUMN, index=None):
+    """
+    Total mensal de benefícios por pessoa (array alinhado às linhas de df)
+
+    Soma de todas as regras elegíveis do país da pessoa, lida de uma tabela
+    de somas acumuladas: O(log R) por pessoa, independente do número de
+    programas. Quem não adere (take_up_column) recebe 0.
+    """
+    index = build_rule_index(benefits_df) if index is None else index
+    per_capita = per_capita_income(df)
+    dependents = df['dependents'].to_numpy(dtype=np.int64)
+
+    total = np.zeros(len(df))
+    for country, rows in _country_rows(df, index):
+        rules = index[country]
+        first = _first_eligible(rules, per_capita[rows])
+        total[rows] = rules['suffix'][first, _dependent_column(rules, dependents[rows])]
+    return np.where(take_up_mask(df, take_up_column), total, 0.0)
+
+
+def benefit_breakdown(df, benefits_df, take_up_column=BENEFIT_TAKE_UP_COLUMN, index=None):
+    """
+    Detalhamento por programa: uma linha por par (pessoa, programa elegível)
+
+    Colunas: person_key, country, benefit_name, benefit_value e taken_up
+    (se a pessoa adere, isto é, se o valor entra em total_social_benefits).
+    Os pares são expandidos com np.repeat a partir da primeira regra elegível
+    de cada pessoa; só pares elegíveis são materializados.
+    """
+    index = build_rule_index(benefits_df) if index is None else index
+    per_capita = per_capita_income(df)
+    dependents = df['dependents'].to_numpy(dtype=np.int64)
+    keys = df['person_key'].to_numpy()
+    taken_up = take_up_mask(df, take_up_column)
+
+    # Categorias comuns a todos os países: a concatenação mantém os categóricos
+    countries = pd.Index(list(index))
+    names = pd.Index(pd.unique(np.concatenate([rules['names'] for rules in index.values()])))
+
+    parts = []
+    for country, rows in _country_rows(df, index):
+        rules = index[country]
+        first = _first_eligible(rules, per_capita[rows])
+        counts = len(rules['thresholds']) - first
+        pair_rows = np.repeat(rows, counts)
+        # Regra de cada par: primeira elegível + posição dentro do bloco da pessoa
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        pair_rules = np.repeat(first, counts) + np.arange(counts.sum()) - offsets
+        name_codes = names.get_indexer(rules['names'])
+        parts.append(pd.DataFrame({
+            'person_key': keys[pair_rows],
+            'country': pd.Categorical.from_codes(
+                np.full(len(pair_rows), countries.get_loc(country)), countries),
+            # Nomes como códigos categóricos: nenhum objeto Python por par
+            'benefit_name': pd.Categorical.from_codes(name_codes[pair_rules], names),
+            'benefit_value': rules['values'][pair_rules, _dependent_column(rules, dependents[pair_rows])],
+            'taken_up': taken_up[pair_rows],
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=['person_key', 'country', 'benefit_name', 'benefit_value', 'taken_up'])
+    return pd.concat(parts, ignore_index=True)
+
+
+def program_summary(breakdown):
+    """Elegíveis, beneficiários e valor mensal pago por programa"""
+    paid = breakdown['benefit_value'].where(breakdown['taken_up'], 0.0)
+    return (
+        breakdown.assign(paid=paid)
+        .groupby(['country', 'benefit_name'], sort=False, observed=True)
+        .agg(eligible=('person_key', 'size'), recipients=('taken_up', 'sum'), monthly_total=('paid', 'sum'))
+        .reset_index()
+    )
@@ -1,17 +1,23 @@
 
 import pandas as pd
 import numpy as np
-from pathlib import Path
 
-ENRICHED_DIR = Path("enriched")
+import generate_enriched_data as silver
+import paths
+import person_table
+import storage
+
+ENRICHED_DIR = paths.ENRICHED_DIR
 
 def load_enriched_data():
     """Carrega todos os datasets enriched"""
-    people = pd.read_csv(ENRICHED_DIR / "people_enriched.csv")
-    household = pd.read_csv(ENRICHED_DIR / "household_costs_enriched.csv")
-    cultural = pd.read_csv(ENRICHED_DIR / "cultural_access_enriched.csv")
-    opportunity = pd.read_csv(ENRICHED_DIR / "opportunity_access_enriched.csv")
-    cross_country = pd.read_csv(ENRICHED_DIR / "cross_country_family_comparison.csv")
+    people = person_table.read_person_view(ENRICHED_DIR, "people_enriched")
+    # Custos por cidade (colunas de dimensão) consultados nas tabelas RAW
+    lookup = silver.dimension_lookup(*silver.load_person_reference_tables()[:3])
+    household = person_table.read_person_view(ENRICHED_DIR, "household_costs_enriched", lookup=lookup)
+    cultural = person_table.read_person_view(ENRICHED_DIR, "cultural_access_enriched")
+    opportunity = person_table.read_person_view(ENRICHED_DIR, "opportunity_access_enriched")
+    cross_country = storage.read_table(ENRICHED_DIR, "cross_country_family_comparison")
     
     return people, household, cultural, opportunity, cross_country
 